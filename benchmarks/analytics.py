@@ -0,0 +1,84 @@
+"""Latência dos endpoints de /analytics com milhares de projetos.
+
+    python benchmarks/analytics.py --projects 10000
+
+Projetos, componentes e links são gerados direto no banco; as consultas passam pela aplicação inteira com scope=all.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+
+ENDPOINTS = [
+    ("/analytics/projects", {"limit": 100}),
+    ("/analytics/projects", {"limit": 10000, "sort": "total_amperage"}),
+    ("/analytics/projects/overloaded", {"max_watts": 400000}),
+    ("/analytics/components/top", {"limit": 10}),
+    ("/analytics/stats", {}),
+]
+
+
+def seed(projects: int, components: int, links_per_project: int):
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from project_management.utils import database, models
+
+    rng = random.Random(7)
+    with Session(database.engine) as db:
+        user = models.User(username="bench", email="bench@example.com", password="x")
+        db.add(user)
+        db.commit()
+        db.execute(insert(models.Component), [
+            {"code": f"C{index:06d}", "brand": "Bench", "name": f"Component {index}", "amperage_rating": amperage,
+             "voltage": 220, "watts": amperage * 220, "user_id": user.id}
+            for index, amperage in ((index, rng.choice([6, 10, 16, 20, 32, 63])) for index in range(components))])
+        db.execute(insert(models.Project), [{"name": f"Project {index}", "user_id": user.id} for index in range(projects)])
+        links = []
+        for project_id in range(1, projects + 1):
+            for component_id in rng.sample(range(1, components + 1), rng.randint(1, links_per_project)):
+                links.append({"project_id": project_id, "component_id": component_id, "component_quantity": rng.randint(1, 20)})
+        db.execute(insert(models.ProjectComponentLink), links)
+        db.commit()
+        return len(links)
+
+
+async def run(projects: int, components: int, links_per_project: int, repeat: int):
+    app = setup_app()
+    started = time.perf_counter()
+    links = seed(projects, components, links_per_project)
+    print(f"seeded {projects} projects, {components} components, {links} links in {time.perf_counter() - started:.1f}s")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "reader", "password": "bench-password"}
+        await client.post("/user/", json={**credentials, "email": "reader@example.com"})
+        token = (await client.post("/login", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for path, params in ENDPOINTS:
+            latencies = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get(path, params={"scope": "all", **params}, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+            label = path + ("?" + "&".join(f"{key}={value}" for key, value in params.items()) if params else "")
+            print(format_stats(label, percentiles(latencies)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=10_000)
+    parser.add_argument("--components", type=int, default=5_000)
+    parser.add_argument("--links", type=int, default=30, help="máximo de componentes por projeto")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.projects, args.components, args.links, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Requisições por segundo com N clientes simultâneos, nas rotas síncronas e nas assíncronas.
+
+    python benchmarks/async_throughput.py --compare
+
+--compare roda o cenário duas vezes, com DATABASE_ASYNC desligado e ligado. A mistura de requisições
+lê um projeto com seus componentes, lista projetos e componentes do usuário e atualiza um projeto.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+
+
+async def seed(client: httpx.AsyncClient, headers: dict, projects: int, components: int):
+    for index in range(components):
+        await client.post("/component/", headers=headers, json={
+            "code": f"C{index:05d}", "brand": "Bench", "name": f"Component {index}", "amperage_rating": 2, "watts": 10})
+    for index in range(projects):
+        await client.post("/project/", headers=headers, json={"name": f"Project {index}"})
+        links = [{"code": f"C{(index + offset) % components:05d}", "quantity": 1 + offset} for offset in range(10)]
+        await client.patch(f"/project/{index + 1}/components", headers=headers, json=links)
+
+
+async def run(concurrency: int, duration: float, projects: int, components: int):
+    app = setup_app()
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=None) as client:
+        credentials = {"username": "bench", "password": "bench-password"}
+        await client.post("/user/", json={**credentials, "email": "bench@example.com"})
+        token = (await client.post("/login", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await seed(client, headers, projects, components)
+
+        def request(counter: int):
+            project_id = 1 + counter % projects
+            match counter % 4:
+                case 0 | 1:
+                    return client.get(f"/project/{project_id}", headers=headers)
+                case 2:
+                    return client.get("/user/projects", headers=headers, params={"limit": 20})
+                case _:
+                    return client.patch(f"/project/{project_id}", headers=headers, json={"name": f"Project {project_id}"})
+
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            counter = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await request(counter)
+                    errors += response.status_code >= 400
+                except Exception:
+                    # ex.: "database is locked" depois do busy_timeout do SQLite
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                counter += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(offset) for offset in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    mode = "async" if os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes") else "sync"
+    print(f"mode={mode} clients={concurrency} duration={elapsed:.1f}s errors={errors}")
+    print(format_stats("mixed requests", percentiles(latencies)))
+    print(f"{'requests/s':<32} {len(latencies) / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200, help="clientes simultâneos")
+    parser.add_argument("--duration", type=float, default=10, help="segundos de medição")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--components", type=int, default=200)
+    parser.add_argument("--compare", action="store_true", help="roda nos modos síncrono e assíncrono")
+    args = parser.parse_args()
+
+    if not args.compare:
+        asyncio.run(run(args.concurrency, args.duration, args.projects, args.components))
+        return
+    for mode in ("false", "true"):
+        env = {**os.environ, "DATABASE_ASYNC": mode}
+        subprocess.run([sys.executable, __file__, "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+                        "--projects", str(args.projects), "--components", str(args.components)], env=env, check=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Lista de materiais consolidada (POST /export/bom) com até milhões de links.
+
+    python benchmarks/bom.py --links 10000 100000 1000000
+    python benchmarks/bom.py --links 100000 --per-project     # compara com exportar projeto a projeto e somar
+
+Para cada tamanho, os links são gerados direto no banco (--lines componentes por projeto) e a lista é baixada
+pela aplicação inteira em CSV e NDJSON. A saída mostra o tempo, os links agregados por segundo, o tamanho da
+resposta e o pico de memória alocada (tracemalloc) durante o download, que não deve crescer com o número de links.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+
+import httpx
+
+from common import setup_app
+from seed import PASSWORD, seed_database
+
+
+def generate_links(links: int, lines: int, components: int):
+    from sqlalchemy import text
+    from sqlmodel import Session
+    from project_management.repository import summary_repo
+    from project_management.utils import database
+
+    projects = max(1, links // lines)
+    series = "WITH RECURSIVE series(value) AS (SELECT 1 UNION ALL SELECT value + 1 FROM series WHERE value < :count) "
+    with Session(database.engine) as db:
+        for table in ("projectcomponentlink", "projectsummary", "project"):
+            db.execute(text(f"DELETE FROM {table}"))
+        db.execute(text(series + "INSERT INTO project (id, name, user_id, created_at) SELECT value, 'BOM ' || value, 1, CURRENT_TIMESTAMP FROM series"),
+                   {"count": projects})
+        # Cada projeto usa `lines` componentes consecutivos, a partir de um deslocamento que depende do seu id
+        db.execute(text(series + "INSERT INTO projectcomponentlink (project_id, component_id, component_quantity) "
+                        "SELECT project.id, (project.id * 7 + series.value) % :components + 1, 1 + (project.id + series.value) % 7 FROM project, series"),
+                   {"count": lines, "components": components})
+        summary_repo.backfill(db)
+        db.commit()
+    return projects, projects * lines
+
+
+async def download(app, authorization: str, format: str):
+    # Direto na interface ASGI, descartando cada bloco ao recebê-lo: o ASGITransport do httpx junta o corpo
+    # inteiro antes de devolver a resposta, e a memória medida seria a do cliente
+    messages = [{"type": "http.request", "body": json.dumps({"format": format}).encode(), "more_body": False}]
+    finished = asyncio.Event()
+    size, status = 0, None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": "/export/bom", "raw_path": b"/export/bom", "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"bench"), (b"content-type", b"application/json"), (b"authorization", authorization.encode())],
+             "client": ("127.0.0.1", 50000), "server": ("bench", 80)}
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"POST /export/bom returned {status}")
+    return size
+
+
+async def per_project(client, headers, projects: int):
+    # O caminho anterior: um CSV por projeto, somado no cliente
+    totals = defaultdict(int)
+    for project_id in range(1, projects + 1):
+        response = await client.get(f"/export/export/{project_id}", params={"format": "csv"}, headers=headers)
+        for row in list(csv.reader(io.StringIO(response.text)))[1:-1]:
+            totals[row[1]] += int(row[7])
+    return len(totals)
+
+
+async def run(sizes: list[int], lines: int, components: int, compare: bool):
+    app = setup_app()
+    from project_management.utils import database
+    seed_database(database.engine, users=1, components=components, projects=0, links=1)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        token = (await client.post("/login", data={"username": "bench0", "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        authorization = headers["Authorization"]
+
+        print(f"{'links':>9} {'format':<7} {'seconds':>8} {'links/s':>10} {'MiB out':>8} {'peak KiB':>9}")
+        for links in sizes:
+            projects, generated = generate_links(links, lines, components)
+            for format in ("csv", "ndjson"):
+                started = time.perf_counter()
+                size = await download(app, authorization, format)
+                elapsed = time.perf_counter() - started
+                tracemalloc.start()
+                await download(app, authorization, format)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{generated:>9} {format:<7} {elapsed:8.2f} {generated / elapsed:10.0f} {size / 2 ** 20:8.1f} {peak / 1024:9.0f}")
+            if compare:
+                started = time.perf_counter()
+                await per_project(client, headers, projects)
+                print(f"{generated:>9} {'per-project csv x ' + str(projects):<7} {time.perf_counter() - started:8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lines", type=int, default=200, help="componentes por projeto (até --components)")
+    parser.add_argument("--components", type=int, default=20_000)
+    parser.add_argument("--per-project", action="store_true", help="também mede a exportação projeto a projeto")
+    args = parser.parse_args()
+    asyncio.run(run(args.links, args.lines, args.components, args.per_project))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Latência de POST /project/{id}/clone por tamanho da lista de materiais.
+
+    python benchmarks/clone.py --lines 10 100 1000 10000
+    python benchmarks/clone.py --replay 200        # compara com recriar o projeto por add-component
+
+Para cada tamanho é gerado um projeto modelo com esse número de linhas, clonado --repeat vezes pela aplicação
+inteira; a saída mostra a latência e os comandos SQL por clone, que não dependem do número de linhas.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+from seed import PASSWORD, seed_database
+
+
+def template(lines: int):
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from project_management.repository import summary_repo
+    from project_management.utils import database, models
+
+    with Session(database.engine) as db:
+        project = models.Project(name=f"Template {lines}", user_id=1)
+        db.add(project)
+        db.flush()
+        db.execute(insert(models.ProjectComponentLink), [{"project_id": project.id, "component_id": component_id, "component_quantity": 1 + component_id % 7}
+                                                         for component_id in range(1, lines + 1)])
+        summary_repo.recompute(db, [project.id])
+        db.commit()
+        return project.id
+
+
+async def run(lines: list[int], repeat: int, replay: int):
+    app = setup_app()
+    from sqlalchemy import event
+    from project_management.utils import database
+    seed_database(database.engine, users=1, components=max(lines + [replay]), projects=0, links=1)
+
+    statements = []
+    event.listen(database.engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        token = (await client.post("/login", data={"username": "bench0", "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for size in lines:
+            project_id = template(size)
+            latencies, before = [], len(statements)
+            for index in range(repeat):
+                started = time.perf_counter()
+                response = await client.post(f"/project/{project_id}/clone", json={"name": f"Clone {size}-{index}"}, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+            print(format_stats(f"clone {size} lines", percentiles(latencies)) + f" sql/clone={(len(statements) - before) / repeat:.0f}")
+
+        if replay:
+            # O caminho anterior: criar o projeto e repetir um add-component por linha
+            project_id = template(replay)
+            started, before = time.perf_counter(), len(statements)
+            created = (await client.post("/project/", json={"name": f"Replay {replay}"}, headers=headers)).json()
+            new_id = (await client.get("/project/", params={"name": created["name"]}, headers=headers)).json()["items"][0]["id"]
+            for component_id in range(1, replay + 1):
+                response = await client.patch(f"/project/{new_id}/add-component", json={"id": component_id, "quantity": 1 + component_id % 7}, headers=headers)
+                response.raise_for_status()
+            elapsed = time.perf_counter() - started
+            print(f"replay {replay} lines via add-component: {elapsed * 1000:.1f}ms, {replay + 2} requests, {len(statements) - before} SQL statements")
+            started, before = time.perf_counter(), len(statements)
+            (await client.post(f"/project/{project_id}/clone", json={"name": f"Clone replay {replay}"}, headers=headers)).raise_for_status()
+            print(f"clone  {replay} lines:                 {(time.perf_counter() - started) * 1000:.1f}ms, 1 request, {len(statements) - before} SQL statements")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--replay", type=int, default=0, help="linhas do projeto recriado por add-component (0 = não compara)")
+    args = parser.parse_args()
+    asyncio.run(run(args.lines, args.repeat, args.replay))
+
+
+if __name__ == "__main__":
+    main()
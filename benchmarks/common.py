@@ -0,0 +1,37 @@
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Aponta a aplicação para um banco SQLite descartável antes de importá-la
+def setup_app(db_path: str | None = None):
+    from project_management.utils import database
+
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="powerflow-bench-"), "bench.db")
+    database.engine = database.make_engine(f"sqlite:///{db_path}")
+    from project_management.main import app
+    database.create_db_and_tables()
+    return app
+
+
+def percentiles(samples: list[float]):
+    ordered = sorted(samples)
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def format_stats(name: str, stats: dict):
+    return (f"{name:<32} n={stats['count']:<6} mean={stats['mean_ms']:8.2f}ms p50={stats['p50_ms']:8.2f}ms "
+            f"p90={stats['p90_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms max={stats['max_ms']:8.2f}ms")
@@ -0,0 +1,83 @@
+"""Latência de GET /component/search num catálogo grande.
+
+    python benchmarks/component_search.py --components 500000
+
+O catálogo é gerado direto no banco (INSERT em lote; os triggers alimentam o índice FTS5) e as buscas
+passam pela aplicação inteira. --like compara com a busca por substring usada sem FTS5.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+
+BRANDS = ["Schneider", "Siemens", "WEG", "ABB", "Steck", "Tramontina", "Pial", "Sil", "Cobrecom", "Margirius"]
+KINDS = ["Disjuntor", "Contator", "Relé", "Cabo", "Tomada", "Interruptor", "Fusível", "Barramento", "Terminal", "Eletroduto"]
+DETAILS = ["monopolar", "bipolar", "tripolar", "flexível", "rígido", "térmico", "auxiliar", "industrial", "residencial", "blindado"]
+QUERIES = ["disj", "disjuntor bipolar", "weg contator", "DI-0012", "cabo flex 16", "schneider relé térmico", "TO-499999", "x", "barramento industrial 63"]
+
+
+def seed(components: int, batch: int = 20_000):
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from project_management.utils import database, models
+
+    rng = random.Random(7)
+    with Session(database.engine) as db:
+        user = models.User(username="bench", email="bench@example.com", password="x")
+        db.add(user)
+        db.commit()
+        for start in range(0, components, batch):
+            rows = []
+            for index in range(start, min(start + batch, components)):
+                kind = rng.choice(KINDS)
+                amperage = rng.choice([6, 10, 16, 20, 25, 32, 40, 63])
+                rows.append({"code": f"{kind[:2].upper()}-{index:06d}", "brand": rng.choice(BRANDS),
+                             "name": f"{kind} {rng.choice(DETAILS)} {amperage}A", "amperage_rating": amperage, "voltage": 220,
+                             "watts": amperage * 220, "user_id": user.id})
+            db.execute(insert(models.Component), rows)
+            db.commit()
+
+
+async def run(components: int, repeat: int, like: bool):
+    app = setup_app()
+    from project_management.utils import database, search
+    if like:
+        search.FTS5_AVAILABLE = False
+    database.create_db_and_tables()
+
+    started = time.perf_counter()
+    seed(components)
+    print(f"seeded {components} components in {time.perf_counter() - started:.1f}s (search={'LIKE' if like else 'FTS5'})")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "reader", "password": "bench-password"}
+        await client.post("/user/", json={**credentials, "email": "reader@example.com"})
+        token = (await client.post("/login", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for query in QUERIES:
+            latencies, found = [], 0
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get("/component/search", params={"q": query, "limit": 20}, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                found = len(response.json())
+            print(format_stats(f"{query!r} ({found})", percentiles(latencies)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--components", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20, help="repetições de cada busca")
+    parser.add_argument("--like", action="store_true", help="busca por substring, sem o índice FTS5")
+    args = parser.parse_args()
+    asyncio.run(run(args.components, args.repeat, args.like))
+
+
+if __name__ == "__main__":
+    main()
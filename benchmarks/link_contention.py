@@ -0,0 +1,147 @@
+"""Teste de carga das alterações de quantidade: nenhuma atualização pode se perder com 100 escritores em paralelo.
+
+    python benchmarks/link_contention.py --writers 100 --ops 20
+    python benchmarks/link_contention.py --legacy       # o ler-alterar-gravar anterior, direto no banco
+
+Todos os escritores alteram a mesma linha de um projeto, alternando add-component (+2), PATCH /components (+1)
+e delete-component (-1), pela aplicação inteira num arquivo SQLite. No fim, a quantidade gravada precisa ser a
+inicial mais a soma das alterações aceitas, e os totais do projeto precisam bater com os links. O código de saída é
+1 se alguma atualização se perdeu, se os totais divergem ou se alguma requisição falhou.
+
+Roda com o busy_timeout da aplicação (SQLITE_BUSY_TIMEOUT_MS, 5 s). Com 100 escritores na mesma linha, algumas
+esperas pelo lock de escrita do SQLite passam disso; as rotas repetem a transação (database.retry_locked) e o que
+ainda falhar volta como 503, que aqui conta como falha. --busy-timeout muda a espera.
+
+--legacy repete a carga com o algoritmo anterior (ler a quantidade, somar no Python e gravar o valor), em threads
+direto na sessão, para mostrar que o teste detecta atualizações perdidas. tests/test_link_contention.py faz as mesmas
+verificações no test suite, com menos alterações por escritor.
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+from seed import PASSWORD, seed_database
+
+INITIAL_QUANTITY = 1000
+OPERATIONS = [
+    ("PATCH", "/project/1/add-component", {"id": 1, "quantity": 2}, 2),
+    ("PATCH", "/project/1/components", [{"id": 1, "quantity": 1}], 1),
+    ("DELETE", "/project/1/delete-component", {"id": 1, "quantity": 1}, -1),
+]
+
+
+def prepare():
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from project_management.repository import summary_repo
+    from project_management.utils import database, models
+
+    seed_database(database.engine, users=1, components=10, projects=1, links=1)
+    with Session(database.engine) as db:
+        db.execute(models.ProjectComponentLink.__table__.delete())
+        db.execute(insert(models.ProjectComponentLink).values(project_id=1, component_id=1, component_quantity=INITIAL_QUANTITY))
+        summary_repo.rebuild(db)
+
+
+def stored_quantity():
+    from sqlmodel import Session, select
+    from project_management.repository import summary_repo
+    from project_management.utils import database, models
+
+    with Session(database.engine) as db:
+        quantity = db.exec(select(models.ProjectComponentLink.component_quantity)
+                           .where(models.ProjectComponentLink.project_id == 1, models.ProjectComponentLink.component_id == 1)).one()
+        return quantity, summary_repo.verify(db)
+
+
+async def run_app(app, writers: int, ops: int):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        token = (await client.post("/login", data={"username": "bench0", "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        applied, latencies, failures = 0, [], {}
+
+        async def writer(index: int):
+            nonlocal applied
+            for op in range(ops):
+                method, url, body, delta = OPERATIONS[(index + op) % len(OPERATIONS)]
+                started = time.perf_counter()
+                response = await client.request(method, url, json=body, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code == 200:
+                    applied += delta
+                else:
+                    failures[response.status_code] = failures.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[writer(index) for index in range(writers)])
+        elapsed = time.perf_counter() - started
+    print(format_stats("writes", percentiles(latencies)) + f" {len(latencies) / elapsed:.0f} writes/s")
+    return applied, failures
+
+
+def run_legacy(writers: int, ops: int):
+    from sqlmodel import Session, select
+    from project_management.utils import database, models
+
+    link = models.ProjectComponentLink
+    applied, failures, lock = 0, {}, threading.Lock()
+
+    def writer(index: int):
+        nonlocal applied
+        for op in range(ops):
+            delta = OPERATIONS[(index + op) % len(OPERATIONS)][3]
+            try:
+                with Session(database.engine) as db:
+                    existing = db.exec(select(link).where(link.project_id == 1, link.component_id == 1)).one()
+                    existing.component_quantity += delta
+                    db.add(existing)
+                    db.commit()
+                with lock:
+                    applied += delta
+            except Exception as exc:
+                with lock:
+                    failures[type(exc).__name__] = failures.get(type(exc).__name__, 0) + 1
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return applied, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=100)
+    parser.add_argument("--ops", type=int, default=20, help="alterações por escritor")
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--busy-timeout", type=int, default=None, help="PRAGMA busy_timeout em ms (padrão: o da aplicação)")
+    args = parser.parse_args()
+
+    from project_management.utils import database
+    if args.busy_timeout is not None:
+        database.SQLITE_BUSY_TIMEOUT_MS = args.busy_timeout
+    app = setup_app()
+    prepare()
+    if args.legacy:
+        applied, failures = run_legacy(args.writers, args.ops)
+    else:
+        applied, failures = asyncio.run(run_app(app, args.writers, args.ops))
+
+    quantity, drift = stored_quantity()
+    lost = INITIAL_QUANTITY + applied - quantity
+    print(f"{args.writers} writers x {args.ops} ops: expected quantity {INITIAL_QUANTITY + applied}, stored {quantity}, lost updates {lost}")
+    print(f"failed requests: {failures or 0}")
+    if not args.legacy:
+        print(f"project totals: {'consistent' if not drift else drift}")
+    return 1 if lost or failures or (drift and not args.legacy) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
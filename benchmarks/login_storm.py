@@ -0,0 +1,79 @@
+"""Latência de um endpoint sem relação com login enquanto vários logins concorrentes rodam.
+
+    python benchmarks/login_storm.py --compare
+
+--compare roda o cenário duas vezes: com o bcrypt na thread do event loop (HASH_MAX_WORKERS=0)
+e com o executor dedicado, para comparar o p99 do endpoint medido.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+
+
+async def run(concurrency: int, probes: int):
+    app = setup_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "bench", "password": "bench-password"}
+        await client.post("/user/", json={**credentials, "email": "bench@example.com"})
+        token = (await client.post("/login", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        stop = asyncio.Event()
+        logins = 0
+
+        async def storm():
+            nonlocal logins
+            while not stop.is_set():
+                await client.post("/login", data=credentials)
+                logins += 1
+
+        async def probe():
+            latencies = []
+            for _ in range(probes):
+                started = time.perf_counter()
+                await client.get("/user/1", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+            return latencies
+
+        baseline = await probe()
+        workers = [asyncio.create_task(storm()) for _ in range(concurrency)]
+        started = time.perf_counter()
+        during = await probe()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*workers)
+
+    mode = "inline" if os.getenv("HASH_MAX_WORKERS") == "0" else f"executor({os.getenv('HASH_MAX_WORKERS', 'default')})"
+    print(f"hashing={mode} bcrypt_rounds={os.getenv('BCRYPT_ROUNDS', '12')} concurrent_logins={concurrency}")
+    print(format_stats("GET /user/{id} idle", percentiles(baseline)))
+    print(format_stats("GET /user/{id} during logins", percentiles(during)))
+    print(f"{'logins/s':<32} {logins / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16, help="logins simultâneos")
+    parser.add_argument("--probes", type=int, default=200, help="requisições medidas")
+    parser.add_argument("--compare", action="store_true", help="roda com bcrypt inline e com o executor")
+    args = parser.parse_args()
+
+    if not args.compare:
+        asyncio.run(run(args.concurrency, args.probes))
+        return
+    for workers in ("0", os.getenv("HASH_MAX_WORKERS", "4")):
+        env = {**os.environ, "HASH_MAX_WORKERS": workers}
+        subprocess.run([sys.executable, __file__, "--concurrency", str(args.concurrency), "--probes", str(args.probes)], env=env, check=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Auditoria dos planos de consulta: roda EXPLAIN QUERY PLAN em cada comando SQL que os endpoints emitem.
+
+    python benchmarks/query_plans.py                 # falha (código 1) se um caminho quente faz full scan
+    python benchmarks/query_plans.py --verbose       # mostra o plano de todos os comandos
+
+Gera um banco SQLite com seed.py e chama os endpoints do suite.py, mais as escritas que ele não cobre (criar
+projeto, adicionar/remover componente por id e por código, alterar e apagar componente...), capturando os comandos
+na engine. Depois do tráfego, cada comando distinto é explicado com os parâmetros com que foi executado. Um
+"SCAN <tabela>" sem índice é full scan: numa tabela listada para o cenário em FULL_SCAN_ALLOWED vira aviso, em
+qualquer outro caso é erro. tests/test_query_plans.py roda a mesma auditoria no test suite.
+"""
+import argparse
+import asyncio
+import re
+import sys
+
+import httpx
+
+from common import setup_app
+from seed import PASSWORD, seed_database
+from suite import scenarios as suite_scenarios
+
+# Tabelas que cada cenário pode percorrer inteiras; um SCAN em outra tabela ou em outro cenário é erro
+FULL_SCAN_ALLOWED = {
+    # Listas sem filtro: o SCAN segue a chave primária, que é a ordem da paginação, e para no LIMIT da página. O custo
+    # é o da página, não o da tabela
+    "GET /user/": {"user"},
+    "GET /project/": {"project"},
+    "GET /component/": {"component"},
+    # scope=all soma os links de todos os projetos: cada projeto entra no resultado, então ler todos é o próprio
+    # trabalho e nenhum índice o evita. Os links de cada projeto vêm pelo índice da chave primária
+    "GET /analytics/projects": {"project"},
+    "GET /analytics/stats": {"project"},
+    # Lista de materiais de todos os projetos: agrupa todos os links por componente, percorrendo component na ordem
+    # do id e buscando os links de cada um pelo índice de component_id
+    "POST /export/bom all": {"component"},
+}
+
+SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?( USING (?:COVERING )?INDEX \w+| USING INTEGER PRIMARY KEY.*)?$")
+
+
+def write_scenarios(counts: dict, codes: dict, created: int):
+    projects, components = counts["projects"], counts["components"]
+
+    def project_id(i):
+        return 1 + (i * 7919) % projects
+
+    def component_id(i):
+        return 1 + (i * 104729) % components
+
+    def new_component(i, context):
+        return "POST", "/component/", {"json": {"code": f"PLAN-{i:05d}", "brand": "Plan", "name": f"Plan {i}", "amperage_rating": 10, "voltage": 220}}
+
+    def delete_component(i, context):
+        # Alterna entre um componente recém-criado (sem links) e um do seed (ligado a projetos: 400)
+        return "DELETE", f"/component/{components + 1 + i // 2 if i % 2 == 0 else component_id(i)}", {}
+
+    return [
+        ("POST /project/", None, lambda i, context: ("POST", "/project/", {"json": {"name": f"Plan {i}"}})),
+        ("PATCH /project/{id}/add-component id", None, lambda i, context: ("PATCH", f"/project/{project_id(i)}/add-component", {"json": {"id": component_id(i), "quantity": 1}})),
+        ("PATCH /project/{id}/add-component code", None, lambda i, context: ("PATCH", f"/project/{project_id(i)}/add-component", {"json": {"code": codes[component_id(i)], "quantity": 1}})),
+        ("DELETE /project/{id}/delete-component", None, lambda i, context: ("DELETE", f"/project/{project_id(i)}/delete-component", {"json": {"id": component_id(i), "quantity": 1}})),
+        ("PATCH /component/{id}", None, lambda i, context: ("PATCH", f"/component/{component_id(i)}", {"json": {"code": codes[component_id(i)], "brand": "Plan", "name": f"Renamed {i}", "amperage_rating": 10, "voltage": 220}})),
+        ("POST /component/", None, new_component),
+        ("DELETE /component/{id}", None, delete_component),
+        # Projetos criados em POST /project/, ainda sem componentes (depois dos `created` projetos dos cenários do suite)
+        ("DELETE /project/{id}", None, lambda i, context: ("DELETE", f"/project/{projects + created + 1 + i}", {})),
+    ]
+
+
+class StatementCapture():
+    def __init__(self):
+        self.scenario = None
+        self.statements = {}  # (cenário, sql) -> parâmetros da primeira execução
+        self.server_errors = {}  # cenário -> respostas 5xx (os comandos desses cenários podem faltar)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.scenario is None or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            return
+        self.statements.setdefault((self.scenario, statement), parameters[0] if executemany else parameters)
+
+
+def full_scans(plan: list[str], tables: set[str]):
+    scans = []
+    for detail in plan:
+        match = SCAN.match(detail)
+        if match and match.group(1) in tables and match.group(2) is None:
+            scans.append(match.group(1))
+    return scans
+
+
+async def drive(app, counts: dict, codes: dict, capture: StatementCapture, requests: int):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://plans", timeout=None) as client:
+        token = (await client.post("/login", data={"username": "bench0", "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        context = {"etags": {}}
+        # Os clones do suite.py são os únicos projetos criados antes dos de write_scenarios
+        clones = sum(min(requests, limit or requests) for name, limit, _ in suite_scenarios(counts) if name.endswith("/clone"))
+        for name, limit, build in suite_scenarios(counts) + write_scenarios(counts, codes, clones):
+            capture.scenario = name
+            for i in range(min(requests, limit or requests)):
+                method, url, kwargs = build(i, context)
+                response = await client.request(method, url, headers={**headers, **kwargs.pop("headers", {})}, **kwargs)
+                if "etag" in response.headers:
+                    context["etags"][url] = response.headers["etag"]
+                if response.status_code >= 500:
+                    capture.server_errors[name] = capture.server_errors.get(name, 0) + 1
+            capture.scenario = None
+
+
+# Roda os cenários contra o app (com o banco de engine já populado pelo seed) e explica cada comando capturado.
+# Retorna [(cenário, comando, plano, tabelas percorridas, tabelas percorridas fora de FULL_SCAN_ALLOWED)] e as
+# respostas 5xx por cenário
+def audit(app, engine, counts: dict, requests: int):
+    from sqlalchemy import event, select
+    from sqlmodel import Session, SQLModel
+    from project_management.utils import models
+
+    with Session(engine) as db:
+        codes = dict(db.exec(select(models.Component.id, models.Component.code)).all())
+
+    capture = StatementCapture()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        asyncio.run(drive(app, counts, codes, capture, requests))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    tables = set(SQLModel.metadata.tables)
+    results = []
+    with engine.connect() as connection:
+        for (scenario, statement), parameters in capture.statements.items():
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            scans = full_scans(plan, tables)
+            unexpected = [table for table in scans if table not in FULL_SCAN_ALLOWED.get(scenario, set())]
+            results.append((scenario, statement, plan, scans, unexpected))
+    return results, capture.server_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--components", type=int, default=2_000)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--links", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=4, help="requisições por cenário")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    app = setup_app()
+    from project_management.utils import database
+
+    counts = seed_database(database.engine, args.users, args.components, args.projects, args.links)
+    results, server_errors = audit(app, database.engine, counts, args.requests)
+
+    failures, warnings = 0, 0
+    for scenario, statement, plan, scans, unexpected in results:
+        if unexpected:
+            failures += 1
+            label = f"FULL SCAN ({', '.join(unexpected)})"
+        elif scans:
+            warnings += 1
+            label = "allowed"
+        else:
+            label = None
+        if label or args.verbose:
+            print(f"[{scenario}] {label or 'ok'}")
+            print("    " + " ".join(statement.split()))
+            for detail in plan:
+                print(f"      {detail}")
+    for scenario, errors in server_errors.items():
+        print(f"[{scenario}] {errors} responses with status 5xx: statements after the error were not captured")
+    print(f"{len(results)} statements checked: {failures} full scans on hot paths, {warnings} allowed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
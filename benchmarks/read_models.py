@@ -0,0 +1,128 @@
+"""Custo por 10 mil linhas das leituras quentes: objetos ORM + response_model contra colunas + FastJSONResponse.
+
+    python benchmarks/read_models.py --rows 10000 --repeat 5
+
+Para cada leitura, o caminho "orm" é o anterior (select do modelo de tabela, objetos no identity map, validação
+do response_model a partir dos atributos e serialização) e o "lean" é o atual (select só das colunas da resposta,
+dicts serializados direto). As listas são lidas em páginas de 1000; o detalhe é um projeto com --rows linhas.
+A saída mostra a latência e o pico de bytes alocados (tracemalloc) por 10 mil linhas.
+"""
+import argparse
+import time
+import tracemalloc
+
+from common import setup_app
+from seed import seed_database
+
+PAGE_SIZE = 1000
+
+
+def paths(rows: int, project_id: int):
+    from pydantic import TypeAdapter
+    from sqlmodel import select
+    from project_management.repository import component_repo, project_repo, user_repo
+    from project_management.utils import models
+    from project_management.utils.pagination import PageParams, encode_cursor, paginate
+
+    def pages():
+        # ids contíguos do seed: o cursor da página k é o último id da página anterior
+        return [PageParams(cursor=encode_cursor([k * PAGE_SIZE, k * PAGE_SIZE]) if k else None, limit=PAGE_SIZE)
+                for k in range(rows // PAGE_SIZE)]
+
+    def orm_list(model, response_model):
+        adapter = TypeAdapter(models.Page[response_model])
+
+        def run(db, user):
+            for page in pages():
+                result = paginate(db, select(model), model.id, model.id, page)
+                adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+        return run
+
+    def lean_list(read):
+        def run(db, user):
+            for page in pages():
+                read(db, user, page).body
+        return run
+
+    def orm_project(db, user):
+        adapter = TypeAdapter(models.ProjectPublic)
+        adapter.dump_json(adapter.validate_python(project_repo.get_project(project_id, db), from_attributes=True))
+
+    def lean_project(db, user):
+        project_repo.get_project_conditional(project_id, {}, db).body
+
+    return [
+        ("GET /component/", orm_list(models.Component, models.Component),
+         lean_list(lambda db, user, page: component_repo.get_all_components(db, page))),
+        ("GET /user/projects", orm_list(models.Project, models.ProjectRead),
+         lean_list(lambda db, user, page: user_repo.get_all_user_projects(db, user, page))),
+        ("GET /user/", orm_list(models.User, models.UserPublic),
+         lean_list(lambda db, user, page: user_repo.get_all_users(db, page))),
+        ("GET /project/{id}", orm_project, lean_project),
+    ]
+
+
+def measure(run, user, repeat: int):
+    from sqlmodel import Session
+    from project_management.repository import project_repo
+    from project_management.utils import database
+
+    latencies = []
+    for _ in range(repeat):
+        project_repo.project_cache.clear()
+        with Session(database.engine) as db:
+            started = time.perf_counter()
+            run(db, user)
+            latencies.append(time.perf_counter() - started)
+
+    project_repo.project_cache.clear()
+    with Session(database.engine) as db:
+        tracemalloc.start()
+        run(db, user)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(latencies), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="linhas lidas por endpoint (múltiplo de 1000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_app()
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from project_management.repository import summary_repo
+    from project_management.utils import database, models
+
+    seed_database(database.engine, users=args.rows, components=args.rows, projects=args.rows, links=1)
+    with Session(database.engine) as db:
+        user = db.get(models.User, 1)
+        # Projetos do seed divididos entre os usuários: o usuário 1 recebe todos para a lista de /user/projects
+        db.execute(models.Project.__table__.update().values(user_id=user.id))
+        project = models.Project(name="Read models", user_id=user.id)
+        db.add(project)
+        db.flush()
+        db.execute(insert(models.ProjectComponentLink), [{"project_id": project.id, "component_id": component_id, "component_quantity": 1 + component_id % 7}
+                                                         for component_id in range(1, args.rows + 1)])
+        summary_repo.recompute(db, [project.id])
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        project_id = project.id
+
+    scale = 10_000 / args.rows
+    print(f"{'endpoint':<20} {'path':<5} {'ms/10k':>9} {'peak KiB/10k':>13}")
+    for name, orm, lean in paths(args.rows, project_id):
+        results = {}
+        for label, run in (("orm", orm), ("lean", lean)):
+            results[label] = measure(run, user, args.repeat)
+            elapsed, peak = results[label]
+            print(f"{name:<20} {label:<5} {elapsed * 1000 * scale:9.1f} {peak / 1024 * scale:13.0f}")
+        (orm_elapsed, orm_peak), (lean_elapsed, lean_peak) = results["orm"], results["lean"]
+        print(f"{'':<20} {'':<5} {orm_elapsed / lean_elapsed:8.1f}x {orm_peak / lean_peak:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
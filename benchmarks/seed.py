@@ -0,0 +1,80 @@
+"""Gerador de dados sintéticos e determinísticos para os benchmarks.
+
+    python benchmarks/seed.py bench.db --users 10 --components 5000 --projects 2000 --links 20
+
+Também usado pelo suite.py; as mesmas opções e a mesma semente geram sempre o mesmo banco.
+"""
+import argparse
+import random
+import time
+
+from common import ROOT  # noqa: F401  (ajusta o sys.path)
+
+BRANDS = ["Schneider", "Siemens", "WEG", "ABB", "Steck", "Tramontina", "Pial", "Sil", "Cobrecom", "Margirius"]
+KINDS = ["Disjuntor", "Contator", "Relé", "Cabo", "Tomada", "Interruptor", "Fusível", "Barramento", "Terminal", "Eletroduto"]
+DETAILS = ["monopolar", "bipolar", "tripolar", "flexível", "rígido", "térmico", "auxiliar", "industrial", "residencial", "blindado"]
+PASSWORD = "bench-password"
+BATCH_SIZE = 20_000
+
+
+def _chunks(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+# Popula o banco (tabelas já criadas) e devolve a contagem do que foi gerado. Usuários são bench0..benchN com a
+# senha PASSWORD; componentes e projetos são divididos entre eles e cada projeto recebe de 1 a `links` componentes
+def seed_database(engine, users: int, components: int, projects: int, links: int, seed: int = 7):
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from project_management.repository import summary_repo
+    from project_management.utils import hashing, models
+
+    rng = random.Random(seed)
+    password = hashing.pwd_context.hash(PASSWORD)  # um hash só: o bcrypt domina o tempo de geração
+    with Session(engine) as db:
+        db.execute(insert(models.User), [{"username": f"bench{index}", "email": f"bench{index}@example.com", "password": password}
+                                         for index in range(users)])
+        component_rows = []
+        for index in range(components):
+            kind = rng.choice(KINDS)
+            amperage = rng.choice([6, 10, 16, 20, 25, 32, 40, 63])
+            component_rows.append({"code": f"{kind[:2].upper()}-{index:06d}", "brand": rng.choice(BRANDS),
+                                   "name": f"{kind} {rng.choice(DETAILS)} {amperage}A", "amperage_rating": amperage,
+                                   "voltage": 220, "watts": amperage * 220, "user_id": 1 + index % users})
+        for chunk in _chunks(component_rows):
+            db.execute(insert(models.Component), chunk)
+            db.execute(insert(models.ComponentCode), [{"code": row["code"], "user_id": row["user_id"]} for row in chunk])
+        for chunk in _chunks([{"name": f"Project {index}", "user_id": 1 + index % users} for index in range(projects)]):
+            db.execute(insert(models.Project), chunk)
+        link_rows = []
+        for project_id in range(1, projects + 1):
+            for component_id in rng.sample(range(1, components + 1), rng.randint(1, min(links, components))):
+                link_rows.append({"project_id": project_id, "component_id": component_id, "component_quantity": rng.randint(1, 20)})
+        for chunk in _chunks(link_rows):
+            db.execute(insert(models.ProjectComponentLink), chunk)
+        db.commit()
+        summary_repo.backfill(db)
+    return {"users": users, "components": components, "projects": projects, "links": len(link_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="arquivo SQLite a criar")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--components", type=int, default=5_000)
+    parser.add_argument("--projects", type=int, default=2_000)
+    parser.add_argument("--links", type=int, default=20, help="máximo de componentes por projeto")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from project_management.utils import database
+    database.engine = database.make_engine(f"sqlite:///{args.path}")
+    database.create_db_and_tables()
+    started = time.perf_counter()
+    counts = seed_database(database.engine, args.users, args.components, args.projects, args.links, args.seed)
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
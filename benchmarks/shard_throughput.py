@@ -0,0 +1,114 @@
+"""Vazão de escritas com muitos usuários gravando ao mesmo tempo: um banco só contra 1, 2, 4... shards.
+
+    python benchmarks/shard_throughput.py --shards 0 1 2 4 --tenants 16 --workers 4 --duration 5
+
+Para cada valor de --shards (0 = sem sharding), um diretório novo recebe --tenants usuários pela API, cada um com
+um componente e um projeto; com sharding, POST /user/ distribui os usuários entre os shards. Depois, --workers
+processos, cada um com a sua instância da aplicação (como os workers do uvicorn), dividem os usuários e cada usuário
+faz PATCH add-component em laço no próprio projeto durante --duration segundos. A saída mostra escritas/s, a
+latência e as requisições que falharam ("database is locked" depois do busy_timeout). Com um banco só, todas as
+escritas disputam o mesmo lock; com sharding, só as dos usuários do mesmo shard.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import format_stats, percentiles, setup_app
+
+PASSWORD = "bench-password"
+
+
+async def prepare(app, tenants: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        sessions = []
+        for index in range(tenants):
+            username = f"tenant{index}"
+            await client.post("/user/", json={"username": username, "email": f"{username}@example.com", "password": PASSWORD})
+            token = (await client.post("/login", data={"username": username, "password": PASSWORD})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            await client.post("/component/", json={"code": f"T{index}", "brand": "Bench", "name": "Tenant", "amperage_rating": 1, "voltage": 220}, headers=headers)
+            await client.post("/project/", json={"name": f"Tenant {index}"}, headers=headers)
+            project_id = (await client.get("/user/projects", headers=headers)).json()["items"][0]["id"]
+            sessions.append((headers, project_id, f"T{index}"))
+        return sessions
+
+
+def worker(db_path: str, sessions: list, duration: float, results):
+    app = setup_app(db_path)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            latencies, failures = [], 0
+            deadline = time.perf_counter() + duration
+
+            async def tenant(headers, project_id, code):
+                nonlocal failures
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    response = await client.patch(f"/project/{project_id}/add-component", json={"code": code, "quantity": 1}, headers=headers)
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        failures += 1
+
+            await asyncio.gather(*[tenant(*session) for session in sessions])
+            return latencies, failures
+
+    results.put(asyncio.run(run()))
+
+
+def run(tenants: int, workers: int, duration: float):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="powerflow-bench-"), "bench.db")
+    app = setup_app(db_path)
+    from project_management.utils import sharding
+    sessions = asyncio.run(prepare(app, tenants))
+
+    # spawn: cada processo abre as próprias conexões, como um worker novo
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(db_path, sessions[index::workers], duration, results)) for index in range(workers)]
+    for process in processes:
+        process.start()
+    latencies, failures = [], 0
+    for _ in processes:
+        worker_latencies, worker_failures = results.get()
+        latencies += worker_latencies
+        failures += worker_failures
+    for process in processes:
+        process.join()
+
+    label = f"{sharding.SHARD_COUNT} shards" if sharding.sharded() else "single database"
+    print(format_stats(label, percentiles(latencies)) + f" {len(latencies) / duration:.0f} writes/s, {failures} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 2, 4], help="0 = sem sharding")
+    parser.add_argument("--tenants", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4, help="processos da aplicação")
+    parser.add_argument("--duration", type=float, default=5, help="segundos de medição")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.tenants, args.workers, args.duration)
+        return
+    # Um processo por configuração: SHARD_COUNT e SHARD_URL são lidos na importação
+    for shards in args.shards:
+        shard_dir = tempfile.mkdtemp(prefix="powerflow-shards-")
+        env = {**os.environ, "SHARD_COUNT": str(shards), "SHARD_URL": f"sqlite:///{shard_dir}/shard_{{shard}}.db"}
+        subprocess.run([sys.executable, __file__, "--run", "--tenants", str(args.tenants), "--workers", str(args.workers),
+                        "--duration", str(args.duration)], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
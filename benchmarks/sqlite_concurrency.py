@@ -0,0 +1,110 @@
+"""Latência de leitores enquanto um escritor grava continuamente no mesmo arquivo SQLite.
+
+    python benchmarks/sqlite_concurrency.py --compare
+
+--compare roda com SQLITE_JOURNAL_MODE=DELETE (o padrão do SQLite) e com WAL. Em DELETE, leitura e
+commit se excluem: o commit espera os leitores saírem e, enquanto espera, bloqueia novas leituras.
+Em WAL os leitores seguem o snapshot já gravado e o escritor grava em paralelo.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import ROOT, format_stats, percentiles  # noqa: F401  (ROOT ajusta o sys.path)
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select
+
+
+def writer(url: str, user_id: int, batch: int, stop, written):
+    # Processo separado: o escritor não disputa o GIL com os leitores
+    from project_management.utils import database, models
+
+    engine = database.make_engine(url)
+    while not stop.is_set():
+        rows = [{"code": f"W{written.value + index}", "brand": "Bench", "name": "Writer", "amperage_rating": 1, "watts": 1, "user_id": user_id}
+                for index in range(batch)]
+        with Session(engine) as db:
+            db.execute(insert(models.Component), rows)
+            db.commit()
+        written.value += batch
+
+
+def run(readers: int, duration: float, batch: int, seed: int):
+    from project_management.utils import database, models
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='powerflow-bench-'), 'bench.db')}"
+    engine = database.make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = models.User(username="bench", email="bench@example.com", password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        # Tabela inicial grande o bastante para cada leitura levar alguns milissegundos
+        db.execute(insert(models.Component), [{"code": f"S{index}", "brand": "Bench", "name": "Seed", "amperage_rating": 1, "watts": index % 100, "user_id": user_id}
+                                              for index in range(seed)])
+        db.commit()
+
+    stop = multiprocessing.Event()
+    written = multiprocessing.Value("i", 0)
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def reader():
+        nonlocal errors
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with Session(engine) as db:
+                    db.exec(select(func.count(), func.sum(models.Component.watts)).where(models.Component.id <= seed)).one()
+            except OperationalError:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    process = multiprocessing.Process(target=writer, args=(url, user_id, batch, stop, written))
+    process.start()
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    process.join()
+
+    print(f"journal_mode={database.SQLITE_JOURNAL_MODE} readers={readers} read_errors={errors}")
+    print(format_stats("reader query", percentiles(latencies)))
+    print(f"{'reads/s':<32} {len(latencies) / duration:.1f}")
+    print(f"{'rows written/s':<32} {written.value / duration:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8, help="threads de leitura")
+    parser.add_argument("--duration", type=float, default=5, help="segundos de medição")
+    parser.add_argument("--batch", type=int, default=500, help="linhas por transação do escritor")
+    parser.add_argument("--seed", type=int, default=100_000, help="componentes gravados antes da medição")
+    parser.add_argument("--compare", action="store_true", help="roda com journal_mode DELETE e WAL")
+    args = parser.parse_args()
+
+    if not args.compare:
+        run(args.readers, args.duration, args.batch, args.seed)
+        return
+    for mode in ("DELETE", "WAL"):
+        env = {**os.environ, "SQLITE_JOURNAL_MODE": mode}
+        subprocess.run([sys.executable, __file__, "--readers", str(args.readers), "--duration", str(args.duration), "--batch", str(args.batch), "--seed", str(args.seed)], env=env, check=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
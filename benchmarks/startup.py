@@ -0,0 +1,96 @@
+"""Tempo de cold start de um worker: import da aplicação e lifespan, cada amostra num interpretador novo.
+
+    python benchmarks/startup.py                     # banco já migrado, com 2000 projetos
+    python benchmarks/startup.py --budget-ms 1500 --runs 10
+
+Mede o import de project_management.main e o startup (migrações e retomada dos jobs de exportação) num banco
+atualizado; para comparação, mede também o startup com o create_all + backfill dos resumos que o boot fazia antes
+do controle de versão do esquema. O código de saída é 1 quando o p50 de import + startup passa do orçamento,
+quando o openpyxl é carregado no boot ou quando o banco não termina na última versão do esquema.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT
+
+PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import project_management.main as main
+imported = time.perf_counter()
+
+if sys.argv[1] == "legacy":
+    # O boot de antes: create_all e backfill dos resumos a cada start
+    from sqlmodel import Session, SQLModel
+    from project_management.repository import summary_repo
+    from project_management.utils import database
+
+    def create_all():
+        SQLModel.metadata.create_all(database.engine)
+        with Session(database.engine) as db:
+            summary_repo.backfill(db)
+        return []
+    main.create_db_and_tables = create_all
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+from project_management.utils import database, migrations
+with database.engine.connect() as connection:
+    version = migrations.current_version(connection)
+print(json.dumps({"import": imported - started, "startup": ready - imported, "version": version,
+                  "openpyxl": "openpyxl" in sys.modules}))
+"""
+
+
+def probe(url: str, mode: str = "current"):
+    env = {**os.environ, "DATABASE_URL": url, "PYTHONPATH": ROOT}
+    output = subprocess.run([sys.executable, "-c", PROBE, mode], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=2_000)
+    parser.add_argument("--budget-ms", type=float, default=2000, help="orçamento para o p50 de import + startup")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="powerflow-bench-"), "bench.db")
+    seed = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed.py")
+    subprocess.run([sys.executable, seed, path, "--projects", str(args.projects)], check=True, capture_output=True)
+    url = f"sqlite:///{path}"
+
+    from project_management.utils import migrations
+    samples = [probe(url) for _ in range(args.runs)]
+    legacy = [probe(url, "legacy")["startup"] * 1000 for _ in range(args.runs)]
+    imports = [sample["import"] * 1000 for sample in samples]
+    startups = [sample["startup"] * 1000 for sample in samples]
+    totals = [a + b for a, b in zip(imports, startups)]
+    print(f"import app          p50={statistics.median(imports):8.1f}ms max={max(imports):8.1f}ms")
+    print(f"startup (migrated)  p50={statistics.median(startups):8.1f}ms max={max(startups):8.1f}ms")
+    print(f"import + startup    p50={statistics.median(totals):8.1f}ms budget={args.budget_ms:.0f}ms")
+    print(f"startup (legacy)    p50={statistics.median(legacy):8.1f}ms max={max(legacy):8.1f}ms  create_all + backfill")
+
+    failures = []
+    if statistics.median(totals) > args.budget_ms:
+        failures.append("over budget")
+    if any(sample["openpyxl"] for sample in samples):
+        failures.append("openpyxl imported at startup")
+    if any(sample["version"] != migrations.LATEST_VERSION for sample in samples):
+        failures.append("schema not at the latest version")
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
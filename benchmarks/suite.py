@@ -0,0 +1,206 @@
+"""Suite de benchmarks: todos os routers, com percentis, vazão e número de comandos SQL por endpoint.
+
+    python benchmarks/suite.py                      # roda e compara com benchmarks/baseline.json
+    python benchmarks/suite.py --save-baseline      # grava o resultado como nova baseline
+    python benchmarks/suite.py --projects 10000 --only project
+
+Cada execução gera um banco SQLite descartável com seed.py (volumes configuráveis) e chama a aplicação
+em processo por um cliente ASGI. A comparação só é feita quando os volumes são os mesmos da baseline;
+o código de saída é 1 quando algum endpoint regrediu: p50 acima da tolerância ou mais SQL por requisição.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+import httpx
+
+from common import percentiles, setup_app
+from seed import PASSWORD, seed_database
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class SQLCounter():
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+
+    def __call__(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+    def attach(self, engine):
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", self)
+
+
+# (nome, número máximo de requisições ou None, função(i, contexto) -> (método, url, kwargs))
+def scenarios(counts: dict):
+    projects, components = counts["projects"], counts["components"]
+
+    def project_id(i):
+        return 1 + (i * 7919) % projects  # espalha as leituras pelo banco
+
+    def component_id(i):
+        return 1 + (i * 104729) % components
+
+    def conditional(i, context):
+        url = f"/project/{project_id(i)}"
+        return "GET", url, {"headers": {"If-None-Match": context["etags"].get(url, '"none"')}}
+
+    def components_delta(i, context):
+        # Pares +1/-1 no mesmo componente: o banco volta ao estado inicial a cada duas requisições
+        return "PATCH", f"/project/{project_id(i // 2)}/components", {"json": [{"id": component_id(i // 2), "quantity": 1 if i % 2 == 0 else -1}]}
+
+    return [
+        ("POST /login", 10, lambda i, context: ("POST", "/login", {"data": {"username": "bench0", "password": PASSWORD}})),
+        ("GET /user/{id}", None, lambda i, context: ("GET", f"/user/{1 + i % counts['users']}", {})),
+        ("GET /user/", None, lambda i, context: ("GET", "/user/", {"params": {"limit": 100}})),
+        ("GET /user/projects", None, lambda i, context: ("GET", "/user/projects", {"params": {"limit": 100}})),
+        ("GET /user/components", None, lambda i, context: ("GET", "/user/components", {"params": {"limit": 100}})),
+        ("GET /project/{id}", None, lambda i, context: ("GET", f"/project/{project_id(i)}", {})),
+        ("GET /project/{id} 304", None, conditional),
+        ("GET /project/", None, lambda i, context: ("GET", "/project/", {"params": {"limit": 100}})),
+        ("PATCH /project/{id}", None, lambda i, context: ("PATCH", f"/project/{project_id(i)}", {"json": {"name": f"Project {project_id(i) - 1}"}})),
+        ("PATCH /project/{id}/components", None, components_delta),
+        ("GET /component/{id}", None, lambda i, context: ("GET", f"/component/{component_id(i)}", {})),
+        ("GET /component/", None, lambda i, context: ("GET", "/component/", {"params": {"limit": 100}})),
+        ("GET /component/search", None, lambda i, context: ("GET", "/component/search", {"params": {"q": ["disj", "cabo flex", "weg 16", "DI-00"][i % 4]}})),
+        ("GET /export/export/{id} csv", None, lambda i, context: ("GET", f"/export/export/{project_id(i)}", {"params": {"format": "csv"}})),
+        ("GET /export/export/{id} xlsx", 20, lambda i, context: ("GET", f"/export/export/{project_id(i)}", {"params": {"format": "xlsx"}})),
+        ("POST /export/bulk", 10, lambda i, context: ("POST", "/export/bulk", {"json": {"project_ids": [project_id(i * 5 + k) for k in range(5)]}})),
+        ("POST /export/bom", 10, lambda i, context: ("POST", "/export/bom", {"json": {"format": ["csv", "ndjson"][i % 2]}})),
+        ("POST /export/bom all", 5, lambda i, context: ("POST", "/export/bom", {"json": {"scope": "all"}})),
+        ("GET /analytics/projects", 20, lambda i, context: ("GET", "/analytics/projects", {"params": {"scope": "all", "limit": 100}})),
+        ("GET /analytics/stats", 20, lambda i, context: ("GET", "/analytics/stats", {"params": {"scope": "all"}})),
+        ("GET /changes", None, lambda i, context: ("GET", "/changes/", {"params": {"since": 0, "limit": 500}})),
+        # Por último: as cópias não entram nos ids usados pelos outros cenários
+        ("POST /project/{id}/clone", 20, lambda i, context: ("POST", f"/project/{project_id(i)}/clone", {"json": {"name": f"Clone {i}"}})),
+    ]
+
+
+async def run_scenario(client, headers, build, requests: int, concurrency: int, warmup: int, sql: SQLCounter, context: dict):
+    async def call(i):
+        method, url, kwargs = build(i, context)
+        response = await client.request(method, url, headers={**headers, **kwargs.pop("headers", {})}, **kwargs)
+        if "etag" in response.headers:
+            context["etags"][url] = response.headers["etag"]
+        return response.status_code < 400
+
+    for i in range(warmup):
+        await call(i)
+
+    latencies, errors, counter = [], 0, iter(range(requests))
+    sql_before = sql.count
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            ok = await call(warmup + i)
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stats = percentiles(latencies)
+    return {"requests": requests, "errors": errors, "p50_ms": stats["p50_ms"], "p90_ms": stats["p90_ms"], "p99_ms": stats["p99_ms"],
+            "rps": requests / elapsed, "sql_per_request": (sql.count - sql_before) / requests}
+
+
+def compare(name: str, result: dict, baseline: dict | None, tolerance: float):
+    base = (baseline or {}).get(name)
+    if base is None:
+        return "", False
+    delta = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0
+    # Diferenças abaixo de 1 ms são ruído de medição
+    slower = delta > tolerance and result["p50_ms"] - base["p50_ms"] > 1
+    more_sql = result["sql_per_request"] > base["sql_per_request"] + 0.01
+    flags = " ".join(flag for flag, hit in (("SLOWER", slower), ("MORE-SQL", more_sql)) if hit)
+    return f"{delta:+7.1%} {flags}", slower or more_sql
+
+
+async def run(args):
+    app = setup_app()
+    from project_management.utils import database
+    database.create_db_and_tables()
+
+    started = time.perf_counter()
+    counts = seed_database(database.engine, args.users, args.components, args.projects, args.links, args.seed)
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+    sql = SQLCounter()
+    sql.attach(database.engine)
+    if database.DATABASE_ASYNC:
+        sql.attach(database.get_async_engine().sync_engine)
+
+    config = {**counts, "seed": args.seed, "requests": args.requests, "concurrency": args.concurrency,
+              "async": database.DATABASE_ASYNC}
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            stored = json.load(file)
+        if stored.get("config") == config:
+            baseline = stored["results"]
+        else:
+            print(f"baseline {args.baseline} was recorded with {stored.get('config')}; not comparing")
+
+    results, regressions = {}, []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        token = (await client.post("/login", data={"username": "bench0", "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        context = {"etags": {}}
+
+        print(f"{'endpoint':<34} {'n':>5} {'err':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>8} {'sql/req':>8}  vs baseline")
+        for name, limit, build in scenarios(counts):
+            if args.only and args.only not in name:
+                continue
+            requests = min(args.requests, limit) if limit else args.requests
+            result = await run_scenario(client, headers, build, requests, args.concurrency, args.warmup, sql, context)
+            results[name] = result
+            verdict, regressed = compare(name, result, baseline, args.tolerance)
+            if regressed:
+                regressions.append(name)
+            print(f"{name:<34} {result['requests']:>5} {result['errors']:>4} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} "
+                  f"{result['p99_ms']:>9.2f} {result['rps']:>8.1f} {result['sql_per_request']:>8.2f}  {verdict}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({"config": config, "machine": platform.platform(), "python": platform.python_version(), "results": results}, file, indent=2)
+            file.write("\n")
+        print(f"baseline saved to {args.baseline}")
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--components", type=int, default=5_000)
+    parser.add_argument("--projects", type=int, default=2_000)
+    parser.add_argument("--links", type=int, default=20, help="máximo de componentes por projeto")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--requests", type=int, default=100, help="requisições medidas por endpoint")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", help="só endpoints cujo nome contém este texto")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="aumento de p50 tolerado (0.25 = 25%%)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import sys
+from sqlmodel import Session
+from .utils import database, migrations, sharding
+from .repository import changes_repo, shard_repo, summary_repo
+
+
+# Com sharding, os comandos de dados rodam em cada shard (o 0 é o diretório); sem, só no banco principal
+def _databases():
+    if not sharding.sharded():
+        return [("", database.engine)]
+    return [(f"shard {shard}: ", database.shard_engine(shard)) for shard in shard_repo.shards()]
+
+
+def summaries(args):
+    drifted = 0
+    for label, engine in _databases():
+        with Session(engine) as db:
+            if args.rebuild:
+                print(f"{label}Rebuilt {summary_repo.rebuild(db)} project summaries")
+            drift = summary_repo.verify(db)
+        for project_id, field, stored, expected in drift:
+            print(f"{label}project {project_id}: {field} stored={stored} expected={expected}")
+        drifted += len(drift)
+    print(f"{drifted} drifted values" if drifted else "Project summaries are consistent")
+    return 1 if drifted else 0
+
+
+def migrate(args):
+    applied = database.create_db_and_tables()
+    print(f"Applied migrations {', '.join(map(str, applied))}" if applied else "Schema is up to date")
+    # Os shards são migrados ao serem abertos
+    for label, engine in _databases()[1:]:
+        with engine.connect() as connection:
+            print(f"{label}schema version {migrations.current_version(connection)}")
+    print(f"Schema version {migrations.LATEST_VERSION}")
+    return 0
+
+
+def changes(args):
+    for label, engine in _databases():
+        with Session(engine) as db:
+            print(f"{label}Pruned {changes_repo.prune(db, args.prune_days)} change log entries older than {args.prune_days} days")
+    return 0
+
+
+def shards(args):
+    if not sharding.sharded():
+        print("Sharding is disabled (set SHARD_COUNT)")
+        return 1
+    database.create_db_and_tables()
+    failed = 0
+    if args.move is not None:
+        try:
+            source, projects, components = shard_repo.move_tenant(args.move, args.to, args.grace)
+            print(f"user {args.move}: shard {source} -> {args.to}, {projects} projects and {components} components moved")
+        except ValueError as exc:
+            print(exc)
+            failed += 1
+    elif args.rebalance:
+        moves = shard_repo.plan_rebalance(args.max_moves)
+        for user_id, source, target in moves:
+            print(f"user {user_id}: shard {source} -> {target}")
+            if args.dry_run:
+                continue
+            try:
+                shard_repo.move_tenant(user_id, target, args.grace)
+            except ValueError as exc:
+                print(f"  skipped: {exc}")
+                failed += 1
+        print(f"{len(moves) - failed} moves{' planned' if args.dry_run else ''}")
+    for shard, users, rows in shard_repo.stats():
+        print(f"shard {shard}: {users} users, {rows} rows")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m project_management.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summaries_parser = commands.add_parser("summaries", help="verify the stored project totals against the links")
+    summaries_parser.add_argument("--rebuild", action="store_true", help="recompute every summary before verifying")
+    summaries_parser.set_defaults(handler=summaries)
+
+    migrate_parser = commands.add_parser("migrate", help="apply pending schema migrations (also done on startup)")
+    migrate_parser.set_defaults(handler=migrate)
+
+    changes_parser = commands.add_parser("changes", help="prune the change log behind GET /changes")
+    changes_parser.add_argument("--prune-days", type=int, required=True, help="delete entries older than this; older cursors get 410")
+    changes_parser.set_defaults(handler=changes)
+
+    shards_parser = commands.add_parser("shards", help="list users and rows per shard, move a user or rebalance")
+    shards_parser.add_argument("--move", type=int, metavar="USER_ID", help="move this user's data to --to")
+    shards_parser.add_argument("--to", type=int, metavar="SHARD")
+    shards_parser.add_argument("--rebalance", action="store_true", help="move every user off shard 0 and even out the rows per shard")
+    shards_parser.add_argument("--max-moves", type=int, default=100)
+    shards_parser.add_argument("--dry-run", action="store_true", help="with --rebalance, only print the moves")
+    shards_parser.add_argument("--grace", type=float, default=shard_repo.MOVE_GRACE,
+                               help="seconds between blocking the user's requests and copying (default SHARD_MOVE_GRACE, at least SHARD_CACHE_TTL)")
+    shards_parser.set_defaults(handler=shards)
+
+    args = parser.parse_args(argv)
+    if args.command == "shards" and args.move is not None and args.to is None:
+        parser.error("--move requires --to")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,49 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 from .utils.database import create_db_and_tables
+from .utils import database, jobs, metrics
+from .repository import export_repo
 from contextlib import asynccontextmanager
-from .routers import project, user, component, authentication, export
+from .routers import project, user, component, authentication, export, analytics, changes
+from .routers import metrics as metrics_router
+from .routers import project_async, user_async, component_async
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Criando banco de dados e tabelas...")
-    create_db_and_tables()
+    applied = create_db_and_tables()
+    if applied:
+        print(f"Esquema do banco atualizado (migrações {', '.join(map(str, applied))})")
+    export_repo.resume_export_jobs()
     yield  
     print("API sendo encerrada...")
+    jobs.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
+# Tempo, status e número de comandos SQL de cada requisição (ver GET /metrics)
+app.middleware("http")(metrics.track_request)
+
+# "database is locked" depois do busy_timeout (e das tentativas de database.retry_locked): o banco está ocupado,
+# não quebrado; o cliente tenta de novo
+@app.exception_handler(OperationalError)
+async def database_locked(request: Request, error: OperationalError):
+    if not database.is_locked(error):
+        raise error
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": "Database is busy, try again later"},
+                        headers={"Retry-After": database.LOCKED_RETRY_AFTER})
+
+# Registradas antes das síncronas, as rotas assíncronas têm precedência nos mesmos caminhos
+if database.DATABASE_ASYNC:
+    app.include_router(project_async.router)
+    app.include_router(user_async.router)
+    app.include_router(component_async.router)
+
 app.include_router(project.router) 
 app.include_router(user.router)
 app.include_router(component.router)
 app.include_router(authentication.router)
-app.include_router(export.router)
\ No newline at end of file
+app.include_router(export.router)
+app.include_router(analytics.router)
+app.include_router(changes.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
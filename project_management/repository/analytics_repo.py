@@ -0,0 +1,86 @@
+from fastapi import HTTPException, status
+from sqlalchemy import desc, func
+from sqlmodel import select
+from ..utils.database import SessionDep
+from ..utils import models
+from . import summary_repo
+
+try:  # NumPy é opcional: sem ele as estatísticas são calculadas em Python puro
+    import numpy as np
+except ImportError:
+    np = None
+
+# Tudo é agregado no banco (GROUP BY sobre ProjectComponentLink x Component); nada de carregar objetos ORM por projeto
+
+
+def _project_totals(user_id: int | None):
+    statement = summary_repo.computed_totals().add_columns(models.Project.name, models.Project.user_id)
+    if user_id is not None:
+        statement = statement.where(models.Project.user_id == user_id)
+    return statement
+
+
+def project_loads(db: SessionDep, user_id: int | None, sort: str, limit: int):
+    statement = _project_totals(user_id).order_by(desc(sort), models.Project.id).limit(limit)
+    return db.exec(statement).all()
+
+
+def overloaded_projects(db: SessionDep, user_id: int | None, max_amperage: int | None, max_watts: int | None, limit: int):
+    if max_amperage is None and max_watts is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="inform max_amperage and/or max_watts")
+    link = models.ProjectComponentLink
+    component = models.Component
+    statement = _project_totals(user_id)
+    if max_amperage is not None:
+        statement = statement.having(func.coalesce(func.sum(link.component_quantity * component.amperage_rating), 0) > max_amperage)
+    if max_watts is not None:
+        statement = statement.having(func.coalesce(func.sum(link.component_quantity * component.watts), 0) > max_watts)
+    return db.exec(statement.order_by(desc("total_watts"), models.Project.id).limit(limit)).all()
+
+
+def top_components(db: SessionDep, user_id: int | None, sort: str, limit: int):
+    link = models.ProjectComponentLink
+    component = models.Component
+    statement = (select(component.id.label("component_id"), component.code, component.brand, component.name,
+                        func.count(link.project_id).label("project_count"),
+                        func.sum(link.component_quantity).label("total_quantity"),
+                        func.coalesce(func.sum(link.component_quantity * component.amperage_rating), 0).label("total_amperage"),
+                        func.coalesce(func.sum(link.component_quantity * component.watts), 0).label("total_watts"))
+                 .select_from(link)
+                 .join(component, component.id == link.component_id)
+                 .group_by(component.id))
+    if user_id is not None:
+        statement = statement.join(models.Project, models.Project.id == link.project_id).where(models.Project.user_id == user_id)
+    return db.exec(statement.order_by(desc(sort), component.id).limit(limit)).all()
+
+
+def _distribution(values: list[int]):
+    if not values:
+        return models.LoadDistribution()
+    if np is not None:
+        array = np.asarray(values, dtype=np.float64)
+        p50, p90, p99 = np.percentile(array, [50, 90, 99])
+        return models.LoadDistribution(total=array.sum(), mean=array.mean(), std=array.std(), p50=p50, p90=p90, p99=p99, max=array.max())
+    ordered = sorted(values)
+    count = len(ordered)
+    mean = sum(ordered) / count
+    def percentile(fraction):
+        # Interpolação linear, igual ao padrão do np.percentile
+        position = fraction * (count - 1)
+        lower = int(position)
+        upper = min(lower + 1, count - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    std = (sum((value - mean) ** 2 for value in ordered) / count) ** 0.5
+    return models.LoadDistribution(total=sum(ordered), mean=mean, std=std, p50=percentile(0.5), p90=percentile(0.9), p99=percentile(0.99), max=ordered[-1])
+
+
+def load_stats(db: SessionDep, user_id: int | None):
+    totals = _project_totals(user_id).subquery()
+    rows = db.exec(select(totals.c.line_count, totals.c.total_amperage, totals.c.total_watts)).all()
+    if not rows:
+        return models.LoadStats()
+    lines, amperage, watts = (list(column) for column in zip(*rows))
+    total_lines = sum(lines)
+    return models.LoadStats(project_count=len(rows), empty_projects=lines.count(0),
+                            amperage=_distribution(amperage), watts=_distribution(watts),
+                            watts_per_line=sum(watts) / total_lines if total_lines else 0)
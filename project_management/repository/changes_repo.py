@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, literal, text
+from sqlmodel import Session, select
+from ..utils import models
+
+CHANGE_COLUMNS = ["entity", "entity_id", "project_id", "op", "user_id", "changed_at"]
+
+# Cada escrita em project_repo, component_repo e user_repo registra aqui o que mudou, na mesma transação.
+# O cursor só é seguro se os ids forem confirmados em ordem. No SQLite as escritas já são serializadas. No PostgreSQL
+# uma transação com id menor pode confirmar depois de outra com id maior, e o cliente que já passou do maior perderia
+# o menor; lá quem grava no registro segura um advisory lock até o commit, e os ids saem na ordem dos commits.
+# Nos outros bancos o feed fica desligado (501)
+ORDERED_DIALECTS = ("sqlite", "postgresql")
+CHANGE_LOG_LOCK = 0x50464C47  # chave do advisory lock
+
+
+def _serialize(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK})
+
+
+def record(db: Session, entity: str, entity_id: int, user_id: int | None, op: str = "upsert", project_id: int | None = None):
+    _serialize(db)
+    db.execute(insert(models.ChangeLog).values(entity=entity, entity_id=entity_id, project_id=project_id, op=op,
+                                               user_id=user_id, changed_at=datetime.utcnow()))
+
+
+# Várias alterações de uma vez; cada linha traz entity_id e user_id, e opcionalmente project_id e op
+def record_many(db: Session, entity: str, rows: list[dict]):
+    if rows:
+        _serialize(db)
+        now = datetime.utcnow()
+        db.execute(insert(models.ChangeLog), [{"entity": entity, "project_id": None, "op": "upsert", "changed_at": now} | row for row in rows])
+
+
+# Uma alteração por linha do SELECT (colunas entity_id, project_id, user_id), sem trazer as linhas para o Python
+def record_select(db: Session, entity: str, rows, op: str = "upsert"):
+    rows = rows.subquery()
+    _serialize(db)
+    db.execute(insert(models.ChangeLog).from_select(
+        CHANGE_COLUMNS, select(literal(entity), rows.c.entity_id, rows.c.project_id, literal(op), rows.c.user_id, literal(datetime.utcnow()))))
+
+
+def get_changes(db: Session, since: int | None, limit: int, user_id: int | None):
+    if db.get_bind().dialect.name not in ORDERED_DIALECTS:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="the change feed needs SQLite or PostgreSQL")
+    log = models.ChangeLog
+    # O topo é lido antes dos registros: o que for gravado depois fica para a próxima consulta
+    head = db.exec(select(func.max(log.id))).one() or 0
+    if since is None:
+        return models.ChangeFeed(changes=[], next_cursor=head, has_more=False)
+
+    oldest = db.exec(select(func.min(log.id))).one()
+    if oldest is not None and since < oldest - 1:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="cursor is older than the retained changes, download the lists again")
+    # Com sharding, um cursor anterior à última mudança de shard do usuário é de outro banco (ver shard_repo.move_tenant)
+    if since < db.info.get("cursor_floor", 0):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="cursor is from before the data moved to another shard, download the lists again")
+
+    statement = select(log).where(log.id > since).where(log.id <= head).order_by(log.id).limit(limit + 1)
+    if user_id is not None:
+        statement = statement.where(log.user_id == user_id)
+    rows = db.exec(statement).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # Sem mais registros para este filtro, o cursor avança até o topo, pulando as alterações de outros usuários
+    next_cursor = rows[-1].id if has_more else max(since, head)
+    changes = [models.ChangePublic(seq=row.id, entity=row.entity, id=row.entity_id, project_id=row.project_id, op=row.op, changed_at=row.changed_at)
+               for row in rows]
+    return models.ChangeFeed(changes=changes, next_cursor=next_cursor, has_more=has_more)
+
+
+# Apaga os registros mais antigos que `days`; cursores anteriores a eles passam a receber 410.
+# O último registro sempre fica: sem ele o topo voltaria para trás e os ids seriam reaproveitados
+def prune(db: Session, days: int):
+    log = models.ChangeLog
+    head = db.exec(select(func.max(log.id))).one() or 0
+    pruned = db.execute(delete(log).where(log.changed_at < datetime.utcnow() - timedelta(days=days)).where(log.id < head)).rowcount
+    db.commit()
+    return pruned
@@ -1,14 +1,54 @@
-from fastapi import HTTPException, status
+import csv
+import io
+from itertools import islice
+from fastapi import HTTPException, Response, UploadFile, status
+from pydantic import ValidationError
+from sqlalchemy import bindparam, delete, func, insert, null, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import select
 from ..utils.database import SessionDep
-from ..utils import models
+from ..utils import conditional, models, responses, search
+from ..utils.pagination import PageParams, paginate_rows, prefix_filter
+from . import changes_repo, summary_repo
+
+IMPORT_BATCH_SIZE = 500
+INSERT_CHUNK_SIZE = 100  # linhas por INSERT multi-row, abaixo do limite de parâmetros do SQLite
+IMPORT_FIELDS = ("code", "brand", "name", "amperage_rating", "voltage", "watts")
+NUMERIC_FIELDS = ("amperage_rating", "voltage", "watts")
+DISPLAY_FIELDS = ("code", "brand", "name")  # campos do componente que aparecem em ProjectPublic
+
+SORT_COLUMNS = {
+    "id": models.Component.id,
+    "code": models.Component.code,
+    "brand": models.Component.brand,
+    "name": models.Component.name,
+}
+# Campos de models.Component nas listas, na ordem do response_model
+LIST_COLUMNS = (models.Component.code, models.Component.brand, models.Component.name, models.Component.amperage_rating,
+                models.Component.voltage, models.Component.watts, models.Component.id, models.Component.user_id)
+
+
+# Projetos que usam os componentes da condição, no formato de changes_repo.record_select: mudar um componente muda
+# os totais ou as linhas desses projetos
+def linked_projects(condition):
+    link = models.ProjectComponentLink
+    return (select(models.Project.id.label("entity_id"), null().label("project_id"), models.Project.user_id)
+            .where(models.Project.id.in_(select(link.project_id).join(models.Component, models.Component.id == link.component_id).where(condition))))
+
+
+# Códigos já usados em outro banco. Com sharding o componente pode estar no shard de outro usuário, onde a consulta
+# por component.code não chega; models.ComponentCode, no diretório, tem o código de todos os shards
+def _claimed_codes(db: SessionDep, codes: list[str]) -> set[str]:
+    return set(db.exec(select(models.ComponentCode.code).where(models.ComponentCode.code.in_(codes)))) if codes else set()
+
 
 def create_component(request: models.ComponentBase, db: SessionDep, current_user: models.User):
     
     existing_component = db.exec(select(models.Component).where(models.Component.code == request.code)).first()
-    if existing_component:
+    if existing_component or _claimed_codes(db, [request.code]):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Component code already exists")
     
+    db.add(models.ComponentCode(code=request.code, user_id=current_user.id))
     db_component = models.Component(
         code=request.code,
         brand=request.brand,
@@ -19,16 +59,57 @@ def create_component(request: models.ComponentBase, db: SessionDep, current_user
         user_id=current_user.id
     )
     db.add(db_component)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Outra requisição gravou o mesmo código entre a verificação e o INSERT (talvez em outro shard)
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Component code already exists")
+    changes_repo.record(db, "component", db_component.id, db_component.user_id)
     db.commit()
     db.refresh(db_component)
     return db_component 
 
 
-def get_all_components(db: SessionDep):
-    components = db.exec(select(models.Component)).all()
-    if not components:
+def get_all_components(db: SessionDep, page: PageParams, brand: str | None = None, name: str | None = None, code: str | None = None, user_id: int | None = None, sort: str = "id"):
+    statement = select(*LIST_COLUMNS)
+    if brand is not None:
+        statement = statement.where(models.Component.brand == brand)
+    if name is not None:
+        statement = statement.where(models.Component.name == name)
+    if code:
+        statement = statement.where(prefix_filter(models.Component.code, code))
+    if user_id is not None:
+        statement = statement.where(models.Component.user_id == user_id)
+
+    components = paginate_rows(db, statement, models.Component.id, SORT_COLUMNS[sort], page)
+    if not components["items"] and page.cursor is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="empty list, please add an item")
-    return components
+    return responses.FastJSONResponse(components)
+
+
+def search_components(db: SessionDep, query: str, limit: int):
+    terms = search.search_terms(query)
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="search query has no searchable terms")
+    if search.uses_fts(db.get_bind()):
+        fts = search.component_fts
+        match = fts.c.component_fts.op("MATCH")(search.match_expression(terms))
+        matches = db.exec(select(func.count()).select_from(
+            select(fts.c.rowid).where(match).limit(search.RANK_MAX_MATCHES + 1).subquery())).one()
+        order = fts.c.rank if matches <= search.RANK_MAX_MATCHES else fts.c.rowid
+        # Ordena e corta dentro do índice; só as linhas do resultado são lidas de component
+        ranked = select(fts.c.rowid, order.label("position")).where(match).order_by(order).limit(limit).subquery()
+        statement = (select(models.Component)
+                     .join(ranked, ranked.c.rowid == models.Component.id)
+                     .order_by(ranked.c.position))
+    else:
+        # Sem FTS5 (outros bancos): cada termo precisa aparecer no código, na marca ou no nome
+        statement = select(models.Component).order_by(models.Component.code)
+        for term in terms:
+            pattern = f"%{term}%"
+            statement = statement.where(or_(models.Component.code.ilike(pattern), models.Component.brand.ilike(pattern), models.Component.name.ilike(pattern)))
+    return db.exec(statement.limit(limit)).all()
 
 
 def get_component(id: str, db: SessionDep):
@@ -38,13 +119,40 @@ def get_component(id: str, db: SessionDep):
     return component
 
 
+def get_component_conditional(id: str, headers, response: Response, db: SessionDep):
+    component = get_component(id, db)
+    # Componente não tem versão: o ETag vem do conteúdo da linha, que é tudo o que a resposta contém
+    etag = conditional.content_etag(component.id, *(getattr(component, field) for field in IMPORT_FIELDS))
+    if conditional.is_not_modified(headers, etag):
+        return conditional.not_modified(etag)
+    conditional.set_validators(response, etag)
+    return component
+
+
 def update_component(id: str, request: models.ComponentUpdate, db: SessionDep):
     db_component = db.get(models.Component, id)
     if not db_component:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Component not found")
     component_data = request.model_dump(exclude_unset=True)
+    old_code = db_component.code
+    if component_data.get("code", old_code) != old_code:
+        if db.exec(select(models.Component.id).where(models.Component.code == component_data["code"])).first() or _claimed_codes(db, [component_data["code"]]):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Component code already exists")
+        db.execute(delete(models.ComponentCode).where(models.ComponentCode.code == old_code))
+        db.add(models.ComponentCode(code=component_data["code"], user_id=db_component.user_id))
+    old_amperage, old_watts = db_component.amperage_rating or 0, db_component.watts or 0
+    old_display = [getattr(db_component, field) for field in DISPLAY_FIELDS]
     db_component.sqlmodel_update(component_data)
     db.add(db_component)
+    amperage, watts = (db_component.amperage_rating or 0) - old_amperage, (db_component.watts or 0) - old_watts
+    touches_projects = bool(amperage or watts) or old_display != [getattr(db_component, field) for field in DISPLAY_FIELDS]
+    if amperage or watts:
+        summary_repo.apply_rating_change(db, db_component.id, amperage, watts)
+    elif touches_projects:
+        summary_repo.touch_component(db, db_component.id)
+    changes_repo.record(db, "component", db_component.id, db_component.user_id)
+    if touches_projects:
+        changes_repo.record_select(db, "project", linked_projects(models.Component.id == db_component.id))
     db.commit()
     db.refresh(db_component)
     return db_component
@@ -55,9 +163,119 @@ def delete_component(id: str, db: SessionDep):
     if not db_component:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Component not found")
     
-    if db_component.project_links:
+    linked = db.exec(select(models.ProjectComponentLink.project_id)
+                     .where(models.ProjectComponentLink.component_id == db_component.id).limit(1)).first()
+    if linked is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete a component that is linked to a project")
     
     db.delete(db_component)
+    db.execute(delete(models.ComponentCode).where(models.ComponentCode.code == db_component.code))
+    changes_repo.record(db, "component", db_component.id, db_component.user_id, op="delete")
+    db.commit()
+    return {"message": "Component Deleted"}
+
+
+# Import
+def _import_rows(file: UploadFile):
+    # Lê o arquivo linha a linha; retorna (número da linha, dicionário com os campos do componente)
+    if (file.filename or "").lower().endswith(".xlsx"):
+        from openpyxl import load_workbook  # importado só quando usado: o openpyxl pesa no tempo de boot
+        workbook = load_workbook(file.file, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        rows = _decoded(csv.reader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")))
+
+    header = next(rows, None)
+    if header is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is empty")
+    keys = [str(column or "").strip().lower().replace(" ", "_") for column in header]
+    missing = [field for field in ("code", "brand", "name") if field not in keys]
+    if missing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Missing columns: {', '.join(missing)}")
+
+    for row_number, row in enumerate(rows, start=2):
+        values = dict(zip(keys, row))
+        yield row_number, {field: values.get(field) for field in IMPORT_FIELDS}
+
+
+def _decoded(rows):
+    # O CSV é decodificado aos poucos, durante a leitura: um byte inválido em qualquer ponto do arquivo vira 400
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not valid UTF-8 text")
+
+
+def _parse_component(values: dict):
+    values = {field: value.strip() if isinstance(value, str) else value for field, value in values.items()}
+    for field in NUMERIC_FIELDS:
+        if values[field] in ("", None):
+            values[field] = None
+        else:
+            values[field] = int(float(values[field]))
+            if not -2**63 <= values[field] < 2**63:  # INTEGER do SQLite
+                raise ValueError(f"{field} is out of range")
+    for field in ("code", "brand", "name"):
+        values[field] = str(values[field]) if values[field] not in ("", None) else None
+    return models.ComponentBase.model_validate(values)
+
+
+def import_components(file: UploadFile, upsert: bool, db: SessionDep, current_user: models.User):
+    report = models.ComponentImportReport()
+    seen_codes = set()
+    rows = _import_rows(file)
+
+    while batch := list(islice(rows, IMPORT_BATCH_SIZE)):
+        components = {}
+        for row_number, values in batch:
+            try:
+                component = _parse_component(values)
+            except (ValidationError, ValueError, TypeError, ZeroDivisionError, OverflowError) as exc:
+                detail = "; ".join(error["msg"] for error in exc.errors()) if isinstance(exc, ValidationError) else str(exc)
+                report.errors.append(models.ComponentImportError(row=row_number, code=values.get("code"), detail=detail))
+                continue
+            if component.code in seen_codes:
+                report.errors.append(models.ComponentImportError(row=row_number, code=component.code, detail="Duplicate code in file"))
+                continue
+            seen_codes.add(component.code)
+            components[component.code] = (row_number, component.model_dump(include=set(IMPORT_FIELDS)))
+
+        # Uma única query por lote para descobrir quais códigos já existem
+        existing = set(db.exec(select(models.Component.code).where(models.Component.code.in_(list(components))))) if components else set()
+        claimed = _claimed_codes(db, [code for code in components if code not in existing])
+        for code in claimed:
+            report.errors.append(models.ComponentImportError(row=components[code][0], code=code, detail="Component code already exists"))
+        new_rows = [values | {"user_id": current_user.id} for code, (_, values) in components.items() if code not in existing and code not in claimed]
+        updated_rows = []
+        for code in existing:
+            row_number, values = components[code]
+            if upsert:
+                updated_rows.append({"match_code": code} | {f"new_{field}": value for field, value in values.items()})
+            else:
+                report.errors.append(models.ComponentImportError(row=row_number, code=code, detail="Component code already exists"))
+
+        for start in range(0, len(new_rows), INSERT_CHUNK_SIZE):
+            chunk = new_rows[start:start + INSERT_CHUNK_SIZE]
+            db.execute(insert(models.ComponentCode).values([{"code": values["code"], "user_id": values["user_id"]} for values in chunk]))
+            db.execute(insert(models.Component).values(chunk))
+        # Os registros de alteração do lote saem do banco (INSERT ... SELECT pelos códigos), sem ler os ids de volta
+        written = [values["code"] for values in new_rows] + (list(existing) if upsert else [])
+        if written:
+            changes_repo.record_select(db, "component", select(models.Component.id.label("entity_id"), null().label("project_id"), models.Component.user_id)
+                                       .where(models.Component.code.in_(written)))
+        if updated_rows:
+            db.connection().execute(update(models.Component)
+                                    .where(models.Component.code == bindparam("match_code"))
+                                    .values({field: bindparam(f"new_{field}") for field in IMPORT_FIELDS if field != "code"}),
+                                    updated_rows)
+            affected_projects = db.exec(select(models.ProjectComponentLink.project_id).distinct()
+                                        .join(models.Component, models.Component.id == models.ProjectComponentLink.component_id)
+                                        .where(models.Component.code.in_(list(existing)))).all()
+            summary_repo.recompute(db, affected_projects)
+            changes_repo.record_select(db, "project", linked_projects(models.Component.code.in_(list(existing))))
+        report.inserted += len(new_rows)
+        report.updated += len(updated_rows)
+
     db.commit()
-    return {"message": "Component Deleted"}
\ No newline at end of file
+    report.errors.sort(key=lambda error: error.row)
+    return report
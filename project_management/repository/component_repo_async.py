@@ -0,0 +1,31 @@
+from fastapi import Response
+from ..utils.database import AsyncSessionDep
+from ..utils import models
+from ..utils.pagination import PageParams
+from . import component_repo
+
+# Contrapartes assíncronas de component_repo (ver project_repo_async)
+
+
+async def create_component(request: models.ComponentBase, db: AsyncSessionDep, current_user: models.User):
+    return await db.run_sync(lambda session: component_repo.create_component(request, session, current_user))
+
+
+async def get_all_components(db: AsyncSessionDep, page: PageParams, brand: str | None = None, name: str | None = None, code: str | None = None, user_id: int | None = None, sort: str = "id"):
+    return await db.run_sync(lambda session: component_repo.get_all_components(session, page, brand=brand, name=name, code=code, user_id=user_id, sort=sort))
+
+
+async def search_components(db: AsyncSessionDep, query: str, limit: int):
+    return await db.run_sync(lambda session: component_repo.search_components(session, query, limit))
+
+
+async def get_component_conditional(id: str, headers, response: Response, db: AsyncSessionDep):
+    return await db.run_sync(lambda session: component_repo.get_component_conditional(id, headers, response, session))
+
+
+async def update_component(id: str, request: models.ComponentUpdate, db: AsyncSessionDep):
+    return await db.run_sync(lambda session: component_repo.update_component(id, request, session))
+
+
+async def delete_component(id: str, db: AsyncSessionDep):
+    return await db.run_sync(lambda session: component_repo.delete_component(id, session))
@@ -0,0 +1,490 @@
+import csv
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import weakref
+import zipfile
+from datetime import datetime, timedelta
+from itertools import groupby, repeat
+from urllib.parse import quote
+from fastapi import HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import delete, func, update
+from sqlmodel import Session, select
+from ..utils import database, jobs, metrics, models, responses, sharding
+from ..utils.database import SessionDep
+
+EXPORT_COLUMNS = ["id", "code", "brand", "name", "amperage rating", "voltage", "watts", "quantity", "total amperage"]
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ndjson": "application/x-ndjson",
+}
+CHUNK_SIZE = 64 * 1024
+YIELD_PER = 1000
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_JOB_TTL = float(os.getenv("EXPORT_JOB_TTL", "86400"))  # segundos até um job terminado e seu arquivo serem apagados
+EXPORT_SWEEP_INTERVAL = 60
+JOB_BATCH_SIZE = 5000
+BULK_BATCH_SIZE = 200
+
+
+LINK_COLUMNS = (models.Component.id, models.Component.code, models.Component.brand, models.Component.name,
+                models.Component.amperage_rating, models.Component.voltage, models.Component.watts,
+                models.ProjectComponentLink.component_quantity)
+
+
+def link_rows_statement(project_id: int):
+    return (select(*LINK_COLUMNS)
+            .join(models.Component, models.Component.id == models.ProjectComponentLink.component_id)
+            .where(models.ProjectComponentLink.project_id == project_id)
+            .order_by(models.ProjectComponentLink.component_id))
+
+
+def link_rows(project_id: int, db: Session):
+    return db.exec(link_rows_statement(project_id).execution_options(yield_per=YIELD_PER))
+
+
+def export_rows(project_id: int, db: Session):
+    return with_totals(link_rows(project_id, db))
+
+
+# Linhas da planilha: cabeçalho, um item por link e a linha de total, calculada enquanto o cursor avança
+# (quantidade, amperagem total) de linhas no formato de EXPORT_COLUMNS, os mesmos números da linha TOTAL
+def link_totals(rows):
+    return sum(row[7] for row in rows), sum((row[4] or 0) * row[7] for row in rows)
+
+
+def with_totals(rows):
+    yield EXPORT_COLUMNS
+    total_quantity = 0
+    total_amperage = 0
+    for row in rows:
+        amperage_rating, quantity = row[4], row[7]
+        total_quantity += quantity
+        total_amperage += (amperage_rating or 0) * quantity
+        yield [*row, None]
+    yield ["TOTAL", "", "", "", "", "", "", total_quantity, total_amperage]
+
+
+def _workbook():
+    # O openpyxl só é importado na primeira exportação em xlsx: pesa no tempo de boot de cada worker
+    from openpyxl import Workbook
+    return Workbook(write_only=True)
+
+
+def write_xlsx(rows, fileobj, title: str = "Components"):
+    workbook = _workbook()
+    sheet = workbook.create_sheet(title=title)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# Os streams abrem a própria sessão (a da requisição fecha antes do corpo ser enviado) no banco da requisição,
+# recebido como bind = db.get_bind(): com sharding, o shard do usuário
+def stream_csv(project_id: int, bind):
+    with Session(bind) as db:
+        yield from csv_chunks(export_rows(project_id, db))
+
+
+def stream_xlsx(project_id: int, bind):
+    # O modo write_only grava as linhas em arquivo temporário; só o arquivo final é lido em blocos
+    with Session(bind) as db, tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as fileobj:
+        write_xlsx(export_rows(project_id, db), fileobj)
+        fileobj.seek(0)
+        while chunk := fileobj.read(CHUNK_SIZE):
+            yield chunk
+
+
+def attachment_headers(filename: str):
+    return {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+
+
+def export_project(project_id: int, format: str, db: SessionDep):
+    project = db.get(models.Project, project_id)
+    if not project:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    has_components = db.exec(select(models.ProjectComponentLink.component_id)
+                             .where(models.ProjectComponentLink.project_id == project_id).limit(1)).first()
+    if has_components is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project has no components")
+
+    content = stream_csv(project_id, db.get_bind()) if format == "csv" else stream_xlsx(project_id, db.get_bind())
+    content = metrics.timed_stream(content, metrics.export_duration, "project", format)
+    return StreamingResponse(content, media_type=MEDIA_TYPES[format], headers=attachment_headers(f"{project.name}.{format}"))
+
+
+# Bulk export
+class _ChunkWriter(io.RawIOBase):
+    # Destino não-seekable para o ZipFile: os bytes escritos são repassados ao cliente a cada projeto
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _bulk_project_ids(request: models.BulkExportRequest, db: Session, current_user: models.User):
+    if request.project_ids is None:
+        return db.exec(select(models.Project.id).where(models.Project.user_id == current_user.id).order_by(models.Project.id)).all()
+    return _existing_project_ids(request.project_ids, db)
+
+
+def _existing_project_ids(project_ids: list[int], db: Session):
+    requested = sorted(set(project_ids))
+    found = set()
+    for start in range(0, len(requested), BULK_BATCH_SIZE):
+        found.update(db.exec(select(models.Project.id).where(models.Project.id.in_(requested[start:start + BULK_BATCH_SIZE]))).all())
+    missing = [id for id in requested if id not in found]
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Projects not found: {missing}")
+    return requested
+
+
+def _project_batches(project_ids: list[int], db: Session):
+    # Duas queries por lote (projetos e todos os seus links), nunca uma por projeto
+    for start in range(0, len(project_ids), BULK_BATCH_SIZE):
+        batch_ids = project_ids[start:start + BULK_BATCH_SIZE]
+        names = dict(db.exec(select(models.Project.id, models.Project.name).where(models.Project.id.in_(batch_ids))).all())
+        statement = (select(models.ProjectComponentLink.project_id, *LINK_COLUMNS)
+                     .join(models.Component, models.Component.id == models.ProjectComponentLink.component_id)
+                     .where(models.ProjectComponentLink.project_id.in_(batch_ids))
+                     .order_by(models.ProjectComponentLink.project_id, models.ProjectComponentLink.component_id))
+        rows = {project_id: [tuple(row)[1:] for row in group]
+                for project_id, group in groupby(db.exec(statement), key=lambda row: row.project_id)}
+        yield [(project_id, names[project_id], rows.get(project_id, [])) for project_id in batch_ids if project_id in names]
+
+
+def render_project(rows, format: str):
+    fileobj = io.BytesIO()
+    if format == "csv":
+        text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+        csv.writer(text).writerows(with_totals(rows))
+        text.flush()
+        text.detach()
+    else:
+        write_xlsx(with_totals(rows), fileobj)
+    return fileobj.getvalue()
+
+
+def _sheet_title(project_id: int, name: str):
+    # Nomes de aba do Excel: até 31 caracteres e sem []:*?/\
+    name = re.sub(r"[][:*?/\\]", " ", name)
+    return f"{project_id} {name}"[:31]
+
+
+# Exportações em zip renderizando ao mesmo tempo; além disso, 429 (a fila do pool não cresce sem limite)
+_render_slots = threading.BoundedSemaphore(jobs.RENDER_MAX_PENDING)
+
+
+def stream_bulk_zip(project_ids: list[int], format: str, bind):
+    compression = zipfile.ZIP_DEFLATED if format == "csv" else zipfile.ZIP_STORED
+    writer = _ChunkWriter()
+    with Session(bind) as db, zipfile.ZipFile(writer, "w", compression=compression) as archive:
+        for batch in _project_batches(project_ids, db):
+            # Cada lote é renderizado em paralelo no pool de processos das exportações em lote
+            files = jobs.get_render_pool().map(render_project, [rows for _, _, rows in batch], repeat(format))
+            for (project_id, name, _), content in zip(batch, files):
+                archive.writestr(f"{_sheet_title(project_id, name)}.{format}", content)
+                yield writer.drain()
+    yield writer.drain()
+
+
+def stream_bulk_workbook(project_ids: list[int], bind):
+    with Session(bind) as db, tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as fileobj:
+        workbook = _workbook()
+        summary = workbook.create_sheet(title="Summary")
+        summary.append(["project id", "project", "lines", "quantity", "total amperage"])
+        for batch in _project_batches(project_ids, db):
+            for project_id, name, rows in batch:
+                sheet = workbook.create_sheet(title=_sheet_title(project_id, name))
+                for row in with_totals(rows):
+                    sheet.append(row)
+                summary.append([project_id, name, len(rows), *link_totals(rows)])
+        workbook.save(fileobj)
+        fileobj.seek(0)
+        while chunk := fileobj.read(CHUNK_SIZE):
+            yield chunk
+
+
+def export_projects(request: models.BulkExportRequest, db: SessionDep, current_user: models.User):
+    project_ids = _bulk_project_ids(request, db, current_user)
+    if not project_ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No projects to export")
+
+    if request.layout == "zip":
+        if not _render_slots.acquire(blocking=False):
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many bulk exports in progress, try again later",
+                                headers={"Retry-After": "5"})
+        stream = stream_bulk_zip(project_ids, request.format, db.get_bind())
+        # A vaga volta quando o stream é descartado: ao terminar, com erro ou sem ter começado (cliente desconectado)
+        weakref.finalize(stream, _render_slots.release)
+        content = metrics.timed_stream(stream, metrics.export_duration, "bulk", f"zip-{request.format}")
+        return StreamingResponse(content, media_type="application/zip", headers=attachment_headers("projects.zip"))
+    content = metrics.timed_stream(stream_bulk_workbook(project_ids, db.get_bind()), metrics.export_duration, "bulk", "xlsx")
+    return StreamingResponse(content, media_type=MEDIA_TYPES["xlsx"], headers=attachment_headers("projects.xlsx"))
+
+
+# Bill of materials
+BOM_COLUMNS = ["id", "code", "brand", "name", "amperage rating", "voltage", "watts", "projects", "quantity", "total amperage", "total watts"]
+
+
+def _bom_filter(statement, project_ids: list[int] | None, user_id: int | None):
+    link = models.ProjectComponentLink
+    if project_ids is not None:
+        return statement.where(link.project_id.in_(project_ids))
+    if user_id is not None:
+        return statement.join(models.Project, models.Project.id == link.project_id).where(models.Project.user_id == user_id)
+    return statement
+
+
+# Uma linha por componente, somada no banco. Agrupado e ordenado pelo id do componente: sem filtro, o SQLite
+# percorre component pela chave primária e os links pelo índice de component_id, devolvendo cada grupo assim que
+# ele termina; com filtro, agrupa numa B-tree temporária do próprio banco. Nos dois casos o cursor (yield_per)
+# traz as linhas aos poucos e a aplicação nunca monta o resultado em memória
+def bom_statement(project_ids: list[int] | None, user_id: int | None):
+    link, component = models.ProjectComponentLink, models.Component
+    quantity = func.sum(link.component_quantity)
+    statement = (select(component.id, component.code, component.brand, component.name, component.amperage_rating, component.voltage, component.watts,
+                        func.count(link.project_id).label("project_count"), quantity.label("quantity"),
+                        (quantity * func.coalesce(component.amperage_rating, 0)).label("total_amperage"),
+                        (quantity * func.coalesce(component.watts, 0)).label("total_watts"))
+                 .select_from(link)
+                 .join(component, component.id == link.component_id)
+                 .group_by(component.id)
+                 .order_by(component.id))
+    return _bom_filter(statement, project_ids, user_id).execution_options(yield_per=YIELD_PER)
+
+
+def with_bom_totals(rows):
+    yield BOM_COLUMNS
+    quantity = amperage = watts = 0
+    for row in rows:
+        quantity += row.quantity
+        amperage += row.total_amperage
+        watts += row.total_watts
+        yield row
+    yield ["TOTAL", "", "", "", "", "", "", "", quantity, amperage, watts]
+
+
+def stream_bom_csv(statement, bind):
+    with Session(bind) as db:
+        yield from csv_chunks(with_bom_totals(db.exec(statement)))
+
+
+def stream_bom_ndjson(statement, bind):
+    with Session(bind) as db:
+        buffer = bytearray()
+        for row in db.exec(statement):
+            buffer += responses.dumps(row._asdict())
+            buffer += b"\n"
+            if len(buffer) >= CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        yield bytes(buffer)
+
+
+def export_bom(request: models.BomExportRequest, db: SessionDep, current_user: models.User):
+    if request.project_ids is None:
+        sharding.check_scope(request.scope)
+    project_ids = _existing_project_ids(request.project_ids, db) if request.project_ids is not None else None
+    user_id = current_user.id if request.scope == "user" else None
+    has_links = db.exec(_bom_filter(select(models.ProjectComponentLink.component_id), project_ids, user_id).limit(1)).first()
+    if has_links is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No components to export")
+
+    statement = bom_statement(project_ids, user_id)
+    content = stream_bom_csv(statement, db.get_bind()) if request.format == "csv" else stream_bom_ndjson(statement, db.get_bind())
+    content = metrics.timed_stream(content, metrics.export_duration, "bom", request.format)
+    return StreamingResponse(content, media_type=MEDIA_TYPES[request.format], headers=attachment_headers(f"bill-of-materials.{request.format}"))
+
+
+# Export jobs
+_dispatch_lock = threading.Lock()
+_in_flight: set[int] = set()
+_job_engines = {}
+_last_sweep = 0.0
+
+
+def _job_engine(url: str):
+    # Cada processo do pool abre sua própria engine
+    if url not in _job_engines:
+        _job_engines[url] = database.make_engine(url)
+    return _job_engines[url]
+
+
+def _job_rows(job: models.ExportJob, db: Session, data: Session):
+    # Lotes por component_id (keyset): nenhuma leitura fica aberta enquanto o progresso é gravado
+    statement = link_rows_statement(job.project_id).limit(JOB_BATCH_SIZE)
+    last_id = 0
+    while batch := data.exec(statement.where(models.ProjectComponentLink.component_id > last_id)).all():
+        yield from batch
+        last_id = batch[-1].id
+        job.progress += len(batch)
+        db.add(job)
+        db.commit()
+
+
+# O job fica no banco de url; os links, em data_url (com sharding, o shard do dono do job)
+def run_export_job(url: str, job_id: int, data_url: str | None = None):
+    with Session(_job_engine(url)) as db, Session(_job_engine(data_url or url)) as data:
+        job = db.get(models.ExportJob, job_id)
+        if job is None:
+            return
+        job.progress = 0
+        job.total = data.exec(select(func.count()).select_from(models.ProjectComponentLink)
+                            .where(models.ProjectComponentLink.project_id == job.project_id)).one()
+        db.add(job)
+        db.commit()
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.abspath(os.path.join(EXPORT_DIR, f"export-{job.id}.{job.format}"))
+        partial_path = f"{path}.part"
+        try:
+            rows = with_totals(_job_rows(job, db, data))
+            if job.format == "csv":
+                with open(partial_path, "w", newline="", encoding="utf-8") as fileobj:
+                    csv.writer(fileobj).writerows(rows)
+            else:
+                write_xlsx(rows, partial_path)
+            os.replace(partial_path, path)
+        except Exception as exc:
+            db.rollback()
+            job.status = "failed"
+            job.error = str(exc)
+        else:
+            job.status = "done"
+            job.file_path = path
+        job.finished_at = datetime.utcnow()
+        db.add(job)
+        db.commit()
+        return job.status, job.format
+
+
+def _job_finished(job_id: int, future, started: float):
+    # O job roda em outro processo: as métricas são registradas aqui, a partir do resultado
+    if future.cancelled() or future.exception() is not None:
+        job_status, format = "failed", "unknown"
+    else:
+        job_status, format = future.result() or ("missing", "unknown")
+    metrics.export_jobs.inc(job_status)
+    metrics.export_duration.observe(time.perf_counter() - started, "job", format)
+    with _dispatch_lock:
+        _in_flight.discard(job_id)
+    dispatch_export_jobs()
+
+
+# Jobs terminados há mais de EXPORT_JOB_TTL: apaga o arquivo e depois a linha
+def expire_export_jobs(db: Session, now: datetime | None = None):
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=EXPORT_JOB_TTL)
+    expired = db.exec(select(models.ExportJob.id, models.ExportJob.file_path)
+                      .where(models.ExportJob.status.in_(("done", "failed")), models.ExportJob.finished_at < cutoff)).all()
+    for _, file_path in expired:
+        if file_path:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+    ids = [job_id for job_id, _ in expired]
+    for start in range(0, len(ids), BULK_BATCH_SIZE):
+        db.execute(delete(models.ExportJob).where(models.ExportJob.id.in_(ids[start:start + BULK_BATCH_SIZE])))
+    db.commit()
+    return len(ids)
+
+
+def dispatch_export_jobs():
+    # A fila é a própria tabela: pega os jobs mais antigos enquanto houver worker livre
+    global _last_sweep
+    with _dispatch_lock, Session(database.engine) as db:
+        # A limpeza dos jobs vencidos vai junto, no máximo uma vez por EXPORT_SWEEP_INTERVAL
+        if time.monotonic() - _last_sweep >= EXPORT_SWEEP_INTERVAL:
+            _last_sweep = time.monotonic()
+            expire_export_jobs(db)
+        free = jobs.MAX_WORKERS - len(_in_flight)
+        if free <= 0:
+            return
+        queued = db.exec(select(models.ExportJob.id, models.ExportJob.user_id).where(models.ExportJob.status == "queued")
+                         .order_by(models.ExportJob.id).limit(free)).all()
+        url = database.engine.url.render_as_string(hide_password=False)
+        for job_id, user_id in queued:
+            claimed = db.exec(update(models.ExportJob)
+                              .where(models.ExportJob.id == job_id, models.ExportJob.status == "queued")
+                              .values(status="running"))
+            db.commit()
+            if claimed.rowcount != 1:
+                continue
+            _in_flight.add(job_id)
+            shard = sharding.tenant(db, user_id).shard if sharding.sharded() else 0
+            data_url = database.shard_url(shard).render_as_string(hide_password=False) if shard else None
+            future = jobs.get_pool().submit(run_export_job, url, job_id, data_url)
+            future.add_done_callback(lambda future, job_id=job_id, started=time.perf_counter(): _job_finished(job_id, future, started))
+
+
+def resume_export_jobs():
+    # Jobs interrompidos por um restart voltam para a fila
+    with Session(database.engine) as db:
+        db.exec(update(models.ExportJob).where(models.ExportJob.status == "running").values(status="queued"))
+        db.commit()
+    dispatch_export_jobs()
+
+
+def create_export_job(request: models.ExportJobCreate, db: SessionDep, current_user: models.User):
+    if not db.get(models.Project, request.project_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    pending = db.exec(select(func.count()).select_from(models.ExportJob)
+                      .where(models.ExportJob.status.in_(("queued", "running")))).one()
+    if pending >= jobs.MAX_PENDING:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many export jobs in progress, try again later")
+
+    job = models.ExportJob(project_id=request.project_id, format=request.format, user_id=current_user.id)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    dispatch_export_jobs()
+    db.refresh(job)
+    return job
+
+
+def get_export_job(id: int, db: SessionDep, current_user: models.User):
+    job = db.get(models.ExportJob, id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    return job
+
+
+def download_export_job(id: int, db: SessionDep, current_user: models.User):
+    job = get_export_job(id, db, current_user)
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Export job is {job.status}")
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export file is no longer available")
+    project = db.get(models.Project, job.project_id)
+    filename = f"{project.name if project else f'export-{job.id}'}.{job.format}"
+    return FileResponse(job.file_path, media_type=MEDIA_TYPES[job.format], headers=attachment_headers(filename))
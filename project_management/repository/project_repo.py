@@ -1,10 +1,62 @@
+import os
+from collections import defaultdict
 from fastapi import HTTPException, status
 from sqlmodel import select
-from ..utils.database import SessionDep
-from ..utils import models
-import pandas as pd
+from ..utils.cache import TTLCache
+from ..utils.database import SessionDep, dialect_insert, retry_locked
+from ..utils import conditional, metrics, models, responses, sharding
 from fastapi.responses import JSONResponse
-from sqlalchemy import or_
+from sqlalchemy import delete, func, insert, literal, or_, update
+from sqlalchemy.orm import selectinload
+from ..utils.pagination import PageParams, paginate_rows
+from . import changes_repo, summary_repo
+
+SORT_COLUMNS = {
+    "id": models.Project.id,
+    "name": models.Project.name,
+}
+
+
+def _total(column):
+    return func.coalesce(column, 0).label(column.key)
+
+
+# Campos de ProjectList e ProjectRead, na ordem dos modelos; os totais vêm de project_summary por outer join
+PROJECT_TOTAL_COLUMNS = (_total(models.ProjectSummary.line_count), _total(models.ProjectSummary.total_quantity),
+                         _total(models.ProjectSummary.total_amperage), _total(models.ProjectSummary.total_watts))
+PROJECT_LIST_COLUMNS = (models.Project.name, *PROJECT_TOTAL_COLUMNS, models.Project.id)
+PROJECT_READ_COLUMNS = PROJECT_LIST_COLUMNS + (models.Project.created_at, models.Project.updated_at, models.Project.user_id)
+
+# Respostas de GET /project/{id} por (shard, projeto, ETag): qualquer alteração muda o ETag e a entrada antiga deixa
+# de ser usada. Com sharding, ids de projeto se repetem entre shards
+PROJECT_CACHE_TTL = float(os.getenv("PROJECT_CACHE_TTL", "10"))
+PROJECT_CACHE_SIZE = int(os.getenv("PROJECT_CACHE_SIZE", "256"))
+project_cache = TTLCache(PROJECT_CACHE_SIZE, PROJECT_CACHE_TTL)
+metrics.register_cache("project", project_cache)
+
+
+# Carrega o projeto com links e componentes em 3 queries fixas, sem lazy load por item
+def load_project(id: int, db: SessionDep):
+    statement = (select(models.Project)
+                 .where(models.Project.id == id)
+                 .options(selectinload(models.Project.component_links)
+                          .selectinload(models.ProjectComponentLink.component))
+                 .execution_options(populate_existing=True))
+    return db.exec(statement).first()
+
+
+# Pelo id ou, sem id, pelo código: uma condição só, para usar a chave primária ou o índice de code.
+# Um OR entre as duas (com o outro lado IS NULL) fazia o SQLite percorrer a tabela inteira
+def component_condition(request: models.ComponentLink):
+    if request.id is not None:
+        return models.Component.id == request.id
+    return models.Component.code == request.code
+
+
+def to_project_public(project: models.Project):
+    return models.ProjectPublic(name=project.name, component_links=project.components, latest_modification=project.updated_at if project.updated_at else project.created_at,
+                                line_count=project.line_count, total_quantity=project.total_quantity, total_amperage=project.total_amperage, total_watts=project.total_watts)
+
 
 def create_project(request: models.ProjectBase, db: SessionDep, current_user: models.User):
 
@@ -15,145 +67,282 @@ def create_project(request: models.ProjectBase, db: SessionDep, current_user: mo
     
     db_project = models.Project(name=request.name, user_id=current_user.id)
     db.add(db_project)
+    db.flush()
+    summary_repo.create_summary(db, db_project.id)
+    changes_repo.record(db, "project", db_project.id, db_project.user_id)
+    db.commit()
+    return to_project_public(load_project(db_project.id, db))
+
+
+# Copia o projeto e seus links dentro do banco (INSERT ... SELECT), sem trazer os links para o Python: o custo para
+# o cliente é uma requisição, qualquer que seja o tamanho da lista de materiais
+def clone_project(id: int, request: models.ProjectClone, db: SessionDep, current_user: models.User):
+    source = db.get(models.Project, id)
+    if not source:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
+    user_id = request.user_id if request.user_id is not None else current_user.id
+    if user_id != current_user.id and not db.get(models.User, user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user not found")
+    # Com sharding a cópia é feita dentro do banco do projeto de origem: o dono precisa estar no mesmo shard
+    if user_id != current_user.id and sharding.sharded() and sharding.tenant(db, user_id).shard != db.info.get("shard", 0):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="the target user is on another shard")
+
+    name = request.name or f"{source.name} (copy)"[:100]
+    existing_project = db.exec(select(models.Project.id).where(models.Project.name == name).where(models.Project.user_id == user_id)).first()
+    if existing_project:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="a project with this name already exists for the target user")
+
+    db_project = models.Project(name=name, user_id=user_id)
+    db.add(db_project)
+    db.flush()
+    link = models.ProjectComponentLink
+    db.execute(insert(link).from_select(["project_id", "component_id", "component_quantity"],
+                                        select(literal(db_project.id), link.component_id, link.component_quantity)
+                                        .where(link.project_id == source.id)))
+    summary_repo.copy_summary(db, source.id, db_project.id)
+    # Um projeto novo entra no feed como um registro só, sem os links: o cliente baixa o projeto inteiro
+    changes_repo.record(db, "project", db_project.id, user_id)
     db.commit()
     db.refresh(db_project)
-    return models.ProjectPublic(name=db_project.name, component_links=db_project.components, latest_modification=db_project.updated_at if db_project.updated_at else db_project.created_at)
+    return db_project
 
 
-def get_all_projects(db: SessionDep):
-    projects = db.exec(select(models.Project)).all()
-    if not projects:
+def get_all_projects(db: SessionDep, page: PageParams, name: str | None = None, user_id: int | None = None, sort: str = "id", columns=PROJECT_LIST_COLUMNS):
+    statement = select(*columns).outerjoin(models.ProjectSummary, models.ProjectSummary.project_id == models.Project.id)
+    if name is not None:
+        statement = statement.where(models.Project.name == name)
+    if user_id is not None:
+        statement = statement.where(models.Project.user_id == user_id)
+
+    projects = paginate_rows(db, statement, models.Project.id, SORT_COLUMNS[sort], page)
+    if not projects["items"] and page.cursor is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="empty list, please add an item")
-    return projects
+    return responses.FastJSONResponse(projects)
 
 
 def get_project(id: int, db: SessionDep):
-    project = db.exec(select(models.Project).where(models.Project.id == id)).first()
+    project = load_project(id, db)
+    if not project:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"project not found")
+    return to_project_public(project)
+
+
+# ProjectPublic como dict, em 2 queries de colunas (projeto com totais, linhas com os campos do componente)
+def project_document(id: int, db: SessionDep):
+    project = db.exec(select(models.Project.name, *PROJECT_TOTAL_COLUMNS, models.Project.created_at, models.Project.updated_at)
+                      .outerjoin(models.ProjectSummary, models.ProjectSummary.project_id == models.Project.id)
+                      .where(models.Project.id == id)).first()
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"project not found")
-    return models.ProjectPublic(name=project.name, component_links=project.components, latest_modification=project.updated_at if project.updated_at else project.created_at)
+    link = models.ProjectComponentLink
+    lines = db.exec(select(models.Component.code, models.Component.brand, models.Component.name, link.component_quantity.label("quantity"))
+                    .join(models.Component, models.Component.id == link.component_id)
+                    .where(link.project_id == id).order_by(link.component_id)).all()
+    document = project._asdict()
+    created_at, updated_at = document.pop("created_at"), document.pop("updated_at")
+    document["latest_modification"] = updated_at if updated_at else created_at
+    document["component_links"] = [line._asdict() for line in lines]
+    return document
+
+
+# ETag e Last-Modified de um projeto, lidos só de project e project_summary (sem carregar os links)
+def project_validators(id: int, db: SessionDep):
+    summary = models.ProjectSummary
+    row = db.exec(select(models.Project.id, models.Project.created_at, models.Project.updated_at,
+                         summary.version, summary.updated_at.label("summary_updated_at"))
+                  .outerjoin(summary, summary.project_id == models.Project.id)
+                  .where(models.Project.id == id)).first()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"project not found")
+    modified = row.updated_at or row.created_at
+    last_modified = max(modified, row.summary_updated_at or modified)
+    etag = conditional.make_etag(row.id, row.version or 0, modified.strftime("%Y%m%d%H%M%S"))
+    return row.id, etag, last_modified
+
 
+def get_project_conditional(id: int, headers, db: SessionDep):
+    project_id, etag, last_modified = project_validators(id, db)
+    if conditional.is_not_modified(headers, etag, last_modified):
+        return conditional.not_modified(etag, last_modified)
+    # O cache guarda o corpo já serializado: um acerto não monta nem serializa nada
+    key = (db.info.get("shard", 0), project_id, etag)
+    body = project_cache.get(key)
+    if body is None:
+        body = responses.dumps(project_document(project_id, db))
+        project_cache.set(key, body)
+    response = responses.FastJSONResponse(body)
+    conditional.set_validators(response, etag, last_modified)
+    return response
 
-def update_project(id: int, request: models.ProjectUpdate, db: SessionDep):
+
+# Trava o projeto até o commit (ver summary_repo.lock) e, com If-Match, confere a versão já com a trava: ninguém
+# altera o projeto entre a verificação e a escrita, e quem chegou depois recebe 412 e relê o projeto
+def lock_project(id: int, db: SessionDep, if_match: str | None = None):
+    summary_repo.lock(db, id)
+    if if_match is not None:
+        _, etag, _ = project_validators(id, db)
+        if not conditional.if_match(if_match, etag):
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="project was modified, reload it and retry")
+
+
+def update_project(id: int, request: models.ProjectUpdate, db: SessionDep, if_match: str | None = None):
+    if if_match is not None:
+        lock_project(id, db, if_match)
     db_project = db.get(models.Project, id)
     if not db_project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"project not found")
     project_data = request.model_dump(exclude_unset=True)
     db_project.sqlmodel_update(project_data)
     db.add(db_project)
+    # updated_at tem resolução de segundos no SQLite; a versão garante um ETag novo a cada alteração
+    summary_repo.apply_delta(db, db_project.id)
+    changes_repo.record(db, "project", db_project.id, db_project.user_id)
     db.commit()
-    db.refresh(db_project)
-    return models.ProjectPublic(name=db_project.name, component_links=db_project.components, latest_modification=db_project.updated_at if db_project.updated_at else db_project.created_at)
+    return to_project_public(load_project(id, db))
 
 
-def delete_project(id: int, db: SessionDep):
+def delete_project(id: int, db: SessionDep, if_match: str | None = None):
+    if if_match is not None:
+        lock_project(id, db, if_match)
     db_project = db.get(models.Project, id)
     if not db_project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"project not found")
     db.delete(db_project)
+    changes_repo.record(db, "project", db_project.id, db_project.user_id, op="delete")
     db.commit()
     return JSONResponse(content={"message": "Project deleted."})
     
 
-def add_component_to_project(request: models.ComponentLink, project_id: int, db: SessionDep):
+@retry_locked
+def add_component_to_project(request: models.ComponentLink, project_id: int, db: SessionDep, if_match: str | None = None):
+    if request.quantity <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="quantity must be greater than 0")
     project = db.exec(select(models.Project)
                       .where(models.Project.id == project_id)).first()
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
-    component = db.exec(select(models.Component)
-                        .where(or_(models.Component.id == request.id, models.Component.code == request.code))).first()
+    component = db.exec(select(models.Component).where(component_condition(request))).first()
     if not component:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="component not found")
+    if if_match is not None:
+        lock_project(project.id, db, if_match)
 
-    existing_link = db.exec(select(models.ProjectComponentLink).where(models.ProjectComponentLink.project_id == project_id)
-        .where(models.ProjectComponentLink.component_id == component.id)).first()
-    
-    if existing_link:
-        if request.quantity <= 0:  
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="quantity must be greater than 0")
-        existing_link.component_quantity += request.quantity
-        db.add(existing_link)
-        db.commit()
-        db.refresh(existing_link)
-        db.refresh(project)
-    else:
-        project_component_link = models.ProjectComponentLink(project=project, component=component, component_quantity=request.quantity)
-        db.add(project_component_link)
-        db.commit()
-        db.refresh(project_component_link)
-        db.refresh(project)
-
-    return models.ProjectPublic(name=project.name, component_links=project.components, latest_modification=project.updated_at if project.updated_at else project.created_at)
-
-
-def remove_component_from_project(request: models.ComponentLink, project_id: int, db: SessionDep):
+    # Soma no próprio comando (quantity = quantity + :delta), sem ler a linha antes: duas adições simultâneas na
+    # mesma linha não se sobrescrevem. A linha é nova quando a quantidade final é a pedida (as existentes têm ao menos 1)
+    link = models.ProjectComponentLink
+    statement = dialect_insert(db, link).values(project_id=project.id, component_id=component.id, component_quantity=request.quantity)
+    quantity = db.execute(statement.on_conflict_do_update(index_elements=["project_id", "component_id"],
+                                                          set_={"component_quantity": link.component_quantity + statement.excluded.component_quantity})
+                          .returning(link.component_quantity)).scalar_one()
+    summary_repo.apply_delta(db, project.id, lines=1 if quantity == request.quantity else 0, quantity=request.quantity,
+                             amperage=request.quantity * (component.amperage_rating or 0), watts=request.quantity * (component.watts or 0))
+    changes_repo.record(db, "link", component.id, project.user_id, project_id=project.id)
+    db.commit()
+
+    return to_project_public(load_project(project_id, db))
+
+
+@retry_locked
+def remove_component_from_project(request: models.ComponentLink, project_id: int, db: SessionDep, if_match: str | None = None):
+    if request.quantity <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="quantity must be greater than 0")
     project = db.exec(select(models.Project).where(models.Project.id == project_id)).first()
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
     
-    component = db.exec(select(models.Component).where(or_(models.Component.code == request.code, models.Component.id == request.id))).first()
+    component = db.exec(select(models.Component).where(component_condition(request))).first()
     if not component:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="component not found")
+    if if_match is not None:
+        lock_project(project.id, db, if_match)
 
-    project_component_link = db.exec(select(models.ProjectComponentLink).where(models.ProjectComponentLink.project_id == project.id).filter(models.ProjectComponentLink.component_id == component.id)).one()
-    if not project_component_link:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="item not found")
-    
-    if request.quantity > project_component_link.component_quantity:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Quantity is greater than the current quantity")
-    
-    if request.quantity == project_component_link.component_quantity:
-        db.delete(project_component_link)
-    else:
-        project_component_link.component_quantity -= request.quantity
-        db.add(project_component_link)
+    # Baixa condicional: subtrai só se ainda sobrar quantidade; se a quantidade é exatamente a da linha, apaga a linha.
+    # Nenhum dos dois comandos depende de uma leitura anterior
+    link = models.ProjectComponentLink
+    same_line = (link.project_id == project.id, link.component_id == component.id)
+    decremented = db.execute(update(link).where(*same_line, link.component_quantity > request.quantity)
+                             .values(component_quantity=link.component_quantity - request.quantity)).rowcount
+    removes_line = False
+    if not decremented:
+        removes_line = db.execute(delete(link).where(*same_line, link.component_quantity == request.quantity)).rowcount == 1
+        if not removes_line:
+            if db.exec(select(link.component_quantity).where(*same_line)).first() is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="item not found")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Quantity is greater than the current quantity")
 
+    summary_repo.apply_delta(db, project.id, lines=-1 if removes_line else 0, quantity=-request.quantity,
+                             amperage=-request.quantity * (component.amperage_rating or 0), watts=-request.quantity * (component.watts or 0))
+    changes_repo.record(db, "link", component.id, project.user_id, op="delete" if removes_line else "upsert", project_id=project.id)
     db.commit()
-    db.refresh(project)
     
-    return models.ProjectPublic(name=project.name, component_links=project.components, latest_modification=project.updated_at if project.updated_at else project.created_at)
+    return to_project_public(load_project(project_id, db))
 
 
-def export_to_xlsx(project_id: int, db: SessionDep):
-    project = db.exec(select(models.Project).where(models.Project.id == project_id)).one_or_none()
+@retry_locked
+def update_project_components(request: list[models.ComponentLink], project_id: int, db: SessionDep, if_match: str | None = None):
+    project = db.get(models.Project, project_id)
     if not project:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-
-
-    project_component_links = db.exec(select(models.ProjectComponentLink).join(models.Component).where(models.ProjectComponentLink.project_id == project_id)).all()
-
-    if not project_component_links:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project has no components")
-
-
-    project_components_df = pd.DataFrame([
-        {
-            "id": link.component.id,
-            "code": link.component.code,
-            "brand": link.component.brand,
-            "name": link.component.name,
-            "amperage rating": link.component.amperage_rating,
-            "voltage": link.component.voltage,
-            "watts": link.component.watts,
-            "quantity": link.component_quantity
-        }
-        for link in project_component_links
-    ])
-
-
-    total_row = {
-        "id": "TOTAL",
-        "code": "",
-        "brand": "",
-        "name": "",
-        "amperage rating": "",
-        "voltage": "",
-        "watts": "",
-        "quantity": sum(link.component_quantity for link in project_component_links),  
-        "total amperage": project.total_amperage
-    }
-
-    project_components_df = pd.concat([project_components_df, pd.DataFrame([total_row])], ignore_index=True)
-
-    project_components_df.to_excel(f"{project.name}.xlsx", index=False, engine='openpyxl')
-    return JSONResponse(content={"message": f"Project {project.name} exported to Excel successfully."}, status_code=status.HTTP_200_OK)
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
+    # Lista vazia não altera nada: sem isso o projeto seria travado e a versão (o ETag) mudaria à toa
+    if not request:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="the component list is empty")
+    if any(item.id is None and item.code is None for item in request):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="each item needs an id or a code")
+
+    # Resolve todos os componentes pedidos (por id ou código) numa única query
+    ids = {item.id for item in request if item.id is not None}
+    codes = {item.code for item in request if item.id is None}
+    conditions = [models.Component.id.in_(ids)] if ids else []
+    conditions += [models.Component.code.in_(codes)] if codes else []
+    components = db.exec(select(models.Component.id, models.Component.code, models.Component.amperage_rating, models.Component.watts)
+                         .where(or_(*conditions))).all()
+    known_ids = {component.id for component in components}
+    ratings = {component.id: (component.amperage_rating or 0, component.watts or 0) for component in components}
+    ids_by_code = {component.code: component.id for component in components}
+
+    deltas = defaultdict(int)
+    missing = []
+    for item in request:
+        component_id = item.id if item.id is not None else ids_by_code.get(item.code)
+        if component_id not in known_ids:
+            missing.append(item.id if item.id is not None else item.code)
+            continue
+        deltas[component_id] += item.quantity
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"components not found: {missing}")
+
+    # As quantidades atuais são lidas já com o projeto travado: outro lote não as altera antes da escrita
+    lock_project(project_id, db, if_match)
+    current = dict(db.exec(select(models.ProjectComponentLink.component_id, models.ProjectComponentLink.component_quantity)
+                           .where(models.ProjectComponentLink.project_id == project_id)
+                           .where(models.ProjectComponentLink.component_id.in_(list(deltas)))).all())
+    upserts = []
+    deletes = []
+    totals = {"lines": 0, "quantity": 0, "amperage": 0, "watts": 0}
+    for component_id, delta in deltas.items():
+        quantity = current.get(component_id, 0) + delta
+        if quantity < 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Quantity is greater than the current quantity for component {component_id}")
+        if quantity > 0:
+            upserts.append({"project_id": project_id, "component_id": component_id, "component_quantity": quantity})
+        elif component_id in current:
+            deletes.append(component_id)
+        totals["lines"] += (quantity > 0) - (component_id in current)
+        totals["quantity"] += delta
+        totals["amperage"] += delta * ratings[component_id][0]
+        totals["watts"] += delta * ratings[component_id][1]
+
+    if upserts:
+        statement = dialect_insert(db, models.ProjectComponentLink).values(upserts)
+        db.execute(statement.on_conflict_do_update(index_elements=["project_id", "component_id"],
+                                                   set_={"component_quantity": statement.excluded.component_quantity}))
+    if deletes:
+        db.execute(delete(models.ProjectComponentLink)
+                   .where(models.ProjectComponentLink.project_id == project_id)
+                   .where(models.ProjectComponentLink.component_id.in_(deletes)))
+    summary_repo.apply_delta(db, project_id, **totals)
+    changes_repo.record_many(db, "link", [{"entity_id": row["component_id"], "project_id": project_id, "user_id": project.user_id} for row in upserts]
+                             + [{"entity_id": component_id, "project_id": project_id, "op": "delete", "user_id": project.user_id} for component_id in deletes])
+    db.commit()
+
+    return to_project_public(load_project(project_id, db))
@@ -0,0 +1,43 @@
+from ..utils.database import AsyncSessionDep
+from ..utils import models
+from ..utils.pagination import PageParams
+from . import project_repo
+
+# Contrapartes assíncronas de project_repo: a mesma regra de negócio, executada via AsyncSession.run_sync,
+# com todo o I/O passando pelo driver assíncrono sem bloquear o event loop
+
+
+async def create_project(request: models.ProjectBase, db: AsyncSessionDep, current_user: models.User):
+    return await db.run_sync(lambda session: project_repo.create_project(request, session, current_user))
+
+
+async def clone_project(id: int, request: models.ProjectClone, db: AsyncSessionDep, current_user: models.User):
+    return await db.run_sync(lambda session: project_repo.clone_project(id, request, session, current_user))
+
+
+async def get_all_projects(db: AsyncSessionDep, page: PageParams, name: str | None = None, user_id: int | None = None, sort: str = "id"):
+    return await db.run_sync(lambda session: project_repo.get_all_projects(session, page, name=name, user_id=user_id, sort=sort))
+
+
+async def get_project_conditional(id: int, headers, db: AsyncSessionDep):
+    return await db.run_sync(lambda session: project_repo.get_project_conditional(id, headers, session))
+
+
+async def update_project(id: int, request: models.ProjectUpdate, db: AsyncSessionDep, if_match: str | None = None):
+    return await db.run_sync(lambda session: project_repo.update_project(id, request, session, if_match))
+
+
+async def delete_project(id: int, db: AsyncSessionDep, if_match: str | None = None):
+    return await db.run_sync(lambda session: project_repo.delete_project(id, session, if_match))
+
+
+async def add_component_to_project(request: models.ComponentLink, project_id: int, db: AsyncSessionDep, if_match: str | None = None):
+    return await db.run_sync(lambda session: project_repo.add_component_to_project(request, project_id, session, if_match))
+
+
+async def remove_component_from_project(request: models.ComponentLink, project_id: int, db: AsyncSessionDep, if_match: str | None = None):
+    return await db.run_sync(lambda session: project_repo.remove_component_from_project(request, project_id, session, if_match))
+
+
+async def update_project_components(request: list[models.ComponentLink], project_id: int, db: AsyncSessionDep, if_match: str | None = None):
+    return await db.run_sync(lambda session: project_repo.update_project_components(request, project_id, session, if_match))
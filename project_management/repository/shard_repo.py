@@ -0,0 +1,214 @@
+import os
+import time
+from collections import defaultdict
+from sqlalchemy import delete, false, func, insert, or_, update
+from sqlmodel import Session, select
+from ..utils import database, models, sharding
+from . import changes_repo, summary_repo
+
+# Tempo entre travar o usuário (moving) e começar a cópia: requisições que leram o mapa antes da trava terminam de
+# escrever no shard antigo e entram na cópia. Nunca menos que SHARD_CACHE_TTL, a validade do mapa nos processos da API
+MOVE_GRACE = float(os.getenv("SHARD_MOVE_GRACE", "5"))
+BATCH_SIZE = 500  # ids por IN (...), abaixo do limite de parâmetros do SQLite
+
+
+def _batches(values: list, size: int = BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def shards() -> list[int]:
+    return list(range(sharding.SHARD_COUNT + 1))
+
+
+# Linhas de cada usuário num shard (projetos + componentes + links), para comparar a carga dos shards
+def tenant_sizes(shard: int) -> dict[int, int]:
+    sizes = defaultdict(int)
+    link = models.ProjectComponentLink
+    with Session(database.shard_engine(shard)) as db:
+        for model in (models.Project, models.Component):
+            for user_id, count in db.exec(select(model.user_id, func.count()).group_by(model.user_id)):
+                sizes[user_id] += count
+        for user_id, count in db.exec(select(models.Project.user_id, func.count()).select_from(link)
+                                      .join(models.Project, models.Project.id == link.project_id).group_by(models.Project.user_id)):
+            sizes[user_id] += count
+    return sizes
+
+
+# (usuário, shard) de todos os usuários; quem não está no mapa fica no shard 0
+def placements() -> dict[int, int]:
+    with Session(database.engine) as directory:
+        mapped = dict(directory.exec(select(models.TenantShard.user_id, models.TenantShard.shard)).all())
+        return {user_id: mapped.get(user_id, 0) for user_id in directory.exec(select(models.User.id).order_by(models.User.id))}
+
+
+# Usuários e linhas por shard
+def stats():
+    users = defaultdict(list)
+    for user_id, shard in placements().items():
+        users[shard].append(user_id)
+    result = []
+    for shard in shards():
+        sizes = tenant_sizes(shard)
+        result.append((shard, len(users[shard]), sum(sizes.get(user_id, 0) for user_id in users[shard])))
+    return result
+
+
+def _lock(db: Session):
+    # Lock de escrita do banco inteiro (SQLite) até o commit: nenhum outro usuário do shard altera links
+    # que apontam para os dados copiados enquanto a cópia acontece
+    db.execute(update(models.Project).where(false()).values(name=models.Project.name))
+
+
+def _shared_links(db: Session, user_id: int) -> int:
+    # Links entre projetos do usuário e componentes de outros usuários (ou o contrário): não acompanham a mudança
+    link, project, component = models.ProjectComponentLink, models.Project, models.Component
+    return db.exec(select(func.count()).select_from(link)
+                   .join(project, project.id == link.project_id)
+                   .join(component, component.id == link.component_id)
+                   .where(or_(project.user_id == user_id, component.user_id == user_id))
+                   .where(project.user_id != component.user_id)).one()
+
+
+def _copy_rows(db: Session, model, rows: list[dict]) -> list[int]:
+    # Ids novos na ordem das linhas
+    new_ids = []
+    for batch in _batches(rows):
+        new_ids += db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), batch).scalars().all()
+    return new_ids
+
+
+def _switch(directory: Session, user_id: int, target: int, cursor_floor: int, project_ids: dict[int, int]):
+    row = directory.get(models.TenantShard, user_id)
+    row.shard, row.moving, row.cursor_floor = target, False, cursor_floor
+    directory.add(row)
+    # Exportações do usuário apontam para os ids novos dos projetos
+    job = models.ExportJob
+    for job_id, project_id in directory.exec(select(job.id, job.project_id).where(job.user_id == user_id)).all():
+        if project_id in project_ids:
+            directory.execute(update(job).where(job.id == job_id).values(project_id=project_ids[project_id]))
+
+
+def _copy(user_id: int, source: int, target: int):
+    project, component, link = models.Project, models.Component, models.ProjectComponentLink
+    with Session(database.shard_engine(source)) as src, Session(database.shard_engine(target)) as dst:
+        _lock(src)
+        shared = _shared_links(src, user_id)
+        if shared:
+            raise ValueError(f"user {user_id} shares {shared} component links with other users on shard {source}")
+
+        components = src.exec(select(component).where(component.user_id == user_id).order_by(component.id)).all()
+        codes = [row.code for row in components]
+        conflicts = [code for batch in _batches(codes) for code in dst.exec(select(component.code).where(component.code.in_(batch)))]
+        if conflicts:
+            raise ValueError(f"component codes already used on shard {target}: {', '.join(conflicts[:10])}")
+        projects = src.exec(select(project).where(project.user_id == user_id).order_by(project.id)).all()
+
+        # Ids são por shard: projetos e componentes recebem ids novos e os links são remapeados
+        component_ids = dict(zip([row.id for row in components],
+                                 _copy_rows(dst, component, [row.model_dump(exclude={"id"}) for row in components])))
+        project_ids = dict(zip([row.id for row in projects],
+                               _copy_rows(dst, project, [row.model_dump(exclude={"id"}) for row in projects])))
+        for batch in _batches(list(project_ids)):
+            lines = src.exec(select(link.project_id, link.component_id, link.component_quantity).where(link.project_id.in_(batch))).all()
+            if lines:
+                dst.execute(insert(link), [{"project_id": project_ids[line.project_id], "component_id": component_ids[line.component_id],
+                                            "component_quantity": line.component_quantity} for line in lines])
+            summary_repo.recompute(dst, [project_ids[project_id] for project_id in batch])
+
+        # Feed de alterações: o primeiro registro no destino fica acima de todos os cursores dos dois shards, e
+        # cursores anteriores a ele recebem 410 (changes_repo.get_changes)
+        log = models.ChangeLog
+        cursor_floor = max(src.exec(select(func.max(log.id))).one() or 0, dst.exec(select(func.max(log.id))).one() or 0) + 1
+        dst.add(models.ChangeLog(id=cursor_floor, entity="user", entity_id=user_id, user_id=user_id))
+        dst.flush()
+        changes_repo.record_many(dst, "project", [{"entity_id": project_id, "user_id": user_id} for project_id in project_ids.values()])
+        changes_repo.record_many(dst, "component", [{"entity_id": component_id, "user_id": user_id} for component_id in component_ids.values()])
+
+        for batch in _batches(list(project_ids)):
+            src.execute(delete(link).where(link.project_id.in_(batch)))
+            src.execute(delete(models.ProjectSummary).where(models.ProjectSummary.project_id.in_(batch)))
+            src.execute(delete(project).where(project.id.in_(batch)))
+        for batch in _batches(list(component_ids)):
+            src.execute(delete(component).where(component.id.in_(batch)))
+        changes_repo.record_many(src, "project", [{"entity_id": project_id, "op": "delete", "user_id": user_id} for project_id in project_ids])
+        changes_repo.record_many(src, "component", [{"entity_id": component_id, "op": "delete", "user_id": user_id} for component_id in component_ids])
+
+        # Destino primeiro, depois o mapa, por último a remoção na origem: uma falha no meio deixa no máximo uma
+        # cópia órfã na origem, nunca um usuário sem dados. Com origem no shard 0 o mapa está no mesmo banco e vai
+        # no mesmo commit, já que a origem está travada
+        dst.commit()
+        if source == 0:
+            _switch(src, user_id, target, cursor_floor, project_ids)
+        else:
+            with Session(database.engine) as directory:
+                _switch(directory, user_id, target, cursor_floor, project_ids)
+                directory.commit()
+        src.commit()
+    return len(projects), len(components)
+
+
+# Move os dados de um usuário para outro shard. As requisições dele recebem 503 (Retry-After) até o fim da cópia
+def move_tenant(user_id: int, target: int, grace: float = MOVE_GRACE):
+    if not 1 <= target <= sharding.SHARD_COUNT:
+        raise ValueError(f"shard must be between 1 and {sharding.SHARD_COUNT}")
+    with Session(database.engine) as directory:
+        if not directory.get(models.User, user_id):
+            raise ValueError(f"user {user_id} not found")
+        row = sharding.tenant(directory, user_id)
+        source = row.shard
+        if source == target:
+            return source, 0, 0
+        row.moving = True
+        directory.add(row)
+        directory.commit()
+    sharding.tenant_cache.pop(user_id)
+
+    time.sleep(max(grace, sharding.SHARD_CACHE_TTL))
+    try:
+        projects, components = _copy(user_id, source, target)
+    except Exception:
+        with Session(database.engine) as directory:
+            directory.execute(update(models.TenantShard).where(models.TenantShard.user_id == user_id).values(moving=False))
+            directory.commit()
+        raise
+    finally:
+        sharding.tenant_cache.pop(user_id)
+    return source, projects, components
+
+
+# Plano de movimentos: todos os usuários do shard 0 saem (os maiores primeiro, para o shard mais leve) e, depois,
+# enquanto houver um usuário no shard mais pesado menor que a diferença para o mais leve, ele muda de shard.
+# Cada usuário aparece uma vez; o tamanho conta uma linha a mais para que usuários sem dados também se distribuam
+def plan_rebalance(max_moves: int):
+    placement = placements()
+    sizes = {}
+    for shard in set(placement.values()):
+        shard_sizes = tenant_sizes(shard)
+        sizes.update({user_id: shard_sizes.get(user_id, 0) + 1 for user_id, current in placement.items() if current == shard})
+    loads = {shard: 0 for shard in range(1, sharding.SHARD_COUNT + 1)}
+    for user_id, shard in placement.items():
+        if shard:
+            loads[shard] += sizes[user_id]
+
+    moves = []
+    def move(user_id: int, target: int):
+        moves.append((user_id, placement[user_id], target))
+        if placement[user_id]:
+            loads[placement[user_id]] -= sizes[user_id]
+        loads[target] += sizes[user_id]
+        placement[user_id] = target
+
+    for user_id in sorted((user_id for user_id, shard in placement.items() if shard == 0), key=lambda user_id: -sizes[user_id]):
+        if len(moves) >= max_moves:
+            return moves
+        move(user_id, min(loads, key=lambda shard: (loads[shard], shard)))
+    while len(moves) < max_moves:
+        heavy, light = max(loads, key=loads.get), min(loads, key=loads.get)
+        gap = loads[heavy] - loads[light]
+        moved = {user_id for user_id, _, _ in moves}
+        candidates = [user_id for user_id, shard in placement.items() if shard == heavy and sizes[user_id] < gap and user_id not in moved]
+        if not candidates:
+            break
+        move(min(candidates, key=lambda user_id: abs(gap / 2 - sizes[user_id])), light)
+    return moves
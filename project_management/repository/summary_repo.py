@@ -0,0 +1,130 @@
+from datetime import datetime
+from sqlalchemy import delete, exists, func, insert, literal, update
+from sqlmodel import Session, select
+from ..utils import models
+from ..utils.database import dialect_insert
+
+TOTAL_FIELDS = ("line_count", "total_quantity", "total_amperage", "total_watts")
+SUMMARY_COLUMNS = ["project_id", "line_count", "total_quantity", "total_amperage", "total_watts", "version", "updated_at"]
+
+
+def create_summary(db: Session, project_id: int):
+    db.add(models.ProjectSummary(project_id=project_id))
+
+
+# Cópia de projeto: mesmos links, mesmos totais; copiados com INSERT ... SELECT
+def copy_summary(db: Session, source_id: int, project_id: int):
+    summary = models.ProjectSummary
+    totals = (select(literal(project_id), *[getattr(summary, field) for field in TOTAL_FIELDS], literal(1), literal(datetime.utcnow()))
+              .where(summary.project_id == source_id))
+    db.execute(insert(summary).from_select(SUMMARY_COLUMNS, totals))
+
+
+# Serializa as alterações de um projeto até o commit: no SQLite o UPDATE toma o lock de escrita do banco (as leituras
+# seguintes já veem o último commit), no PostgreSQL trava a linha do resumo. Não muda nada
+def lock(db: Session, project_id: int):
+    summary = models.ProjectSummary
+    db.execute(update(summary).where(summary.project_id == project_id).values(version=summary.version))
+
+
+# Aplica a variação dos totais de um projeto com um UPDATE relativo, na transação de quem alterou os links
+def apply_delta(db: Session, project_id: int, lines: int = 0, quantity: int = 0, amperage: int = 0, watts: int = 0):
+    summary = models.ProjectSummary
+    db.execute(update(summary)
+               .where(summary.project_id == project_id)
+               .values(line_count=summary.line_count + lines,
+                       total_quantity=summary.total_quantity + quantity,
+                       total_amperage=summary.total_amperage + amperage,
+                       total_watts=summary.total_watts + watts,
+                       version=summary.version + 1,
+                       updated_at=datetime.utcnow()))
+
+
+# Mudança de amperagem/potência de um componente: corrige os totais de todos os projetos que o usam
+def apply_rating_change(db: Session, component_id: int, amperage: int, watts: int):
+    if not amperage and not watts:
+        return
+    summary = models.ProjectSummary
+    link = models.ProjectComponentLink
+    quantity = (select(link.component_quantity)
+                .where(link.project_id == summary.project_id)
+                .where(link.component_id == component_id)
+                .scalar_subquery())
+    db.execute(update(summary)
+               .where(summary.project_id.in_(select(link.project_id).where(link.component_id == component_id)))
+               .values(total_amperage=summary.total_amperage + amperage * quantity,
+                       total_watts=summary.total_watts + watts * quantity,
+                       version=summary.version + 1,
+                       updated_at=datetime.utcnow()))
+
+
+# Mudança de código/marca/nome de um componente: os totais não mudam, mas a versão (ETag) dos projetos sim
+def touch_component(db: Session, component_id: int):
+    summary = models.ProjectSummary
+    link = models.ProjectComponentLink
+    db.execute(update(summary)
+               .where(summary.project_id.in_(select(link.project_id).where(link.component_id == component_id)))
+               .values(version=summary.version + 1, updated_at=datetime.utcnow()))
+
+
+def computed_totals():
+    link = models.ProjectComponentLink
+    component = models.Component
+    return (select(models.Project.id.label("project_id"),
+                   func.count(link.component_id).label("line_count"),
+                   func.coalesce(func.sum(link.component_quantity), 0).label("total_quantity"),
+                   func.coalesce(func.sum(link.component_quantity * component.amperage_rating), 0).label("total_amperage"),
+                   func.coalesce(func.sum(link.component_quantity * component.watts), 0).label("total_watts"))
+            .select_from(models.Project)
+            .outerjoin(link, link.project_id == models.Project.id)
+            .outerjoin(component, component.id == link.component_id)
+            .group_by(models.Project.id))
+
+
+# Grava os totais recalculados via INSERT ... SELECT, atualizando os resumos que já existem
+def _upsert_computed(db: Session, totals):
+    summary = models.ProjectSummary
+    totals = totals.add_columns(literal(1).label("version"), literal(datetime.utcnow()).label("updated_at"))
+    statement = dialect_insert(db, summary).from_select(SUMMARY_COLUMNS, totals)
+    statement = statement.on_conflict_do_update(
+        index_elements=["project_id"],
+        set_={**{field: statement.excluded[field] for field in TOTAL_FIELDS},
+              "version": summary.version + 1,
+              "updated_at": statement.excluded.updated_at})
+    return db.execute(statement).rowcount
+
+
+def recompute(db: Session, project_ids: list[int]):
+    if project_ids:
+        _upsert_computed(db, computed_totals().where(models.Project.id.in_(project_ids)))
+
+
+def backfill(db: Session):
+    # Cria os resumos que faltam (projetos anteriores a esta tabela)
+    missing = ~exists().where(models.ProjectSummary.project_id == models.Project.id)
+    created = _upsert_computed(db, computed_totals().where(missing))
+    db.commit()
+    return created
+
+
+def rebuild(db: Session):
+    rebuilt = _upsert_computed(db, computed_totals())
+    db.execute(delete(models.ProjectSummary)
+               .where(~exists().where(models.Project.id == models.ProjectSummary.project_id)))
+    db.commit()
+    return rebuilt
+
+
+def verify(db: Session):
+    # Compara os resumos gravados com os totais recalculados; retorna (project_id, campo, gravado, calculado)
+    totals = computed_totals().subquery()
+    summary = models.ProjectSummary
+    statement = (select(totals, *[getattr(summary, field).label(f"stored_{field}") for field in TOTAL_FIELDS])
+                 .outerjoin(summary, summary.project_id == totals.c.project_id))
+    drift = []
+    for row in db.exec(statement):
+        for field in TOTAL_FIELDS:
+            stored, expected = getattr(row, f"stored_{field}"), getattr(row, field)
+            if stored != expected:
+                drift.append((row.project_id, field, stored, expected))
+    return drift
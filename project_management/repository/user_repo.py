@@ -1,10 +1,23 @@
 from fastapi import HTTPException, status
+from sqlalchemy import delete
 from sqlmodel import select
 from ..utils.database import SessionDep
-from ..utils import hashing, models
+from ..utils import hashing, models, oauth2, responses, sharding
+from ..utils.pagination import PageParams, paginate_rows
+from . import changes_repo, component_repo, project_repo
+
+SORT_COLUMNS = {
+    "id": models.User.id,
+    "username": models.User.username,
+}
 
 def create_user(request: models.UserCreate, db: SessionDep):
-    
+    check_new_user(request, db)
+    request.password = hashing.Hash.get_password_hash(request.password)
+    return insert_user(request, db)
+
+
+def check_new_user(request: models.UserCreate, db: SessionDep):
     existing_user = db.exec(select(models.User).where(models.User.username == request.username)).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already exists")
@@ -12,22 +25,29 @@ def create_user(request: models.UserCreate, db: SessionDep):
     existing_email = db.exec(select(models.User).where(models.User.email == request.email)).first()
     if existing_email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Email already exists")
-    
-    hashed_password = hashing.Hash.get_password_hash(request.password)
-    request.password = hashed_password
+
+
+# request.password já deve ser o hash
+def insert_user(request: models.UserCreate, db: SessionDep):
     db_user = models.User.model_validate(request)
     db.add(db_user)
+    db.flush()
+    if sharding.sharded():
+        # O registro de alterações do usuário já vai para o shard escolhido
+        db.info["shard"] = sharding.assign(db, db_user.id).shard
+    changes_repo.record(db, "user", db_user.id, db_user.id)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
-def get_all_users(db: SessionDep):
-    users = db.exec(select(models.User)).all()
-    if not users:
+def get_all_users(db: SessionDep, page: PageParams, sort: str = "id"):
+    # Só os campos de UserPublic: o hash da senha nem sai do banco
+    users = paginate_rows(db, select(models.User.username, models.User.email, models.User.id), models.User.id, SORT_COLUMNS[sort], page)
+    if not users["items"] and page.cursor is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no users found")
    
-    return users
+    return responses.FastJSONResponse(users)
 
 
 def get_user(id: int, db: SessionDep):
@@ -38,17 +58,27 @@ def get_user(id: int, db: SessionDep):
 
 
 def update_user(id: int, request: models.UserUpdate, db: SessionDep):
-    db_user = db.get(models.User, id)
-    if not db_user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User not found")
     if request.password not in (None, ""):
         hashed_password = hashing.Hash.get_password_hash(request.password)
         request.password = hashed_password
+    return apply_user_update(id, request, db)
+
+
+# request.password, quando informado, já deve ser o hash
+def apply_user_update(id: int, request: models.UserUpdate, db: SessionDep):
+    db_user = db.get(models.User, id)
+    if not db_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User not found")
     user_data = request.model_dump(exclude_unset=True)
+    old_username = db_user.username
     db_user.sqlmodel_update(user_data)
     db.add(db_user)
+    if sharding.sharded():
+        sharding.use_tenant(db, id)
+    changes_repo.record(db, "user", db_user.id, db_user.id)
     db.commit()
     db.refresh(db_user)
+    oauth2.invalidate_user(old_username, db_user.username)
     return db_user
 
 
@@ -56,21 +86,22 @@ def delete_user(id: int, db: SessionDep):
     db_user = db.get(models.User, id)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User not found")
+    if sharding.sharded():
+        # Projetos e componentes do usuário estão no shard dele
+        sharding.use_tenant(db, id)
+        db.execute(delete(models.TenantShard).where(models.TenantShard.user_id == id))
+        sharding.tenant_cache.pop(id)
     db.delete(db_user)
+    changes_repo.record(db, "user", db_user.id, db_user.id, op="delete")
     db.commit()
+    oauth2.invalidate_user(db_user.username)
     return {"message": "User Deleted"}
 
 # Projects
-def get_all_user_projects(db: SessionDep, current_user: models.User):
-    projects = db.exec(select(models.Project).where(models.Project.user_id == current_user.id)).all()
-    if not projects:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="empty list, please add an item")
-    return projects
+def get_all_user_projects(db: SessionDep, current_user: models.User, page: PageParams, name: str | None = None, sort: str = "id"):
+    return project_repo.get_all_projects(db, page, name=name, user_id=current_user.id, sort=sort, columns=project_repo.PROJECT_READ_COLUMNS)
 
 
 # Components
-def get_all_user_components(db: SessionDep, current_user: models.User):
-    components = db.exec(select(models.Component).where(models.Component.user_id == current_user.id)).all()
-    if not components:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="empty list, please add an item")
-    return components
\ No newline at end of file
+def get_all_user_components(db: SessionDep, current_user: models.User, page: PageParams, brand: str | None = None, name: str | None = None, code: str | None = None, sort: str = "id"):
+    return component_repo.get_all_components(db, page, brand=brand, name=name, code=code, user_id=current_user.id, sort=sort)
\ No newline at end of file
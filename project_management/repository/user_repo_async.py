@@ -0,0 +1,38 @@
+from ..utils.database import AsyncSessionDep
+from ..utils import hashing, models
+from ..utils.pagination import PageParams
+from . import user_repo
+
+# Contrapartes assíncronas de user_repo (ver project_repo_async); o bcrypt roda no executor de hashing
+
+
+async def create_user(request: models.UserCreate, db: AsyncSessionDep):
+    await db.run_sync(lambda session: user_repo.check_new_user(request, session))
+    request.password = await hashing.Hash.get_password_hash_async(request.password)
+    return await db.run_sync(lambda session: user_repo.insert_user(request, session))
+
+
+async def get_all_users(db: AsyncSessionDep, page: PageParams, sort: str = "id"):
+    return await db.run_sync(lambda session: user_repo.get_all_users(session, page, sort=sort))
+
+
+async def get_user(id: int, db: AsyncSessionDep):
+    return await db.run_sync(lambda session: user_repo.get_user(id, session))
+
+
+async def update_user(id: int, request: models.UserUpdate, db: AsyncSessionDep):
+    if request.password not in (None, ""):
+        request.password = await hashing.Hash.get_password_hash_async(request.password)
+    return await db.run_sync(lambda session: user_repo.apply_user_update(id, request, session))
+
+
+async def delete_user(id: int, db: AsyncSessionDep):
+    return await db.run_sync(lambda session: user_repo.delete_user(id, session))
+
+
+async def get_all_user_projects(db: AsyncSessionDep, current_user: models.User, page: PageParams, name: str | None = None, sort: str = "id"):
+    return await db.run_sync(lambda session: user_repo.get_all_user_projects(session, current_user, page, name=name, sort=sort))
+
+
+async def get_all_user_components(db: AsyncSessionDep, current_user: models.User, page: PageParams, brand: str | None = None, name: str | None = None, code: str | None = None, sort: str = "id"):
+    return await db.run_sync(lambda session: user_repo.get_all_user_components(session, current_user, page, brand=brand, name=name, code=code, sort=sort))
@@ -0,0 +1,37 @@
+from typing import Literal
+from fastapi import APIRouter, status, Depends, Query
+from ..utils.database import SessionDep
+from ..repository import analytics_repo
+from ..utils import oauth2, models, sharding
+
+router = APIRouter(tags=["Analytics"], prefix="/analytics", responses={404: {"description": "Not found"}})
+
+# scope=user considera só os projetos do usuário atual; scope=all, todos os projetos
+
+
+def scope_user_id(scope: Literal["user", "all"] = "user", current_user: models.User = Depends(oauth2.get_current_user)):
+    sharding.check_scope(scope)
+    return current_user.id if scope == "user" else None
+
+
+@router.get("/projects", response_model=list[models.ProjectLoad], status_code=status.HTTP_200_OK)
+def project_loads(db: SessionDep, user_id: int | None = Depends(scope_user_id), sort: Literal["total_watts", "total_amperage", "total_quantity", "line_count"] = "total_watts",
+                  limit: int = Query(default=100, ge=1, le=10000)):
+    return analytics_repo.project_loads(db, user_id, sort, limit)
+
+
+@router.get("/projects/overloaded", response_model=list[models.ProjectLoad], status_code=status.HTTP_200_OK)
+def overloaded_projects(db: SessionDep, user_id: int | None = Depends(scope_user_id), max_amperage: int | None = None, max_watts: int | None = None,
+                        limit: int = Query(default=100, ge=1, le=10000)):
+    return analytics_repo.overloaded_projects(db, user_id, max_amperage, max_watts, limit)
+
+
+@router.get("/components/top", response_model=list[models.ComponentUsage], status_code=status.HTTP_200_OK)
+def top_components(db: SessionDep, user_id: int | None = Depends(scope_user_id), sort: Literal["project_count", "total_quantity", "total_amperage", "total_watts"] = "project_count",
+                   limit: int = Query(default=10, ge=1, le=1000)):
+    return analytics_repo.top_components(db, user_id, sort, limit)
+
+
+@router.get("/stats", response_model=models.LoadStats, status_code=status.HTTP_200_OK)
+def load_stats(db: SessionDep, user_id: int | None = Depends(scope_user_id)):
+    return analytics_repo.load_stats(db, user_id)
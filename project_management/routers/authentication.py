@@ -11,7 +11,7 @@ router = APIRouter(tags=["Login"])
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: SessionDep) -> JWToken.Token:
 
-    user = JWToken.authenticate_user(db, form_data.username, form_data.password)
+    user = await JWToken.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password", headers={"WWW-Authenticate": "Bearer"},)
     
@@ -0,0 +1,23 @@
+from typing import Literal
+from fastapi import APIRouter, status, Depends, Query
+from ..utils.database import SessionDep
+from ..repository import changes_repo
+from ..utils import oauth2, models, sharding
+
+router = APIRouter(tags=["Sync"], prefix="/changes", responses={404: {"description": "Not found"}})
+
+# scope=user traz só as alterações do que pertence ao usuário atual (o próprio usuário, seus projetos, componentes e
+# links); scope=all, todas
+
+
+def scope_user_id(scope: Literal["user", "all"] = "user", current_user: models.User = Depends(oauth2.get_current_user)):
+    sharding.check_scope(scope)
+    return current_user.id if scope == "user" else None
+
+
+# Sem since, retorna só o cursor atual: o cliente guarda o cursor, baixa as listas e depois consulta com since=cursor
+@router.get("/", response_model=models.ChangeFeed, response_model_exclude_none=True, status_code=status.HTTP_200_OK,
+            responses={410: {"description": "Cursor older than the retained changes"}})
+def get_changes(db: SessionDep, since: int | None = Query(default=None, ge=0), limit: int = Query(default=500, ge=1, le=1000),
+                user_id: int | None = Depends(scope_user_id)):
+    return changes_repo.get_changes(db, since, limit, user_id)
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, status, Depends
+from typing import Literal
+from fastapi import APIRouter, status, Depends, Query, Request, Response, UploadFile
 from ..utils.database import SessionDep
+from ..utils.pagination import PageDep
 from ..repository import component_repo
 from ..utils import oauth2, models
 
@@ -10,14 +12,26 @@ def create_component(request: models.ComponentBase, db: SessionDep, current_user
     return component_repo.create_component(request, db, current_user)
 
 
-@router.get("/", response_model=list[models.Component], status_code=status.HTTP_200_OK)
-def get_all_components(db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return component_repo.get_all_components(db)
+@router.post("/import", response_model=models.ComponentImportReport, status_code=status.HTTP_200_OK)
+def import_components(file: UploadFile, db: SessionDep, upsert: bool = False, current_user: models.User = Depends(oauth2.get_current_user)):
+    return component_repo.import_components(file, upsert, db, current_user)
 
 
-@router.get("/{id}", response_model=models.ComponentBase, status_code=status.HTTP_200_OK)   
-def get_component(id: str, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return component_repo.get_component(id, db)
+@router.get("/", response_model=models.Page[models.Component], status_code=status.HTTP_200_OK)
+def get_all_components(db: SessionDep, page: PageDep, brand: str | None = None, name: str | None = None, code: str | None = Query(default=None, description="Code prefix"),
+                       user_id: int | None = None, sort: Literal["id", "code", "brand", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user)):
+    return component_repo.get_all_components(db, page, brand=brand, name=name, code=code, user_id=user_id, sort=sort)
+
+
+@router.get("/search", response_model=list[models.Component], status_code=status.HTTP_200_OK)
+def search_components(db: SessionDep, q: str = Query(min_length=1, max_length=200, description="Words or prefixes of code, brand and name"),
+                      limit: int = Query(default=20, ge=1, le=100), current_user: models.User = Depends(oauth2.get_current_user)):
+    return component_repo.search_components(db, q, limit)
+
+
+@router.get("/{id}", response_model=models.ComponentBase, status_code=status.HTTP_200_OK, responses={304: {"description": "Not modified"}})
+def get_component(id: str, request: Request, response: Response, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return component_repo.get_component_conditional(id, request.headers, response, db)
 
 
 @router.patch("/{id}", response_model=models.ComponentBase, status_code=status.HTTP_200_OK)
@@ -0,0 +1,40 @@
+from typing import Literal
+from fastapi import APIRouter, status, Depends, Query, Request, Response
+from ..utils.database import AsyncSessionDep
+from ..utils.pagination import PageDep
+from ..repository import component_repo_async
+from ..utils import oauth2, models
+
+# Mesmas rotas de component.py sobre AsyncSession (a importação de planilhas continua síncrona)
+router = APIRouter(tags=["Components"], prefix="/component", responses={404: {"description": "Not found"}})
+
+@router.post("/", response_model=models.ComponentBase, status_code=status.HTTP_201_CREATED)
+async def create_component_async(request: models.ComponentBase, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await component_repo_async.create_component(request, db, current_user)
+
+
+@router.get("/", response_model=models.Page[models.Component], status_code=status.HTTP_200_OK)
+async def get_all_components_async(db: AsyncSessionDep, page: PageDep, brand: str | None = None, name: str | None = None, code: str | None = Query(default=None, description="Code prefix"),
+                                   user_id: int | None = None, sort: Literal["id", "code", "brand", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await component_repo_async.get_all_components(db, page, brand=brand, name=name, code=code, user_id=user_id, sort=sort)
+
+
+@router.get("/search", response_model=list[models.Component], status_code=status.HTTP_200_OK)
+async def search_components_async(db: AsyncSessionDep, q: str = Query(min_length=1, max_length=200, description="Words or prefixes of code, brand and name"),
+                                  limit: int = Query(default=20, ge=1, le=100), current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await component_repo_async.search_components(db, q, limit)
+
+
+@router.get("/{id}", response_model=models.ComponentBase, status_code=status.HTTP_200_OK, responses={304: {"description": "Not modified"}})
+async def get_component_async(id: str, request: Request, response: Response, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await component_repo_async.get_component_conditional(id, request.headers, response, db)
+
+
+@router.patch("/{id}", response_model=models.ComponentBase, status_code=status.HTTP_200_OK)
+async def update_component_async(id: str, request: models.ComponentUpdate, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await component_repo_async.update_component(id, request, db)
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_component_async(id: str, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await component_repo_async.delete_component(id, db)
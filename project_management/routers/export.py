@@ -1,12 +1,39 @@
-from fastapi import APIRouter, status, Response, Depends
+from typing import Literal
+from fastapi import APIRouter, status, Depends
 from ..utils.database import SessionDep
-from ..repository import project_repo
+from ..repository import export_repo
 from ..utils import oauth2, models
 
 
 router = APIRouter(tags=["Export"], prefix="/export", responses={404: {"description": "Not found"}})
 
 
-@router.get("/export/{project_id}", response_class=Response, status_code=status.HTTP_200_OK)
-def export_projects_to_xlsx(project_id: int, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.export_to_xlsx(project_id, db)
\ No newline at end of file
+@router.get("/export/{project_id}", status_code=status.HTTP_200_OK)
+def export_project(project_id: int, db: SessionDep, format: Literal["xlsx", "csv"] = "xlsx", current_user: models.User = Depends(oauth2.get_current_user)):
+    return export_repo.export_project(project_id, format, db)
+
+
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+def export_projects(request: models.BulkExportRequest, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return export_repo.export_projects(request, db, current_user)
+
+
+@router.post("/bom", status_code=status.HTTP_200_OK)
+def export_bom(request: models.BomExportRequest, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return export_repo.export_bom(request, db, current_user)
+
+
+# Background jobs
+@router.post("/jobs", response_model=models.ExportJobPublic, status_code=status.HTTP_202_ACCEPTED)
+def create_export_job(request: models.ExportJobCreate, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return export_repo.create_export_job(request, db, current_user)
+
+
+@router.get("/jobs/{id}", response_model=models.ExportJobPublic, status_code=status.HTTP_200_OK)
+def get_export_job(id: int, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return export_repo.get_export_job(id, db, current_user)
+
+
+@router.get("/jobs/{id}/download", status_code=status.HTTP_200_OK)
+def download_export_job(id: int, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return export_repo.download_export_job(id, db, current_user)
\ No newline at end of file
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from ..utils import metrics
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+# Formato texto do Prometheus; sem autenticação, como de costume para o scraper (restringir no proxy)
+@router.get("/metrics", response_class=PlainTextResponse, status_code=status.HTTP_200_OK, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, status, Depends, Response
+from typing import Literal
+from fastapi import APIRouter, status, Depends, Header, Request
 from ..utils.database import SessionDep
+from ..utils.pagination import PageDep
 from ..repository import project_repo
 from ..utils import oauth2, models
 
@@ -11,34 +13,42 @@ def create_project(request: models.ProjectBase, db: SessionDep, current_user: mo
     return project_repo.create_project(request, db, current_user)
 
 
-@router.get("/", response_model=list[models.ProjectList], status_code=status.HTTP_200_OK)
-def get_all_projects(db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.get_all_projects(db)
+@router.post("/{id}/clone", response_model=models.ProjectRead, status_code=status.HTTP_201_CREATED)
+def clone_project(id: int, db: SessionDep, request: models.ProjectClone | None = None, current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.clone_project(id, request or models.ProjectClone(), db, current_user)
 
 
-@router.get("/{id}", response_model=models.ProjectPublic, status_code=status.HTTP_200_OK)
-def get_project(id: str, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.get_project(id, db)
+@router.get("/", response_model=models.Page[models.ProjectList], status_code=status.HTTP_200_OK)
+def get_all_projects(db: SessionDep, page: PageDep, name: str | None = None, user_id: int | None = None, sort: Literal["id", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.get_all_projects(db, page, name=name, user_id=user_id, sort=sort)
+
+
+@router.get("/{id}", response_model=models.ProjectPublic, status_code=status.HTTP_200_OK, responses={304: {"description": "Not modified"}})
+def get_project(id: str, request: Request, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.get_project_conditional(id, request.headers, db)
 
 
 @router.patch("/{id}", response_model=models.ProjectPublic, status_code=status.HTTP_200_OK)
-def update_project(id: str, request: models.ProjectUpdate, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.update_project(id, request, db)
+def update_project(id: str, request: models.ProjectUpdate, db: SessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.update_project(id, request, db, if_match)
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(id: str, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.delete_project(id, db)
+def delete_project(id: str, db: SessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.delete_project(id, db, if_match)
 
 
 # Component Functions
 @router.patch("/{project_id}/add-component", response_model=models.ProjectPublic)
-def add_component_to_project(request: models.ComponentLink, project_id: int, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.add_component_to_project(request, project_id, db)
+def add_component_to_project(request: models.ComponentLink, project_id: int, db: SessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.add_component_to_project(request, project_id, db, if_match)
 
 
 @router.delete("/{project_id}/delete-component", response_model=models.ProjectPublic)
-def remove_component_from_project(request: models.ComponentLink, project_id: int, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return project_repo.remove_component_from_project(request, project_id, db)
+def remove_component_from_project(request: models.ComponentLink, project_id: int, db: SessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.remove_component_from_project(request, project_id, db, if_match)
 
 
+@router.patch("/{project_id}/components", response_model=models.ProjectPublic)
+def update_project_components(request: list[models.ComponentLink], project_id: int, db: SessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user)):
+    return project_repo.update_project_components(request, project_id, db, if_match)
@@ -0,0 +1,55 @@
+from typing import Literal
+from fastapi import APIRouter, status, Depends, Header, Request
+from ..utils.database import AsyncSessionDep
+from ..utils.pagination import PageDep
+from ..repository import project_repo_async
+from ..utils import oauth2, models
+
+# Mesmas rotas de project.py sobre AsyncSession; incluídas no lugar das síncronas quando DATABASE_ASYNC está ativo
+router = APIRouter(tags=["Projects"], prefix="/project", responses={404: {"description": "Not found"}})
+
+
+@router.post("/", response_model=models.ProjectPublic, status_code=status.HTTP_201_CREATED)
+async def create_project_async(request: models.ProjectBase, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.create_project(request, db, current_user)
+
+
+@router.post("/{id}/clone", response_model=models.ProjectRead, status_code=status.HTTP_201_CREATED)
+async def clone_project_async(id: int, db: AsyncSessionDep, request: models.ProjectClone | None = None, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.clone_project(id, request or models.ProjectClone(), db, current_user)
+
+
+@router.get("/", response_model=models.Page[models.ProjectList], status_code=status.HTTP_200_OK)
+async def get_all_projects_async(db: AsyncSessionDep, page: PageDep, name: str | None = None, user_id: int | None = None, sort: Literal["id", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.get_all_projects(db, page, name=name, user_id=user_id, sort=sort)
+
+
+@router.get("/{id}", response_model=models.ProjectPublic, status_code=status.HTTP_200_OK, responses={304: {"description": "Not modified"}})
+async def get_project_async(id: str, request: Request, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.get_project_conditional(id, request.headers, db)
+
+
+@router.patch("/{id}", response_model=models.ProjectPublic, status_code=status.HTTP_200_OK)
+async def update_project_async(id: str, request: models.ProjectUpdate, db: AsyncSessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.update_project(id, request, db, if_match)
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_project_async(id: str, db: AsyncSessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.delete_project(id, db, if_match)
+
+
+# Component Functions
+@router.patch("/{project_id}/add-component", response_model=models.ProjectPublic)
+async def add_component_to_project_async(request: models.ComponentLink, project_id: int, db: AsyncSessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.add_component_to_project(request, project_id, db, if_match)
+
+
+@router.delete("/{project_id}/delete-component", response_model=models.ProjectPublic)
+async def remove_component_from_project_async(request: models.ComponentLink, project_id: int, db: AsyncSessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.remove_component_from_project(request, project_id, db, if_match)
+
+
+@router.patch("/{project_id}/components", response_model=models.ProjectPublic)
+async def update_project_components_async(request: list[models.ComponentLink], project_id: int, db: AsyncSessionDep, if_match: str | None = Header(default=None), current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await project_repo_async.update_project_components(request, project_id, db, if_match)
@@ -1,5 +1,7 @@
-from fastapi import status, APIRouter, Depends
+from typing import Literal
+from fastapi import status, APIRouter, Depends, Query
 from ..utils.database import SessionDep
+from ..utils.pagination import PageDep
 from ..repository import user_repo
 from ..utils import oauth2, models
 
@@ -10,9 +12,9 @@ def create_user(request: models.UserCreate, db: SessionDep):
     return user_repo.create_user(request, db)
 
 
-@router.get("/", response_model=list[models.UserPublic], status_code=status.HTTP_200_OK)
-def get_all_users(db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return user_repo.get_all_users(db)  
+@router.get("/", response_model=models.Page[models.UserPublic], status_code=status.HTTP_200_OK)
+def get_all_users(db: SessionDep, page: PageDep, sort: Literal["id", "username"] = "id", current_user: models.User = Depends(oauth2.get_current_user)):
+    return user_repo.get_all_users(db, page, sort=sort)  
 
 
 @router.get("/{id:int}", response_model=models.UserPublic, status_code=status.HTTP_200_OK)
@@ -29,10 +31,11 @@ def update_user(id: int, request: models.UserUpdate, db: SessionDep, current_use
 def delete_user(id: int, db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
     return user_repo.delete_user(id, db)
     
-@router.get("/projects", response_model=list[models.Project], status_code=status.HTTP_200_OK)
-def get_all_user_projects(db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return user_repo.get_all_user_projects(db, current_user)
-
-@router.get("/components", response_model=list[models.Component], status_code=status.HTTP_200_OK)
-def get_all_user_components(db: SessionDep, current_user: models.User = Depends(oauth2.get_current_user)):
-    return user_repo.get_all_user_components(db, current_user)
\ No newline at end of file
+@router.get("/projects", response_model=models.Page[models.ProjectRead], status_code=status.HTTP_200_OK)
+def get_all_user_projects(db: SessionDep, page: PageDep, name: str | None = None, sort: Literal["id", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user)):
+    return user_repo.get_all_user_projects(db, current_user, page, name=name, sort=sort)
+
+@router.get("/components", response_model=models.Page[models.Component], status_code=status.HTTP_200_OK)
+def get_all_user_components(db: SessionDep, page: PageDep, brand: str | None = None, name: str | None = None, code: str | None = Query(default=None, description="Code prefix"),
+                            sort: Literal["id", "code", "brand", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user)):
+    return user_repo.get_all_user_components(db, current_user, page, brand=brand, name=name, code=code, sort=sort)
\ No newline at end of file
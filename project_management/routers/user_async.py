@@ -0,0 +1,42 @@
+from typing import Literal
+from fastapi import status, APIRouter, Depends, Query
+from ..utils.database import AsyncSessionDep
+from ..utils.pagination import PageDep
+from ..repository import user_repo_async
+from ..utils import oauth2, models
+
+# Mesmas rotas de user.py sobre AsyncSession
+router = APIRouter(tags=["Users"], prefix="/user", responses={404: {"description": "Not found"}})
+
+@router.post("/", response_model=models.UserPublic, status_code=status.HTTP_201_CREATED)
+async def create_user_async(request: models.UserCreate, db: AsyncSessionDep):
+    return await user_repo_async.create_user(request, db)
+
+
+@router.get("/", response_model=models.Page[models.UserPublic], status_code=status.HTTP_200_OK)
+async def get_all_users_async(db: AsyncSessionDep, page: PageDep, sort: Literal["id", "username"] = "id", current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await user_repo_async.get_all_users(db, page, sort=sort)
+
+
+@router.get("/{id:int}", response_model=models.UserPublic, status_code=status.HTTP_200_OK)
+async def get_user_async(id: int, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await user_repo_async.get_user(id, db)
+
+
+@router.patch("/{id:int}", response_model=models.UserPublic, status_code=status.HTTP_200_OK)
+async def update_user_async(id: int, request: models.UserUpdate, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await user_repo_async.update_user(id, request, db)
+
+
+@router.delete("/{id:int}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user_async(id: int, db: AsyncSessionDep, current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await user_repo_async.delete_user(id, db)
+
+@router.get("/projects", response_model=models.Page[models.ProjectRead], status_code=status.HTTP_200_OK)
+async def get_all_user_projects_async(db: AsyncSessionDep, page: PageDep, name: str | None = None, sort: Literal["id", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await user_repo_async.get_all_user_projects(db, current_user, page, name=name, sort=sort)
+
+@router.get("/components", response_model=models.Page[models.Component], status_code=status.HTTP_200_OK)
+async def get_all_user_components_async(db: AsyncSessionDep, page: PageDep, brand: str | None = None, name: str | None = None, code: str | None = Query(default=None, description="Code prefix"),
+                                        sort: Literal["id", "code", "brand", "name"] = "id", current_user: models.User = Depends(oauth2.get_current_user_async)):
+    return await user_repo_async.get_all_user_components(db, current_user, page, brand=brand, name=name, code=code, sort=sort)
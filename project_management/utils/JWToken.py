@@ -2,6 +2,7 @@ from datetime import datetime, timedelta, timezone
 import jwt
 from sqlmodel import select
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from .database import SessionDep
 from . import models
@@ -22,12 +23,27 @@ class TokenData(BaseModel):
     username: str | None = None
 
 
-def authenticate_user(db: SessionDep, username: str, password: str):
-    user = db.exec(select(models.User).where(models.User.username == username)).first()
+def _get_user(db: SessionDep, username: str):
+    return db.exec(select(models.User).where(models.User.username == username)).first()
+
+
+def _save_password(db: SessionDep, user: models.User, hashed_password: str):
+    user.password = hashed_password
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+
+# Consulta ao banco no threadpool e bcrypt no executor de hashing: nada bloqueia o event loop
+async def authenticate_user(db: SessionDep, username: str, password: str):
+    user = await run_in_threadpool(_get_user, db, username)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if not Hash.verify_password(password, user.password):
+    verified, new_hash = await Hash.verify_and_update_async(password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Password doesn't match")
+    if new_hash:
+        await run_in_threadpool(_save_password, db, user, new_hash)
     return user
 
 
@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Response, status
+
+# Os clientes podem guardar a resposta, mas precisam revalidar (If-None-Match) antes de reutilizá-la
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def content_etag(*values) -> str:
+    # Para linhas sem versão: ETag derivado do próprio conteúdo
+    return make_etag(hashlib.sha1(repr(values).encode()).hexdigest()[:20])
+
+
+def http_date(value: datetime) -> str:
+    # Datas do banco são UTC sem fuso
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: W/"x" equivale a "x"
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def is_not_modified(headers, etag: str, last_modified: datetime | None = None) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+# If-Match usa comparação forte: W/"x" não corresponde a "x"; sem o cabeçalho a alteração é incondicional
+def if_match(header: str | None, etag: str) -> bool:
+    if header is None or header.strip() == "*":
+        return True
+    return any(candidate.strip() == etag for candidate in header.split(","))
+
+
+def validator_headers(etag: str, last_modified: datetime | None = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: datetime | None = None) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, last_modified))
+
+
+def set_validators(response: Response, etag: str, last_modified: datetime | None = None):
+    response.headers.update(validator_headers(etag, last_modified))
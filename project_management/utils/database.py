@@ -1,21 +1,215 @@
-from sqlmodel import Session, SQLModel, create_engine
+import asyncio
+import functools
+import inspect
+import os
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from typing import Annotated
 from fastapi import Depends
+from . import metrics, migrations, sharding
 
-sqlite_file_name = "db.db"
+sqlite_file_name = os.getenv("SQLITE_FILE_NAME", "db.db")
 sqlite_url = f"sqlite:///./{sqlite_file_name}"
+DATABASE_URL = os.getenv("DATABASE_URL", sqlite_url)
+
+# Pool de conexões. Uma requisição síncrona segura a conexão até o fim, inclusive enquanto espera uma thread para
+# serializar a resposta; com o pool limitado ao tamanho do threadpool (40) as requisições podem se travar. No SQLite
+# conexões são baratas e o excedente não tem limite, a menos que DB_MAX_OVERFLOW seja definido
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = os.getenv("DB_MAX_OVERFLOW")
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite: WAL deixa leitores lerem enquanto há uma escrita em andamento; busy_timeout espera o lock em vez de
+# falhar com "database is locked"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB
+# O busy handler do SQLite não é uma fila: com muitos escritores na mesma linha, um deles pode esperar mais que o
+# busy_timeout enquanto os outros passam. As escritas marcadas com retry_locked repetem a transação até
+# SQLITE_LOCK_ATTEMPTS vezes; o que ainda falhar vira 503 com Retry-After (ver main.database_locked)
+SQLITE_LOCK_ATTEMPTS = int(os.getenv("SQLITE_LOCK_ATTEMPTS", "3"))
+LOCKED_RETRY_AFTER = "1"
 
 connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+
+def is_locked(error: OperationalError) -> bool:
+    return "database is locked" in str(error.orig)
+
+
+# Repete a função inteira (leituras e escritas) numa transação nova quando o lock de escrita não veio a tempo. A
+# função recebe a sessão em `db` e só pode ter efeitos no banco, que o rollback desfaz
+def retry_locked(function):
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        db = signature.bind(*args, **kwargs).arguments["db"]
+        for attempt in range(1, SQLITE_LOCK_ATTEMPTS + 1):
+            try:
+                return function(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == SQLITE_LOCK_ATTEMPTS or not is_locked(error):
+                    raise
+                db.rollback()
+    return wrapper
+
+
+def engine_options(url):
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return {"connect_args": connect_args}
+        max_overflow = int(DB_MAX_OVERFLOW) if DB_MAX_OVERFLOW else -1
+        return {"connect_args": connect_args, "pool_size": DB_POOL_SIZE, "max_overflow": max_overflow, "pool_timeout": DB_POOL_TIMEOUT}
+    max_overflow = int(DB_MAX_OVERFLOW) if DB_MAX_OVERFLOW else 20
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": max_overflow, "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": DB_POOL_PRE_PING}
+
+
+# Engine com o pool e, no SQLite, os PRAGMAs aplicados a cada nova conexão
+def make_engine(url, **kwargs):
+    engine = create_engine(url, **{**engine_options(url), **kwargs})
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    metrics.instrument_engine(engine)
+    return engine
+
+
+engine = make_engine(DATABASE_URL)
+
+# Modo assíncrono: as rotas principais passam a usar AsyncSession (ver routers/*_async.py)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "mysql": "mysql+aiomysql"}
+_async_engine = None
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    # Só aplica as migrações pendentes: com o banco atualizado é uma consulta (ver utils/migrations.py)
+    return migrations.migrate(engine)
 
 
 def get_session():
-    with Session(engine) as session:
+    with (ShardedSession() if sharding.sharded() else Session(engine)) as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+
+# Sharding (ver utils/sharding.py): o shard 0 é o diretório; os outros são abertos no primeiro uso, já migrados
+def shard_url(shard: int):
+    return engine.url if shard == 0 else make_url(sharding.SHARD_URL.format(shard=shard))
+
+
+def _open_shard(shard: int):
+    url = shard_url(shard)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+    shard_engine = make_engine(url)
+    migrations.migrate(shard_engine)
+    return shard_engine
+
+
+def _open_async_shard(shard: int):
+    shard_engines.get(shard)  # as migrações rodam pela engine síncrona
+    return make_async_engine(shard_url(shard))
+
+
+def _dispose_async(async_engine):
+    # Chamado dentro do event loop: get_bind roda no greenlet da sessão assíncrona
+    task = asyncio.get_running_loop().create_task(async_engine.dispose())
+    _disposing.add(task)
+    task.add_done_callback(_disposing.discard)
+
+
+shard_engines = sharding.EnginePool(_open_shard, lambda shard_engine: shard_engine.dispose())
+async_shard_engines = sharding.EnginePool(_open_async_shard, _dispose_async)
+_disposing = set()
+
+
+def shard_engine(shard: int):
+    return engine if shard == 0 else shard_engines.get(shard)
+
+
+def _directory_table(mapper, clause):
+    table = mapper.local_table if mapper is not None else getattr(clause, "table", None)
+    return getattr(table, "name", None) in sharding.DIRECTORY_TABLES
+
+
+# Sessão das requisições com sharding: usuários, mapa de shards e exportações vão para o diretório; o resto, para o
+# shard escolhido em oauth2.get_current_user (info["shard"]). Uma requisição pode escrever nos dois bancos, cada um
+# com sua transação, confirmadas juntas no commit
+class ShardedSession(Session):
+    def directory(self):
+        return engine
+
+    def shard(self, shard: int):
+        return shard_engines.get(shard)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        shard = self.info.get("shard", 0)
+        if shard == 0 or _directory_table(mapper, clause):
+            return self.directory()
+        return self.shard(shard)
+
+
+class AsyncShardedSession(ShardedSession):
+    def directory(self):
+        return get_async_engine().sync_engine
+
+    def shard(self, shard: int):
+        return async_shard_engines.get(shard).sync_engine
+
+
+def make_async_engine(url):
+    url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+    async_engine = create_async_engine(url, **engine_options(url))
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    metrics.instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+def get_async_engine():
+    # Criada só no primeiro uso, para que o driver assíncrono seja necessário apenas nesse modo
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = make_async_engine(engine.url)
+    return _async_engine
+
+
+async def get_async_session():
+    if sharding.sharded():
+        session = AsyncSession(sync_session_class=AsyncShardedSession, expire_on_commit=False)
+    else:
+        session = AsyncSession(get_async_engine(), expire_on_commit=False)
+    async with session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+
+def dialect_insert(db: Session, model):
+    # INSERT com suporte a ON CONFLICT do banco em uso (SQLite e PostgreSQL têm a mesma API)
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model)
@@ -1,6 +1,53 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from . import metrics
+
+# Custo do bcrypt: hashes com outro custo são refeitos no próximo login bem-sucedido
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads dedicadas ao bcrypt (0 = executa na própria thread que chamou) e tamanho máximo da fila
+HASH_MAX_WORKERS = int(os.getenv("HASH_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=HASH_MAX_WORKERS, thread_name_prefix="hashing") if HASH_MAX_WORKERS > 0 else None
+_slots = threading.BoundedSemaphore(HASH_MAX_WORKERS + HASH_MAX_QUEUE)
+
+
+def _timed(fn, operation: str, queued_at: float):
+    def run(*args):
+        started = time.perf_counter()
+        metrics.password_hash_wait.observe(started - queued_at, operation)
+        try:
+            return fn(*args)
+        finally:
+            metrics.password_hashing.observe(time.perf_counter() - started, operation)
+    return run
+
+
+def _submit(fn, *args) -> Future:
+    fn = _timed(fn, fn.__name__, time.perf_counter())
+    if _executor is None:
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+    if not _slots.acquire(blocking=False):
+        metrics.password_hash_rejected.inc()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many password operations in progress, try again later", headers={"Retry-After": "1"})
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class Hash():
     def __init__(self):
@@ -8,10 +55,17 @@ class Hash():
 
 
     def get_password_hash(password):
-        return pwd_context.hash(password)
+        return _submit(pwd_context.hash, password).result()
 
 
     def verify_password(plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+        return _submit(pwd_context.verify, plain_password, hashed_password).result()
+
+
+    async def get_password_hash_async(password):
+        return await asyncio.wrap_future(_submit(pwd_context.hash, password))
+
 
-    
\ No newline at end of file
+    # Retorna (senha confere, novo hash ou None quando o custo configurado mudou)
+    async def verify_and_update_async(plain_password, hashed_password):
+        return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain_password, hashed_password))
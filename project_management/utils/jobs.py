@@ -0,0 +1,36 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Pools de processos para trabalhos pesados, fora do event loop e dos workers da API: um para as exportações em
+# segundo plano e outro para renderizar as exportações em lote (zip), para que uma não ocupe os workers da outra
+MAX_WORKERS = int(os.getenv("EXPORT_MAX_WORKERS", "2"))
+MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "32"))
+RENDER_MAX_WORKERS = int(os.getenv("EXPORT_RENDER_WORKERS", str(MAX_WORKERS)))
+RENDER_MAX_PENDING = int(os.getenv("EXPORT_RENDER_MAX_PENDING", "4"))  # exportações em lote simultâneas
+
+_pools: dict[str, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(name: str, max_workers: int):
+    with _pool_lock:
+        if name not in _pools:
+            _pools[name] = ProcessPoolExecutor(max_workers=max_workers)
+        return _pools[name]
+
+
+def get_pool():
+    return _get_pool("jobs", MAX_WORKERS)
+
+
+def get_render_pool():
+    return _get_pool("render", RENDER_MAX_WORKERS)
+
+
+def shutdown():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
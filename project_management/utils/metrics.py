@@ -0,0 +1,246 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+
+# Métricas em memória, por processo, expostas em GET /metrics no formato texto do Prometheus.
+# Com vários workers do uvicorn cada processo tem as suas; o Prometheus agrega por instância.
+
+# Requisições mais lentas que isso (ms) são registradas no log "powerflow.slow"; 0 desliga
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_log = logging.getLogger("powerflow.slow")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric():
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class _Timer():
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+# Contadores que os caches (utils/cache.TTLCache) já mantêm: lidos no momento do scrape, por nome de cache
+class CacheMetric(Metric):
+    def __init__(self, name: str, documentation: str, field: str, kind: str = "counter"):
+        super().__init__(name, documentation, ("cache",))
+        self.field = field
+        self.kind = kind
+
+
+    def render(self):
+        items = sorted((name, cache.stats()[self.field]) for name, cache in caches.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, (name,))} {value}" for name, value in items]
+
+
+registry: list[Metric] = []
+caches = {}
+
+
+def register_cache(name: str, cache):
+    caches[name] = cache
+
+
+http_requests = Counter("http_requests_total", "Requests by method, route template and status code", ("method", "route", "status"))
+http_duration = Histogram("http_request_duration_seconds", "Time until the response starts, by route template", ("method", "route"))
+http_in_progress = Gauge("http_requests_in_progress", "Requests being handled", ("method",))
+request_queries = Histogram("http_request_db_queries", "SQL statements executed per request", ("route",), buckets=COUNT_BUCKETS)
+request_db_time = Histogram("http_request_db_seconds", "Time spent in SQL statements per request", ("route",))
+db_queries = Counter("db_queries_total", "SQL statements executed", ("engine",))
+db_query_duration = Histogram("db_query_duration_seconds", "Duration of each SQL statement", ("engine",), buckets=QUERY_BUCKETS)
+password_hashing = Histogram("password_hash_seconds", "bcrypt time per operation, excluding the wait for a worker", ("operation",))
+password_hash_wait = Histogram("password_hash_wait_seconds", "Time a bcrypt operation waited for a hashing worker", ("operation",))
+password_hash_rejected = Counter("password_hash_rejected_total", "bcrypt operations rejected because the queue was full")
+export_duration = Histogram("export_duration_seconds", "Time to produce an export, until the last byte", ("kind", "format"))
+export_jobs = Counter("export_jobs_total", "Finished export jobs by final status", ("status",))
+cache_hits = CacheMetric("cache_hits_total", "In-process cache lookups answered from the cache", "hits")
+cache_misses = CacheMetric("cache_misses_total", "In-process cache lookups that missed or found an expired entry", "misses")
+cache_entries = CacheMetric("cache_entries", "Entries held by each in-process cache", "size", kind="gauge")
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Contabilidade por requisição: o middleware cria um RequestStats e os eventos do engine o atualizam.
+# O contextvar é copiado para o threadpool e para as tarefas, e o objeto é o mesmo, então as contagens voltam.
+class RequestStats():
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+current_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    label = conn.engine.url.get_backend_name()
+    db_queries.inc(label)
+    db_query_duration.observe(elapsed, label)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(context):
+    # Statement que falhou não chega ao after_cursor_execute: descarta o início registrado
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def route_template(scope):
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+async def track_request(request, call_next):
+    method = request.method
+    stats = RequestStats()
+    token = current_request.set(stats)
+    http_in_progress.inc(method)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        http_in_progress.dec(method)
+        current_request.reset(token)
+        route = route_template(request.scope)
+        http_requests.inc(method, route, str(status_code))
+        http_duration.observe(elapsed, method, route)
+        request_queries.observe(stats.queries, route)
+        request_db_time.observe(stats.db_time, route)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            slow_log.warning("slow request %s %s status=%s duration_ms=%.1f queries=%d db_ms=%.1f",
+                             method, request.url.path, status_code, elapsed * 1000, stats.queries, stats.db_time * 1000)
+
+
+# Envolve o corpo de uma StreamingResponse para medir até o último byte
+def timed_stream(chunks, histogram: Histogram, *labels):
+    started = time.perf_counter()
+    try:
+        yield from chunks
+    finally:
+        histogram.observe(time.perf_counter() - started, *labels)
@@ -0,0 +1,104 @@
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.schema import CreateTable
+from sqlmodel import Session, SQLModel
+from . import models, search  # noqa: F401  (models registra as tabelas na metadata)
+
+# Versão do esquema gravada no próprio banco. No boot, com o banco atualizado, migrate() faz uma consulta e retorna;
+# create_all e as demais etapas só rodam quando há versões pendentes. Toda migração deve ser idempotente: um banco
+# novo passa por todas, e a 1 já cria as tabelas no formato atual dos modelos
+schema_version = Table("schema_version", MetaData(),
+                       Column("version", Integer, primary_key=True),
+                       Column("description", String, nullable=False),
+                       Column("applied_at", DateTime, server_default=func.now()))
+
+
+def _create_tables(connection):
+    SQLModel.metadata.create_all(connection)
+
+
+def _component_search_index(connection):
+    search.create_component_index(connection)
+
+
+def _backfill_summaries(connection):
+    from ..repository import summary_repo
+    with Session(bind=connection) as db:
+        summary_repo.backfill(db)
+
+
+def _lookup_indexes(connection):
+    # Buscas por dono (project.user_id, component.user_id, project (user_id, name)) e por componente nos links;
+    # ver benchmarks/query_plans.py. O índice só de user_id mantém a paginação por id sem ordenar
+    for model in (models.ProjectComponentLink, models.Project, models.Component):
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _change_log(connection):
+    models.ChangeLog.__table__.create(connection, checkfirst=True)
+    for index in models.ChangeLog.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def _tenant_shards(connection):
+    models.TenantShard.__table__.create(connection, checkfirst=True)
+    for index in models.TenantShard.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def _component_codes(connection):
+    table = models.ComponentCode.__table__
+    table.create(connection, checkfirst=True)
+    for index in table.indexes:
+        index.create(connection, checkfirst=True)
+    # Códigos já gravados neste banco; no diretório, os componentes de antes do sharding (shard 0)
+    component = models.Component.__table__
+    connection.execute(insert(table).from_select(["code", "user_id"], select(component.c.code, component.c.user_id)
+                                                 .where(component.c.code.not_in(select(table.c.code)))))
+
+
+# (versão, descrição, função(connection)); novas migrações entram no fim da lista
+MIGRATIONS = [
+    (1, "tables", _create_tables),
+    (2, "component search index", _component_search_index),
+    (3, "project summaries backfill", _backfill_summaries),
+    (4, "lookup indexes", _lookup_indexes),
+    (5, "change log", _change_log),
+    (6, "tenant shard map", _tenant_shards),
+    (7, "component code directory", _component_codes),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(connection) -> int:
+    if not connection.dialect.has_table(connection, schema_version.name):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def _lock(connection):
+    # Vários workers subindo juntos: só um aplica as migrações, os outros esperam e encontram o banco atualizado
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("UPDATE schema_version SET version = version WHERE 0"))  # pega o lock de escrita
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("LOCK TABLE schema_version IN EXCLUSIVE MODE"))
+
+
+# Aplica as migrações pendentes numa transação; retorna as versões aplicadas
+def migrate(engine) -> list[int]:
+    with engine.connect() as connection:
+        if current_version(connection) >= LATEST_VERSION:
+            return []
+
+    with engine.begin() as connection:
+        connection.execute(CreateTable(schema_version, if_not_exists=True))
+        _lock(connection)
+        current = current_version(connection)
+        applied = []
+        for version, description, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            migration(connection)
+            connection.execute(schema_version.insert().values(version=version, description=description))
+            applied.append(version)
+    return applied
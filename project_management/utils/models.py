@@ -1,7 +1,17 @@
-from pydantic import model_validator
+from pydantic import BaseModel, model_validator
 from sqlmodel import Field, SQLModel, Column, Relationship
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, Index, func
 from datetime import datetime
+from typing import Generic, Literal, TypeVar
+
+T = TypeVar("T")
+
+
+# Pagination
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
 
 # User
 class UserBase(SQLModel): # Modelo de entrada
@@ -31,10 +41,26 @@ class UserUpdate(UserBase):
     password: str | None = Field(default=None)
 
 
+# Sharding (ver utils/sharding.py): em que shard estão os dados de cada usuário. Fica no diretório, junto dos usuários;
+# quem não tem linha aqui continua no shard 0, o próprio diretório
+class TenantShard(SQLModel, table=True):
+    user_id: int | None = Field(default=None, foreign_key="user.id", primary_key=True)
+    shard: int = Field(index=True)
+    moving: bool = Field(default=False)  # cópia para outro shard em andamento: as requisições do usuário recebem 503
+    cursor_floor: int = Field(default=0)  # cursores de GET /changes anteriores à última mudança de shard recebem 410
+
+
+# Dono de cada código de componente, no diretório. O índice único de component.code só vale dentro de um banco; com
+# sharding, é esta tabela que impede o mesmo código em shards diferentes (ver component_repo)
+class ComponentCode(SQLModel, table=True):
+    code: str = Field(primary_key=True, max_length=50)
+    user_id: int = Field(foreign_key="user.id", index=True)
+
+
 # Link tables
 class ProjectComponentLink(SQLModel, table=True):
     project_id: int | None = Field(default=None, foreign_key="project.id", primary_key=True)
-    component_id: int | None = Field(default=None, foreign_key="component.id", primary_key=True)
+    component_id: int | None = Field(default=None, foreign_key="component.id", primary_key=True, index=True)  # a PK só atende buscas por projeto
     component_quantity: int = Field(default=1)
 
     project: "Project" = Relationship(back_populates="component_links")
@@ -49,36 +75,74 @@ class ProjectComponentLink(SQLModel, table=True):
 # Project
 class ProjectBase(SQLModel):
     name: str = Field(index=True, min_length=1, max_length=100)
+
+
+class ProjectTotals(SQLModel):
+    line_count: int = 0
+    total_quantity: int = 0
+    total_amperage: int = 0
+    total_watts: int = 0
+
     
-class ProjectList(ProjectBase):
+class ProjectList(ProjectTotals, ProjectBase):
     id: int
 
+
+# Totais mantidos na mesma transação de cada alteração de links, para não recalcular a cada leitura
+class ProjectSummary(ProjectTotals, table=True):
+    project_id: int | None = Field(default=None, foreign_key="project.id", primary_key=True)
+    version: int = Field(default=1)  # incrementada a cada alteração dos totais
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 class Project(ProjectBase, table=True):
+    __table_args__ = (Index("ix_project_user_id_name", "user_id", "name"),)  # nome repetido por usuário em create_project
+
     id: int | None = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime | None = Field(default=None, sa_column=Column(DateTime, onupdate=func.now()))
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
 
     user: User = Relationship(back_populates="project")
     component_links: list[ProjectComponentLink] = Relationship(back_populates="project")
+    summary: ProjectSummary | None = Relationship(sa_relationship_kwargs={"lazy": "joined", "uselist": False, "cascade": "all, delete-orphan"})
 
     @property
     def components(self) -> list["ComponentPublic"]:
         return [ComponentPublic(code=link.component.code, brand=link.component.brand, name=link.component.name, quantity=link.component_quantity) for link in self.component_links]  # Retorna os componentes diretamente
     @property
+    def line_count(self) -> int:
+        return self.summary.line_count if self.summary else 0
+    @property
+    def total_quantity(self) -> int:
+        return self.summary.total_quantity if self.summary else 0
+    @property
     def total_amperage(self) -> int:
-        return sum(link.total_amperage for link in self.component_links)
+        return self.summary.total_amperage if self.summary else 0
+    @property
+    def total_watts(self) -> int:
+        return self.summary.total_watts if self.summary else 0
 
     
 
 
-class ProjectPublic(ProjectBase):
+class ProjectRead(ProjectList):
+    created_at: datetime
+    updated_at: datetime | None = None
+    user_id: int
+
+
+class ProjectPublic(ProjectTotals, ProjectBase):
     latest_modification: datetime
     component_links: list["ComponentPublic"] = Field(default_factory=list)
 
 
 class ProjectUpdate(ProjectBase):
     name: str | None = Field(default=None)
+
+
+class ProjectClone(SQLModel):
+    name: str | None = Field(default=None, min_length=1, max_length=100)  # padrão: "<nome da origem> (copy)"
+    user_id: int | None = None  # dono da cópia; padrão: usuário atual
     
 
 # Component
@@ -111,7 +175,7 @@ class ComponentBase(SQLModel):
 
 class Component(ComponentBase, table=True):
     id: int | None = Field(default=None, primary_key=True)  # Chave primária autoincremento
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
 
     user: User = Relationship(back_populates="component")
     project_links: list[ProjectComponentLink] = Relationship(back_populates="component") 
@@ -134,7 +198,125 @@ class ComponentUpdate(ComponentBase):
     watts: int | None = Field(default=None)
 
 
+class ComponentImportError(SQLModel):
+    row: int
+    code: str | None = None
+    detail: str
+
+
+class ComponentImportReport(SQLModel):
+    inserted: int = 0
+    updated: int = 0
+    errors: list[ComponentImportError] = Field(default_factory=list)
+
+
 class ComponentLink(SQLModel):
     id: int | None = Field(default=None)
     code: str | None = Field(default=None)
     quantity: int = Field(default=1)
+
+
+# Export
+class BulkExportRequest(SQLModel):
+    project_ids: list[int] | None = None  # None exporta todos os projetos do usuário atual
+    layout: Literal["workbook", "zip"] = "workbook"
+    format: Literal["xlsx", "csv"] = "xlsx"  # formato dos arquivos dentro do zip
+
+
+# Lista de materiais consolidada: quantidade de cada componente somada em vários projetos
+class BomExportRequest(SQLModel):
+    project_ids: list[int] | None = Field(default=None, max_length=10000)  # None usa scope
+    scope: Literal["user", "all"] = "user"  # sem project_ids: projetos do usuário atual ou todos
+    format: Literal["csv", "ndjson"] = "csv"
+
+
+class ExportJobCreate(SQLModel):
+    project_id: int
+    format: Literal["xlsx", "csv"] = "xlsx"
+
+
+class ExportJob(ExportJobCreate, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    format: str = Field(default="xlsx")
+    user_id: int = Field(foreign_key="user.id", index=True)
+    project_id: int = Field(foreign_key="project.id")
+    status: str = Field(default="queued", index=True)  # queued, running, done, failed
+    progress: int = Field(default=0)  # linhas já escritas
+    total: int = Field(default=0)
+    error: str | None = None
+    file_path: str | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
+
+
+class ExportJobPublic(ExportJobCreate):
+    id: int
+    status: str
+    progress: int
+    total: int
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
+
+
+# Analytics
+class ProjectLoad(ProjectTotals):
+    project_id: int
+    name: str
+    user_id: int
+
+
+class ComponentUsage(SQLModel):
+    component_id: int
+    code: str
+    brand: str
+    name: str
+    project_count: int
+    total_quantity: int
+    total_amperage: int
+    total_watts: int
+
+
+class LoadDistribution(SQLModel):
+    total: float = 0
+    mean: float = 0
+    std: float = 0
+    p50: float = 0
+    p90: float = 0
+    p99: float = 0
+    max: float = 0
+
+
+class LoadStats(SQLModel):
+    project_count: int = 0
+    empty_projects: int = 0  # projetos sem componentes
+    amperage: LoadDistribution = Field(default_factory=LoadDistribution)
+    watts: LoadDistribution = Field(default_factory=LoadDistribution)
+    watts_per_line: float = 0
+
+
+# Sync
+# Registro de alterações, gravado na mesma transação de cada escrita; o id é o cursor de GET /changes
+class ChangeLog(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    entity: str  # user, project, component, link
+    entity_id: int  # em link, o component_id
+    project_id: int | None = None  # só em link
+    op: str = "upsert"  # upsert, delete
+    user_id: int | None = Field(default=None, index=True)  # dono da entidade, para o feed de um usuário
+    changed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ChangePublic(SQLModel):
+    seq: int
+    entity: Literal["user", "project", "component", "link"]
+    id: int
+    project_id: int | None = None
+    op: Literal["upsert", "delete"]
+    changed_at: datetime
+
+
+class ChangeFeed(SQLModel):
+    changes: list[ChangePublic]
+    next_cursor: int  # passar como since na próxima consulta
+    has_more: bool
@@ -1,23 +1,52 @@
+import os
+import time
 from typing import Annotated
 import jwt
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from . import JWToken
-from .database import SessionDep
-from . import models
+from .cache import TTLCache
+from .database import AsyncSessionDep, SessionDep
+from . import metrics, models, sharding
 from sqlmodel import select
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: SessionDep):
+# Caches por processo: claims do token já validado e usuário resolvido pelo "sub"
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+claims_cache = TTLCache(TOKEN_CACHE_SIZE, USER_CACHE_TTL)
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+metrics.register_cache("token_claims", claims_cache)
+metrics.register_cache("user", user_cache)
+
+
+def invalidate_user(*usernames: str):
+    for username in usernames:
+        user_cache.pop(username)
+
+
+def decode_token(token: str):
+    payload = claims_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, JWToken.SECRET_KEY, algorithms=[JWToken.ALGORITHM])
+        # A entrada nunca sobrevive à expiração do próprio token
+        ttl = min(USER_CACHE_TTL, payload["exp"] - time.time()) if "exp" in payload else USER_CACHE_TTL
+        claims_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def _token_username(token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, JWToken.SECRET_KEY, algorithms=[JWToken.ALGORITHM])
+        payload = decode_token(token)
         username = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -30,10 +59,36 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
         )
     except InvalidTokenError:
         raise credentials_exception
-    user = db.exec(select(models.User).where(models.User.username == token_data.username)).first()
+    return token_data.username
+
+
+def _cache_user(username: str, user: models.User | None):
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
\ No newline at end of file
+    # Guarda uma cópia desanexada da sessão, que pode ser reutilizada por outras requisições
+    user = models.User(id=user.id, username=user.username, email=user.email, password=user.password)
+    user_cache.set(username, user)
+    return user
+
+
+def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: SessionDep):
+    username = _token_username(token)
+    user = user_cache.get(username)
+    if user is None:
+        user = _cache_user(username, db.exec(select(models.User).where(models.User.username == username)).first())
+    if sharding.sharded():
+        sharding.use_tenant(db, user.id)
+    return user
+
+
+async def get_current_user_async(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSessionDep):
+    username = _token_username(token)
+    user = user_cache.get(username)
+    if user is None:
+        user = _cache_user(username, (await db.exec(select(models.User).where(models.User.username == username))).first())
+    if sharding.sharded():
+        await db.run_sync(lambda session: sharding.use_tenant(session, user.id))
+    return user
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from typing import Annotated, Literal
+from fastapi import Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import Integer, and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class PageParams(BaseModel):
+    cursor: str | None = None
+    limit: int = DEFAULT_LIMIT
+    order: Literal["asc", "desc"] = "asc"
+
+
+def get_page_params(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), order: Literal["asc", "desc"] = "asc"):
+    return PageParams(cursor=cursor, limit=limit, order=order)
+
+
+PageDep = Annotated[PageParams, Depends(get_page_params)]
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def _is_type(value, value_type: type) -> bool:
+    # bool é subclasse de int no Python, mas não é um id
+    return isinstance(value, value_type) and not isinstance(value, bool)
+
+
+# [valor da coluna de ordenação (int ou str), id]; tipos errados (cursor forjado) são recusados antes de chegar ao WHERE
+def decode_cursor(cursor: str, value_type: type = int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2 or not _is_type(values[0], value_type) or not _is_type(values[1], int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def prefix_filter(column, prefix: str):
+    # Intervalo [prefix, próximo prefixo) usa o índice b-tree, ao contrário de LIKE 'prefix%' no SQLite
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+# Keyset pagination: a página seguinte começa depois do par (coluna de ordenação, id) do último item,
+# então o custo de cada página não depende de quantas já foram lidas
+def paginate(db, statement, id_column, sort_column, page: PageParams):
+    descending = page.order == "desc"
+    if page.cursor is not None:
+        last_value, last_id = decode_cursor(page.cursor, int if isinstance(sort_column.type, Integer) else str)
+        after_id = id_column < last_id if descending else id_column > last_id
+        if sort_column is id_column:
+            statement = statement.where(after_id)
+        else:
+            after_value = sort_column < last_value if descending else sort_column > last_value
+            statement = statement.where(or_(after_value, and_(sort_column == last_value, after_id)))
+
+    order_by = [sort_column, id_column] if sort_column is not id_column else [id_column]
+    statement = statement.order_by(*[column.desc() if descending else column.asc() for column in order_by])
+    rows = db.exec(statement.limit(page.limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, sort_column.key), getattr(last, id_column.key)])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+# Para selects de colunas (não de modelos): os itens saem como dicts, prontos para responses.FastJSONResponse
+def paginate_rows(db, statement, id_column, sort_column, page: PageParams):
+    result = paginate(db, statement, id_column, sort_column, page)
+    result["items"] = [row._asdict() for row in result["items"]]
+    return result
@@ -0,0 +1,30 @@
+import json
+from datetime import date, datetime
+from fastapi import Response
+
+try:  # orjson é opcional: sem ele a serialização usa o json da biblioteca padrão
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Mesma saída do response_model do FastAPI para dicts de str, int, None e datetime sem fuso
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+# Leituras quentes montam os dicts direto das colunas da consulta e respondem com esta classe: sem objetos ORM,
+# sem a validação do response_model (que fica na rota só para a documentação). Aceita o corpo já serializado
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
@@ -0,0 +1,75 @@
+import os
+import re
+import sqlite3
+from sqlalchemy import Column, Integer, MetaData, String, Table, text
+
+# Índice FTS5 (external content) sobre component.code/brand/name, mantido pelos triggers abaixo em qualquer escrita
+# na tabela component, inclusive na importação em lote. Fora da metadata do SQLModel: create_all não o conhece.
+component_fts = Table("component_fts", MetaData(),
+                      Column("rowid", Integer, primary_key=True),
+                      Column("code", String),
+                      Column("brand", String),
+                      Column("name", String),
+                      Column("component_fts", String),  # coluna oculta usada no MATCH
+                      Column("rank", String))
+
+# Pesos do bm25 por coluna (code, brand, name): um acerto no código vale mais que na marca ou no nome
+RANK = "bm25(10.0, 3.0, 1.0)"
+# O bm25 é calculado para todos os resultados antes do LIMIT; acima deste número de resultados (ex.: um prefixo de
+# 2 letras) a busca devolve na ordem do índice, que custa o mesmo que o LIMIT
+RANK_MAX_MATCHES = int(os.getenv("SEARCH_RANK_MAX_MATCHES", "2000"))
+
+INDEX_DDL = [
+    # tokenchars mantém códigos como "DJ-12.5/A" num token só; prefix acelera buscas por prefixo curto
+    """CREATE VIRTUAL TABLE component_fts USING fts5(
+        code, brand, name, content='component', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 tokenchars '-_./'", prefix='2 3 4')""",
+    f"INSERT INTO component_fts(component_fts, rank) VALUES ('rank', '{RANK}')",
+    """CREATE TRIGGER component_fts_ai AFTER INSERT ON component BEGIN
+        INSERT INTO component_fts(rowid, code, brand, name) VALUES (new.id, new.code, new.brand, new.name);
+    END""",
+    """CREATE TRIGGER component_fts_ad AFTER DELETE ON component BEGIN
+        INSERT INTO component_fts(component_fts, rowid, code, brand, name) VALUES ('delete', old.id, old.code, old.brand, old.name);
+    END""",
+    """CREATE TRIGGER component_fts_au AFTER UPDATE OF code, brand, name ON component BEGIN
+        INSERT INTO component_fts(component_fts, rowid, code, brand, name) VALUES ('delete', old.id, old.code, old.brand, old.name);
+        INSERT INTO component_fts(rowid, code, brand, name) VALUES (new.id, new.code, new.brand, new.name);
+    END""",
+    # Indexa os componentes que já existiam
+    "INSERT INTO component_fts(component_fts) VALUES ('rebuild')",
+]
+
+
+def _fts5_available():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+FTS5_AVAILABLE = _fts5_available()
+
+
+def uses_fts(connection):
+    return FTS5_AVAILABLE and connection.dialect.name == "sqlite"
+
+
+def create_component_index(connection):
+    if not uses_fts(connection):
+        return False
+    exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'component_fts'")).first()
+    if exists:
+        return False
+    for statement in INDEX_DDL:
+        connection.execute(text(statement))
+    return True
+
+
+def search_terms(query: str) -> list[str]:
+    return re.findall(r"[\w\-./]+", query)
+
+
+def match_expression(terms: list[str]) -> str:
+    # Cada termo vira um prefixo entre aspas ("dj-1"*), combinados com AND; as aspas neutralizam a sintaxe do FTS5
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
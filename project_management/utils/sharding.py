@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlmodel import Session, select
+from . import metrics, models
+from .cache import TTLCache
+
+# Sharding por usuário (opcional). Com SHARD_COUNT > 0, o banco de DATABASE_URL vira o diretório: usuários, o mapa
+# usuário -> shard e a fila de exportações. Projetos, componentes, links, totais e o registro de alterações de cada
+# usuário ficam no shard dele, um banco por shard (SHARD_URL, com {shard} de 1 a SHARD_COUNT). Quem ainda não tem
+# linha no mapa continua no shard 0, que é o próprio diretório (os dados de antes do sharding); ver cli shards
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_URL = os.getenv("SHARD_URL", "sqlite:///./shards/shard_{shard}.db")
+SHARD_IDLE_TIMEOUT = float(os.getenv("SHARD_IDLE_TIMEOUT", "300"))  # segundos sem uso até a engine ser fechada
+SHARD_MAX_OPEN = int(os.getenv("SHARD_MAX_OPEN", "64"))
+SHARD_RETRY_AFTER = "5"
+# Shard de cada usuário por processo. A mudança de shard (shard_repo.move_tenant) espera mais que isto entre marcar
+# o usuário como moving e copiar, então nenhum processo ainda escreve no shard antigo quando a cópia começa
+SHARD_CACHE_TTL = float(os.getenv("SHARD_CACHE_TTL", "2"))
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "4096"))
+
+# Tabelas que ficam só no diretório, seja qual for o shard da requisição
+DIRECTORY_TABLES = {"user", "tenantshard", "exportjob", "componentcode"}
+
+
+def sharded() -> bool:
+    return SHARD_COUNT > 0
+
+
+# scope=all (analytics, lista de materiais, GET /changes) lê os dados de todos os usuários num banco só. Com shards a
+# sessão só enxerga o shard do usuário atual e o resultado sairia parcial, então a requisição é recusada
+def check_scope(scope: str):
+    if scope == "all" and sharded():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="scope=all is not available when sharding is enabled")
+
+
+# Engines abertas sob demanda, uma por shard, em ordem de último uso. A cada acesso fecha as que passaram de
+# idle_timeout sem uso e as mais antigas além de max_open; conexões ainda em uso continuam válidas até serem devolvidas
+class EnginePool:
+    def __init__(self, factory, dispose, idle_timeout: float = SHARD_IDLE_TIMEOUT, max_open: int = SHARD_MAX_OPEN):
+        self.factory = factory
+        self.dispose = dispose
+        self.idle_timeout = idle_timeout
+        self.max_open = max(1, max_open)
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, shard: int):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._engines.pop(shard, None)
+            engine = entry[0] if entry else self.factory(shard)
+            self._engines[shard] = (engine, now)
+            evicted = self._evict(now)
+        for idle in evicted:
+            self.dispose(idle)
+        return engine
+
+    def _evict(self, now: float):
+        evicted = []
+        while len(self._engines) > 1:
+            shard, (engine, used) = next(iter(self._engines.items()))
+            if now - used < self.idle_timeout and len(self._engines) <= self.max_open:
+                break
+            del self._engines[shard]
+            evicted.append(engine)
+        return evicted
+
+    def open_shards(self) -> list[int]:
+        with self._lock:
+            return list(self._engines)
+
+    def clear(self):
+        with self._lock:
+            engines = [engine for engine, _ in self._engines.values()]
+            self._engines.clear()
+        for engine in engines:
+            self.dispose(engine)
+
+
+tenant_cache = TTLCache(SHARD_CACHE_SIZE, SHARD_CACHE_TTL)
+metrics.register_cache("tenant_shard", tenant_cache)
+
+
+def tenant(db: Session, user_id: int) -> models.TenantShard:
+    return db.get(models.TenantShard, user_id) or models.TenantShard(user_id=user_id, shard=0)
+
+
+# Direciona a sessão para o shard do usuário: daqui em diante as tabelas fora do diretório vão para esse banco
+def use_tenant(db: Session, user_id: int):
+    placement = tenant_cache.get(user_id)
+    if placement is None:
+        row = tenant(db, user_id)
+        placement = (row.shard, row.moving, row.cursor_floor)
+        tenant_cache.set(user_id, placement)
+    shard, moving, cursor_floor = placement
+    if moving:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User data is being moved to another shard, try again later",
+                            headers={"Retry-After": SHARD_RETRY_AFTER})
+    db.info["shard"] = shard
+    db.info["cursor_floor"] = cursor_floor
+    return shard
+
+
+# Usuário novo vai para o shard com menos usuários (o desempate é o menor número)
+def assign(db: Session, user_id: int) -> models.TenantShard:
+    counts = dict(db.exec(select(models.TenantShard.shard, func.count()).group_by(models.TenantShard.shard)).all())
+    shard = min(range(1, SHARD_COUNT + 1), key=lambda shard: (counts.get(shard, 0), shard))
+    row = models.TenantShard(user_id=user_id, shard=shard)
+    db.add(row)
+    tenant_cache.pop(user_id)
+    return row
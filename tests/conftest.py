@@ -0,0 +1,85 @@
+import importlib
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Lidos na importação da aplicação: bcrypt barato e exportações fora do diretório do projeto
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("EXPORT_DIR", tempfile.mkdtemp(prefix="powerflow-test-exports-"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from project_management import main
+from project_management.main import app as main_app
+from project_management.repository import project_repo
+from project_management.utils import database, oauth2, sharding
+
+PASSWORD = "test-password"
+
+
+# Cada teste usa um banco SQLite novo, já migrado, e caches vazios (ids se repetem entre bancos)
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    test_engine = database.make_engine(f"sqlite:///{tmp_path}/test.db")
+    monkeypatch.setattr(database, "engine", test_engine)
+    monkeypatch.setattr(database, "_async_engine", None)
+    for cache in (oauth2.claims_cache, oauth2.user_cache, project_repo.project_cache, sharding.tenant_cache):
+        cache.clear()
+    database.create_db_and_tables()
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    with TestClient(main_app) as test_client:
+        yield test_client
+
+
+# Aplicação com DATABASE_ASYNC ativo: main registra as rotas assíncronas na importação, então o módulo é recarregado
+@pytest.fixture
+def async_app(engine):
+    enabled = database.DATABASE_ASYNC
+    database.DATABASE_ASYNC = True
+    try:
+        yield importlib.reload(main).app
+    finally:
+        database.DATABASE_ASYNC = enabled
+        importlib.reload(main)
+
+
+@pytest.fixture
+def async_client(async_app):
+    with TestClient(async_app) as test_client:
+        yield test_client
+        # As conexões do aiosqlite são fechadas no event loop em que foram abertas
+        if database._async_engine is not None:
+            test_client.portal.call(database._async_engine.dispose)
+
+
+# Cria o usuário e devolve os headers com o token dele
+@pytest.fixture
+def login(client):
+    def login(username: str = "alice"):
+        client.post("/user/", json={"username": username, "email": f"{username}@example.com", "password": PASSWORD})
+        response = client.post("/login", data={"username": username, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return login
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
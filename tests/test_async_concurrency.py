@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import httpx
+
+from project_management.utils import database
+
+LOCK_SECONDS = 0.5
+WRITERS = 20
+READERS = 20
+
+
+# Maior atraso de um asyncio.sleep curto enquanto as requisições rodam: é o tempo em que o loop ficou preso
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005):
+    lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(lag, time.perf_counter() - started - interval)
+    return lag
+
+
+def hold_write_lock(path: str, locked: threading.Event):
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("BEGIN IMMEDIATE")
+    locked.set()
+    time.sleep(LOCK_SECONDS)
+    connection.execute("ROLLBACK")
+    connection.close()
+
+
+# Outra conexão segura o lock de escrita do SQLite: as escritas das rotas assíncronas esperam na thread do driver,
+# as leituras seguem pelo WAL e o event loop continua atendendo
+def test_async_routes_do_not_block_the_event_loop(client, login, async_app, engine):
+    headers = login()
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=async_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as http:
+            assert (await http.get(f"/project/{project_id}", headers=headers)).status_code == 200
+
+            async def timed(request):
+                started = time.perf_counter()
+                response = await request
+                return response, time.perf_counter() - started
+
+            locked = threading.Event()
+            holder = threading.Thread(target=hold_write_lock, args=(engine.url.database, locked))
+            holder.start()
+            locked.wait()
+            stop = asyncio.Event()
+            beat = asyncio.create_task(heartbeat(stop))
+            writes = asyncio.gather(*[timed(http.patch(f"/project/{project_id}", json={"name": f"panel {index}"}, headers=headers))
+                                      for index in range(WRITERS)])
+            reads = asyncio.gather(*[timed(http.get(f"/project/{project_id}", headers=headers)) for _ in range(READERS)])
+            writes, reads = await writes, await reads
+            stop.set()
+            lag = await beat
+            holder.join()
+        await database.get_async_engine().dispose()
+        return writes, reads, lag
+
+    writes, reads, lag = asyncio.run(scenario())
+
+    assert all(response.status_code == 200 for response, _ in writes + reads)
+    assert min(elapsed for _, elapsed in writes) >= LOCK_SECONDS * 0.8
+    assert max(elapsed for _, elapsed in reads) < LOCK_SECONDS
+    assert lag < LOCK_SECONDS / 2
@@ -0,0 +1,52 @@
+import re
+
+from project_management.utils import oauth2
+
+
+def cache_counter(client, name: str, cache: str):
+    match = re.search(rf'^{name}{{cache="{cache}"}} (\d+)$', client.get("/metrics").text, re.MULTILINE)
+    return int(match.group(1))
+
+
+def user_id(client, headers, username: str):
+    return next(user["id"] for user in client.get("/user/", headers=headers).json()["items"] if user["username"] == username)
+
+
+def test_cache_hits_and_misses_are_exported(client, login):
+    headers = login()
+    hits, misses = cache_counter(client, "cache_hits_total", "user"), cache_counter(client, "cache_misses_total", "user")
+
+    for _ in range(3):
+        assert client.get("/user/", headers=headers).status_code == 200
+    assert cache_counter(client, "cache_hits_total", "user") >= hits + 2
+    assert cache_counter(client, "cache_misses_total", "user") <= misses + 1
+    assert cache_counter(client, "cache_entries", "user") == 1
+    assert cache_counter(client, "cache_hits_total", "token_claims") >= 2
+
+
+def test_renaming_a_user_revokes_the_cached_user(client, login):
+    headers = login("alice")
+    admin = login("bob")
+    alice_id = user_id(client, admin, "alice")
+    assert client.get("/user/", headers=headers).status_code == 200
+    assert oauth2.user_cache.get("alice") is not None
+
+    response = client.patch(f"/user/{alice_id}", json={"username": "carol", "email": "carol@example.com"}, headers=admin)
+    assert response.status_code == 200
+    # O token traz o nome antigo: sem a entrada do cache, o usuário não é mais encontrado
+    response = client.get("/user/", headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "User not found"
+    assert oauth2.user_cache.get("alice") is None
+
+
+def test_deleting_a_user_revokes_the_cached_user(client, login):
+    headers = login("alice")
+    admin = login("bob")
+    alice_id = user_id(client, admin, "alice")
+    assert client.get("/user/", headers=headers).status_code == 200
+
+    assert client.delete(f"/user/{alice_id}", headers=admin).status_code == 204
+    response = client.get("/user/", headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "User not found"
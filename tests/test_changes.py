@@ -0,0 +1,46 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_mock_engine
+from sqlmodel import Session
+
+from project_management.repository import changes_repo
+
+
+def test_feed_returns_changes_after_the_cursor(client, login):
+    headers = login()
+    cursor = client.get("/changes/", headers=headers).json()["next_cursor"]
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+
+    feed = client.get("/changes/", params={"since": cursor}, headers=headers).json()
+    assert [(change["entity"], change["op"]) for change in feed["changes"]] == [("project", "upsert")]
+    assert client.get("/changes/", params={"since": feed["next_cursor"]}, headers=headers).json()["changes"] == []
+
+
+# Engine que só grava o SQL compilado no dialeto pedido, para ver o que o registro emitiria nesse banco
+def recording_session(dialect: str):
+    executed = []
+    engine = create_mock_engine(f"{dialect}://", lambda *args, **kwargs: None)
+    session = Session(engine)
+    session.execute = lambda statement, *args, **kwargs: executed.append(str(statement.compile(dialect=engine.dialect)))
+    return session, executed
+
+
+def test_postgresql_records_under_the_change_log_lock():
+    session, executed = recording_session("postgresql")
+    changes_repo.record(session, "project", 1, 1)
+    changes_repo.record_many(session, "link", [{"entity_id": 2, "user_id": 1}])
+    assert [statement.split()[0:2] for statement in executed] == [["SELECT", "pg_advisory_xact_lock(%(key)s)"], ["INSERT", "INTO"]] * 2
+
+
+def test_sqlite_records_without_extra_statements(engine, statements):
+    with Session(engine) as db:
+        changes_repo.record(db, "project", 1, 1)
+        db.commit()
+    assert [statement.split()[0] for statement in statements] == ["INSERT"]
+
+
+def test_feed_is_refused_on_other_databases():
+    session, _ = recording_session("mysql")
+    with pytest.raises(HTTPException) as error:
+        changes_repo.get_changes(session, 0, 10, None)
+    assert error.value.status_code == 501
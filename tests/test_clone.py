@@ -0,0 +1,51 @@
+from sqlmodel import Session
+
+from project_management.repository import summary_repo
+
+TOTALS = ("line_count", "total_quantity", "total_amperage", "total_watts")
+
+
+def create_source(client, headers):
+    for code, amperage in (("B10", 10), ("S20", 20)):
+        client.post("/component/", json={"code": code, "brand": "Test", "name": code, "amperage_rating": amperage, "voltage": 220}, headers=headers)
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/project/{project_id}/components", json=[{"code": "B10", "quantity": 3}, {"code": "S20", "quantity": 2}], headers=headers)
+    return project_id
+
+
+def test_clone_copies_links_and_totals_and_leaves_the_source_alone(client, login, engine):
+    headers = login()
+    source_id = create_source(client, headers)
+    source = client.get(f"/project/{source_id}", headers=headers).json()
+
+    response = client.post(f"/project/{source_id}/clone", headers=headers)
+    assert response.status_code == 201
+    clone_id = response.json()["id"]
+    assert clone_id != source_id
+    clone = client.get(f"/project/{clone_id}", headers=headers).json()
+    assert clone["name"] == "panel (copy)"
+    assert clone["component_links"] == source["component_links"]
+    assert [clone[field] for field in TOTALS] == [source[field] for field in TOTALS] == [2, 5, 70, 15400]
+
+    # A cópia é independente: alterar os links dela não muda a origem
+    client.patch(f"/project/{clone_id}/add-component", json={"code": "B10", "quantity": 1}, headers=headers)
+    client.request("DELETE", f"/project/{clone_id}/delete-component", json={"code": "S20", "quantity": 2}, headers=headers)
+    assert client.get(f"/project/{source_id}", headers=headers).json() == source
+    assert [client.get(f"/project/{clone_id}", headers=headers).json()[field] for field in TOTALS] == [1, 4, 40, 8800]
+    with Session(engine) as db:
+        assert summary_repo.verify(db) == []
+
+
+def test_clone_name_owner_and_missing_source(client, login):
+    headers = login("alice")
+    bob = login("bob")
+    source_id = create_source(client, headers)
+    bob_id = next(user["id"] for user in client.get("/user/", headers=headers).json()["items"] if user["username"] == "bob")
+
+    assert client.post(f"/project/{source_id}/clone", json={"name": "panel"}, headers=headers).status_code == 400
+    response = client.post(f"/project/{source_id}/clone", json={"name": "bob's panel", "user_id": bob_id}, headers=headers)
+    assert response.status_code == 201
+    assert client.get("/user/projects", headers=bob).json()["items"][0]["name"] == "bob's panel"
+    assert client.post("/project/999/clone", headers=headers).status_code == 404
+    assert client.post(f"/project/{source_id}/clone", json={"user_id": 999}, headers=headers).status_code == 404
@@ -0,0 +1,26 @@
+def upload(client, headers, content: bytes, filename: str = "components.csv"):
+    return client.post("/component/import", files={"file": (filename, content, "text/csv")}, headers=headers)
+
+
+def test_out_of_range_numbers_are_row_errors(client, login):
+    headers = login()
+    content = (b"code,brand,name,amperage_rating,voltage\n"
+               b"OK1,Test,Breaker,10,220\n"
+               b"INF,Test,Breaker,inf,220\n"
+               b"BIG,Test,Breaker,1e400,220\n"
+               b"HUGE,Test,Breaker,1e30,220\n"
+               b"NAN,Test,Breaker,nan,220\n")
+    response = upload(client, headers, content)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["inserted"] == 1
+    assert [(error["row"], error["code"]) for error in report["errors"]] == [(3, "INF"), (4, "BIG"), (5, "HUGE"), (6, "NAN")]
+
+
+def test_non_utf8_file_is_rejected(client, login):
+    headers = login()
+    content = "code,brand,name,amperage_rating,voltage\nC1,Müller,Disjuntor,10,220\n".encode("latin-1")
+    response = upload(client, headers, content)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File is not valid UTF-8 text"
+    assert client.get("/component/", headers=headers).status_code == 404
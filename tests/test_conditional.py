@@ -0,0 +1,71 @@
+def create_project(client, headers):
+    response = client.post("/component/", json={"code": "C1", "brand": "Test", "name": "Breaker", "amperage_rating": 10, "voltage": 220}, headers=headers)
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/project/{project_id}/add-component", json={"code": "C1", "quantity": 2}, headers=headers)
+    component_id = client.get("/component/", params={"code": "C1"}, headers=headers).json()["items"][0]["id"]
+    assert response.status_code == 201
+    return project_id, component_id
+
+
+def test_project_revalidation_returns_304(client, login):
+    headers = login()
+    project_id, _ = create_project(client, headers)
+
+    response = client.get(f"/project/{project_id}", headers=headers)
+    assert response.status_code == 200
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    response = client.get(f"/project/{project_id}", headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(f"/project/{project_id}", headers=headers | {"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(f"/project/{project_id}", headers=headers | {"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(f"/project/{project_id}", headers=headers | {"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_project_etag_follows_its_components(client, login):
+    headers = login()
+    project_id, component_id = create_project(client, headers)
+    etags = [client.get(f"/project/{project_id}", headers=headers).headers["etag"]]
+
+    # Amperagem e nome do componente aparecem no projeto (totais e linhas): os dois mudam o ETag
+    client.patch(f"/component/{component_id}", json={"amperage_rating": 16, "voltage": 220}, headers=headers)
+    etags.append(client.get(f"/project/{project_id}", headers=headers | {"If-None-Match": etags[-1]}).headers["etag"])
+    client.patch(f"/component/{component_id}", json={"name": "Breaker 16A", "voltage": 220, "amperage_rating": 16}, headers=headers)
+    response = client.get(f"/project/{project_id}", headers=headers | {"If-None-Match": etags[-1]})
+    etags.append(response.headers["etag"])
+
+    assert len(set(etags)) == 3
+    assert response.status_code == 200
+    assert response.json()["total_amperage"] == 32
+    assert response.json()["component_links"][0]["name"] == "Breaker 16A"
+
+
+def test_component_revalidation_returns_304(client, login):
+    headers = login()
+    _, component_id = create_project(client, headers)
+
+    etag = client.get(f"/component/{component_id}", headers=headers).headers["etag"]
+    assert client.get(f"/component/{component_id}", headers=headers | {"If-None-Match": etag}).status_code == 304
+
+    client.patch(f"/component/{component_id}", json={"brand": "Other", "amperage_rating": 10, "voltage": 220}, headers=headers)
+    response = client.get(f"/component/{component_id}", headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_stale_if_match_writes_get_412(client, login):
+    headers = login()
+    project_id, _ = create_project(client, headers)
+    stale = client.get(f"/project/{project_id}", headers=headers).headers["etag"]
+    client.patch(f"/project/{project_id}", json={"name": "renamed"}, headers=headers)
+
+    assert client.patch(f"/project/{project_id}", json={"name": "again"}, headers=headers | {"If-Match": stale}).status_code == 412
+    assert client.patch(f"/project/{project_id}/components", json=[{"code": "C1", "quantity": 1}], headers=headers | {"If-Match": stale}).status_code == 412
+    assert client.delete(f"/project/{project_id}", headers=headers | {"If-Match": stale}).status_code == 412
+    assert client.get(f"/project/{project_id}", headers=headers).json()["name"] == "renamed"
+
+    current = client.get(f"/project/{project_id}", headers=headers).headers["etag"]
+    assert client.patch(f"/project/{project_id}", json={"name": "again"}, headers=headers | {"If-Match": current}).status_code == 200
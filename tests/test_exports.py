@@ -0,0 +1,75 @@
+import io
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import openpyxl
+from sqlmodel import Session
+
+from project_management.repository import export_repo
+
+
+def create_project(client, headers, name: str = "panel"):
+    client.post("/component/", json={"code": f"{name}-c", "brand": "Test", "name": "Breaker", "amperage_rating": 10, "voltage": 220}, headers=headers)
+    client.post("/project/", json={"name": name}, headers=headers)
+    project_id = client.get("/project/", params={"name": name}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/project/{project_id}/add-component", json={"code": f"{name}-c", "quantity": 3}, headers=headers)
+    return project_id
+
+
+def wait_for_job(client, headers, job_id: int):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        job = client.get(f"/export/jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"export job {job_id} did not finish")
+
+
+def test_finished_jobs_expire_with_their_files(client, login, engine):
+    headers = login()
+    job_id = client.post("/export/jobs", json={"project_id": create_project(client, headers), "format": "csv"}, headers=headers).json()["id"]
+    assert wait_for_job(client, headers, job_id)["status"] == "done"
+    assert client.get(f"/export/jobs/{job_id}/download", headers=headers).status_code == 200
+
+    with Session(engine) as db:
+        file_path = db.get(export_repo.models.ExportJob, job_id).file_path
+        assert export_repo.expire_export_jobs(db) == 0
+        assert os.path.exists(file_path)
+        later = datetime.utcnow() + timedelta(seconds=export_repo.EXPORT_JOB_TTL + 1)
+        assert export_repo.expire_export_jobs(db, now=later) == 1
+
+    assert not os.path.exists(file_path)
+    assert client.get(f"/export/jobs/{job_id}", headers=headers).status_code == 404
+
+
+def test_bulk_zip_is_limited_and_releases_its_slot(client, login, monkeypatch):
+    headers = login()
+    create_project(client, headers)
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(export_repo, "_render_slots", slots)
+    request = {"layout": "zip", "format": "csv"}
+
+    slots.acquire()
+    response = client.post("/export/bulk", json=request, headers=headers)
+    assert response.status_code == 429
+    slots.release()
+
+    response = client.post("/export/bulk", json=request, headers=headers)
+    assert response.status_code == 200
+    assert response.content.startswith(b"PK")
+    assert slots.acquire(blocking=False)
+
+
+def test_bulk_workbook_summary_has_each_project_totals(client, login):
+    headers = login()
+    panel, board = create_project(client, headers, "panel"), create_project(client, headers, "board")
+    client.patch(f"/project/{board}/add-component", json={"code": "panel-c", "quantity": 2}, headers=headers)
+
+    response = client.post("/export/bulk", json={"layout": "workbook"}, headers=headers)
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(response.content), read_only=True)
+    summary = list(workbook["Summary"].iter_rows(values_only=True))
+    assert summary[1:] == [(panel, "panel", 1, 3, 30), (board, "board", 2, 5, 50)]
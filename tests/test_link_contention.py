@@ -0,0 +1,105 @@
+import asyncio
+import sqlite3
+import threading
+
+import httpx
+import pytest
+from sqlmodel import Session, select
+
+from project_management.main import app as sync_app
+from project_management.repository import summary_repo
+from project_management.utils import database, models
+
+INITIAL_QUANTITY = 1000
+# Configuração padrão da aplicação (busy_timeout de 5 s): nenhuma requisição pode falhar, nem com 503
+WRITERS = 100
+OPS = 3
+# Todas na mesma linha (projeto, componente), com os três caminhos de alteração de quantidade
+OPERATIONS = [
+    ("PATCH", "add-component", {"code": "C1", "quantity": 2}, 2),
+    ("PATCH", "components", [{"code": "C1", "quantity": 1}], 1),
+    ("DELETE", "delete-component", {"code": "C1", "quantity": 1}, -1),
+]
+
+
+def create_project(client, headers):
+    client.post("/component/", json={"code": "C1", "brand": "Test", "name": "Breaker", "amperage_rating": 10, "voltage": 220}, headers=headers)
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/project/{project_id}/add-component", json={"code": "C1", "quantity": INITIAL_QUANTITY}, headers=headers)
+    return project_id
+
+
+async def run_writers(app, project_id: int, headers: dict):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        applied, failures = 0, []
+
+        async def writer(index: int):
+            nonlocal applied
+            for op in range(OPS):
+                method, path, body, delta = OPERATIONS[(index + op) % len(OPERATIONS)]
+                response = await client.request(method, f"/project/{project_id}/{path}", json=body, headers=headers)
+                if response.status_code == 200:
+                    applied += delta
+                else:
+                    failures.append((response.status_code, response.text))
+
+        await asyncio.gather(*[writer(index) for index in range(WRITERS)])
+    if database._async_engine is not None:
+        await database._async_engine.dispose()
+    return applied, failures
+
+
+# Nenhuma alteração concorrente pode se perder, e os totais mantidos em project_summary precisam bater com os links
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_concurrent_quantity_changes_are_not_lost(request, client, login, engine, mode):
+    headers = login()
+    project_id = create_project(client, headers)
+    app = sync_app if mode == "sync" else request.getfixturevalue("async_app")
+
+    applied, failures = asyncio.run(run_writers(app, project_id, headers))
+
+    assert [status_code for status_code, _ in failures if status_code >= 500] == []
+    assert failures == []
+    link = models.ProjectComponentLink
+    with Session(engine) as db:
+        quantity = db.exec(select(link.component_quantity).where(link.project_id == project_id)).one()
+        assert quantity == INITIAL_QUANTITY + applied
+        assert summary_repo.verify(db) == []
+    assert client.get(f"/project/{project_id}", headers=headers).json()["total_amperage"] == quantity * 10
+
+
+def test_stale_if_match_is_rejected(client, login):
+    headers = login()
+    project_id = create_project(client, headers)
+    etag = client.get(f"/project/{project_id}", headers=headers).headers["etag"]
+
+    response = client.patch(f"/project/{project_id}/add-component", json={"code": "C1", "quantity": 1}, headers=headers | {"If-Match": etag})
+    assert response.status_code == 200
+    response = client.patch(f"/project/{project_id}/add-component", json={"code": "C1", "quantity": 1}, headers=headers | {"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/project/{project_id}", headers=headers).json()["component_links"][0]["quantity"] == INITIAL_QUANTITY + 1
+
+
+
+def test_lock_timeout_is_retried_then_returns_503(monkeypatch, client, login, engine):
+    headers = login()
+    project_id = create_project(client, headers)
+    monkeypatch.setattr(database, "SQLITE_BUSY_TIMEOUT_MS", 100)
+    engine.dispose()  # o PRAGMA busy_timeout vale para as conexões novas
+    # Outra conexão segura o lock de escrita do SQLite durante a requisição
+    holder = sqlite3.connect(engine.url.database, isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        response = client.patch(f"/project/{project_id}/add-component", json={"code": "C1", "quantity": 1}, headers=headers)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == database.LOCKED_RETRY_AFTER
+
+        # Liberado durante a segunda tentativa: a requisição passa
+        threading.Timer(0.15, holder.rollback).start()
+        response = client.patch(f"/project/{project_id}/add-component", json={"code": "C1", "quantity": 1}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["component_links"][0]["quantity"] == INITIAL_QUANTITY + 1
+    finally:
+        holder.close()
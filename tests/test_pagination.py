@@ -0,0 +1,40 @@
+import pytest
+
+from project_management.utils.pagination import encode_cursor
+
+
+def create_components(client, headers, count: int):
+    for index in range(count):
+        client.post("/component/", json={"code": f"C{index:02}", "brand": "Test", "name": f"Part {index:02}", "amperage_rating": 1, "voltage": 220}, headers=headers)
+
+
+def test_cursor_pages_through_every_item(client, login):
+    headers = login()
+    create_components(client, headers, 5)
+    codes, cursor = [], None
+    while True:
+        params = {"sort": "name", "limit": 2} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/component/", params=params, headers=headers).json()
+        codes += [item["code"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert codes == [f"C{index:02}" for index in range(5)]
+
+
+@pytest.mark.parametrize("sort, values", [
+    ("name", ["a", {}]),
+    ("name", [1, 1]),
+    ("name", ["a", "1"]),
+    ("name", [None, 1]),
+    ("id", ["a", 1]),
+    ("id", [1, 1.5]),
+    ("id", [True, 1]),
+    ("id", [1]),
+])
+def test_forged_cursor_is_rejected(client, login, sort, values):
+    headers = login()
+    create_components(client, headers, 1)
+    response = client.get("/component/", params={"sort": sort, "cursor": encode_cursor(values)}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,34 @@
+import pytest
+
+
+def create_project(client, headers):
+    client.post("/component/", json={"code": "C1", "brand": "Test", "name": "Breaker", "amperage_rating": 10, "voltage": 220}, headers=headers)
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/project/{project_id}/components", json=[{"code": "C1", "quantity": 2}], headers=headers)
+    return project_id
+
+
+# A mesma regra nas rotas síncronas e nas assíncronas (DATABASE_ASYNC)
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_empty_batch_is_rejected_without_changing_the_etag(request, login, mode):
+    client = request.getfixturevalue("client" if mode == "sync" else "async_client")
+    headers = login()
+    project_id = create_project(client, headers)
+    etag = client.get(f"/project/{project_id}", headers=headers).headers["etag"]
+
+    response = client.patch(f"/project/{project_id}/components", json=[], headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "the component list is empty"
+
+    response = client.get(f"/project/{project_id}", headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_batch_updates_quantities(client, login):
+    headers = login()
+    project_id = create_project(client, headers)
+    response = client.patch(f"/project/{project_id}/components", json=[{"code": "C1", "quantity": 3}], headers=headers)
+    assert response.status_code == 200
+    assert response.json()["component_links"][0]["quantity"] == 5
+    assert response.json()["total_amperage"] == 50
@@ -0,0 +1,32 @@
+def create_project(client, headers, name: str, components: int):
+    client.post("/project/", json={"name": name}, headers=headers)
+    project_id = client.get("/project/", params={"name": name}, headers=headers).json()["items"][0]["id"]
+    for index in range(components):
+        code = f"{name}-{index}"
+        client.post("/component/", json={"code": code, "brand": "Test", "name": code, "amperage_rating": 2, "voltage": 220}, headers=headers)
+        response = client.patch(f"/project/{project_id}/add-component", json={"code": code, "quantity": 1}, headers=headers)
+        assert response.status_code == 200, response.text
+    return project_id
+
+
+def count_get(client, headers, statements, project_id: int):
+    statements.clear()
+    response = client.get(f"/project/{project_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+# GET /project/{id} não pode fazer uma query por componente ligado
+def test_get_project_statements_do_not_grow_with_components(client, login, statements):
+    headers = login()
+    small = create_project(client, headers, "small", 1)
+    large = create_project(client, headers, "large", 25)
+    client.get(f"/project/{create_project(client, headers, 'warmup', 0)}", headers=headers)
+
+    small_count, small_body = count_get(client, headers, statements, small)
+    large_count, large_body = count_get(client, headers, statements, large)
+
+    assert len(small_body["component_links"]) == 1
+    assert len(large_body["component_links"]) == 25
+    assert large_body["total_amperage"] == 50
+    assert small_count == large_count
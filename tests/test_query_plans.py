@@ -0,0 +1,22 @@
+import os
+import sys
+
+from project_management.main import app
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import query_plans  # noqa: E402
+from seed import seed_database  # noqa: E402
+
+
+# A auditoria de benchmarks/query_plans.py num banco pequeno: os planos do SQLite não dependem do volume (sem ANALYZE)
+def test_hot_paths_do_not_scan_full_tables(engine):
+    counts = seed_database(engine, users=3, components=300, projects=100, links=5)
+    results, server_errors = query_plans.audit(app, engine, counts, requests=2)
+
+    assert not server_errors
+    # Todo cenário precisa ter emitido comandos, senão a auditoria não viu o caminho dele
+    scenarios = [name for name, *_ in query_plans.suite_scenarios(counts) + query_plans.write_scenarios(counts, {}, 0)]
+    assert set(scenarios) - {scenario for scenario, *_ in results} == set()
+    unexpected = [f"[{scenario}] {', '.join(tables)}: {' '.join(statement.split())}"
+                  for scenario, statement, _, _, tables in results if tables]
+    assert not unexpected, "\n".join(unexpected)
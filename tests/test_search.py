@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import text
+
+from project_management.utils import search
+
+
+def component(code: str, brand: str, name: str):
+    return {"code": code, "brand": brand, "name": name, "amperage_rating": 10, "voltage": 220}
+
+
+def found(client, headers, query: str):
+    response = client.get("/component/search", params={"q": query}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [item["code"] for item in response.json()]
+
+
+def indexed(engine, term: str):
+    with engine.connect() as connection:
+        return [row.code for row in connection.execute(text("SELECT code FROM component_fts WHERE component_fts MATCH :term ORDER BY rowid"),
+                                                       {"term": f'"{term}"*'})]
+
+
+# Os triggers mantêm component_fts em toda escrita, seja qual for o caminho da busca
+@pytest.mark.skipif(not search.FTS5_AVAILABLE, reason="SQLite built without FTS5")
+def test_index_follows_insert_update_and_delete(client, login, engine):
+    headers = login()
+    client.post("/component/", json=component("DJ-10", "Steck", "Disjuntor bipolar"), headers=headers)
+    client.post("/component/import", files={"file": ("c.csv", b"code,brand,name,amperage_rating,voltage\nTM-20,WEG,Tomada dupla,20,220\n", "text/csv")},
+                headers=headers)
+    assert indexed(engine, "disjuntor") == ["DJ-10"]
+    assert indexed(engine, "weg") == ["TM-20"]
+
+    component_id = client.get("/component/", params={"code": "DJ-10"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/component/{component_id}", json=component("DJ-16", "Steck", "Interruptor"), headers=headers)
+    assert indexed(engine, "disjuntor") == []
+    assert indexed(engine, "interruptor") == ["DJ-16"]
+    assert indexed(engine, "dj-16") == ["DJ-16"]
+
+    client.delete(f"/component/{component_id}", headers=headers)
+    assert indexed(engine, "interruptor") == []
+    assert indexed(engine, "tomada") == ["TM-20"]
+
+
+@pytest.mark.parametrize("fts", [True, False], ids=["fts5", "ilike"])
+def test_search_sees_every_write(client, login, monkeypatch, fts):
+    if fts and not search.FTS5_AVAILABLE:
+        pytest.skip("SQLite built without FTS5")
+    monkeypatch.setattr(search, "FTS5_AVAILABLE", fts)
+    headers = login()
+    client.post("/component/", json=component("DJ-10", "Steck", "Disjuntor bipolar"), headers=headers)
+    client.post("/component/", json=component("DJ-20", "Schneider", "Disjuntor tripolar"), headers=headers)
+    client.post("/component/", json=component("TM-20", "WEG", "Tomada dupla"), headers=headers)
+
+    assert sorted(found(client, headers, "disj")) == ["DJ-10", "DJ-20"]
+    assert found(client, headers, "disjuntor trip") == ["DJ-20"]
+    assert found(client, headers, "dj-10") == ["DJ-10"]
+    assert found(client, headers, "ste") == ["DJ-10"]
+
+    component_id = client.get("/component/", params={"code": "DJ-20"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/component/{component_id}", json=component("DJ-20", "Schneider", "Interruptor"), headers=headers)
+    assert found(client, headers, "disjuntor") == ["DJ-10"]
+    assert found(client, headers, "interruptor") == ["DJ-20"]
+
+    client.delete(f"/component/{component_id}", headers=headers)
+    assert found(client, headers, "interruptor") == []
+    assert client.get("/component/search", params={"q": "!!"}, headers=headers).status_code == 400
@@ -0,0 +1,68 @@
+import pytest
+from sqlmodel import Session, select
+
+from project_management.utils import database, models, sharding
+
+
+# Dois shards em arquivos do teste; o primeiro usuário cai no shard 1 e o segundo no 2
+@pytest.fixture
+def sharded(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_COUNT", 2)
+    monkeypatch.setattr(sharding, "SHARD_URL", f"sqlite:///{tmp_path}/shard_{{shard}}.db")
+    yield
+    database.shard_engines.clear()
+
+
+def component(code: str):
+    return {"code": code, "brand": "Test", "name": "Breaker", "amperage_rating": 10, "voltage": 220}
+
+
+def test_component_codes_are_unique_across_shards(sharded, engine, client, login):
+    alice, bob = login("alice"), login("bob")
+    with Session(engine) as db:
+        assert sorted(db.exec(select(models.TenantShard.shard))) == [1, 2]
+
+    assert client.post("/component/", json=component("C1"), headers=alice).status_code == 201
+    response = client.post("/component/", json=component("C1"), headers=bob)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Component code already exists"
+
+    report = client.post("/component/import", files={"file": ("c.csv", b"code,brand,name,amperage_rating,voltage\nC1,Test,Breaker,10,220\nC2,Test,Breaker,10,220\n", "text/csv")},
+                         params={"upsert": True}, headers=bob).json()
+    assert (report["inserted"], report["updated"]) == (1, 0)
+    assert [(error["row"], error["code"]) for error in report["errors"]] == [(2, "C1")]
+
+    bob_id = client.get("/component/", params={"code": "C2"}, headers=bob).json()["items"][0]["id"]
+    assert client.patch(f"/component/{bob_id}", json=component("C1"), headers=bob).status_code == 400
+    assert client.patch(f"/component/{bob_id}", json=component("C3"), headers=bob).status_code == 200
+    assert client.post("/component/", json=component("C2"), headers=alice).status_code == 201
+
+    # Apagar ou renomear o componente libera o código
+    alice_id = client.get("/component/", params={"code": "C1"}, headers=alice).json()["items"][0]["id"]
+    assert client.delete(f"/component/{alice_id}", headers=alice).status_code == 204
+    assert client.post("/component/", json=component("C1"), headers=bob).status_code == 201
+    with Session(engine) as db:
+        assert dict(db.exec(select(models.ComponentCode.code, models.ComponentCode.user_id)).all()) == {"C1": 2, "C2": 1, "C3": 2}
+
+
+@pytest.mark.parametrize("method, url, kwargs", [
+    ("GET", "/analytics/projects", {}),
+    ("GET", "/analytics/projects/overloaded", {"params": {"max_amperage": 100}}),
+    ("GET", "/analytics/components/top", {}),
+    ("GET", "/analytics/stats", {}),
+    ("GET", "/changes/", {}),
+    ("POST", "/export/bom", {"json": {"format": "csv"}}),
+])
+def test_scope_all_is_refused_with_sharding(sharded, client, login, method, url, kwargs):
+    headers = login()
+    if method == "POST":
+        response = client.post(url, json=kwargs["json"] | {"scope": "all"}, headers=headers)
+    else:
+        response = client.get(url, params=kwargs.get("params", {}) | {"scope": "all"}, headers=headers)
+    assert response.status_code == 400
+    assert client.request(method, url, headers=headers, **kwargs).status_code in (200, 404)
+
+
+def test_scope_all_without_sharding(client, login):
+    headers = login()
+    assert client.get("/analytics/stats", params={"scope": "all"}, headers=headers).status_code == 200
@@ -0,0 +1,45 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from project_management.utils import migrations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento do p50 de import + startup de um worker num banco já migrado (benchmarks/startup.py mede o mesmo em detalhe)
+BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "2000"))
+RUNS = 3
+
+PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import project_management.main as main
+imported = time.perf_counter()
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+from project_management.utils import database, migrations
+with database.engine.connect() as connection:
+    version = migrations.current_version(connection)
+print(json.dumps({"total": ready - started, "version": version, "openpyxl": "openpyxl" in sys.modules}))
+"""
+
+
+# Cada amostra num interpretador novo, como um worker que acabou de subir
+def probe(url: str):
+    env = {**os.environ, "DATABASE_URL": url, "PYTHONPATH": ROOT}
+    output = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_migrated_startup_is_within_budget(engine):
+    samples = [probe(engine.url.render_as_string(hide_password=False)) for _ in range(RUNS)]
+
+    assert all(sample["version"] == migrations.LATEST_VERSION for sample in samples)
+    assert not any(sample["openpyxl"] for sample in samples), "openpyxl imported at startup"
+    assert statistics.median(sample["total"] for sample in samples) * 1000 < BUDGET_MS
@@ -0,0 +1,66 @@
+from sqlalchemy import update
+from sqlmodel import Session
+
+from project_management import cli
+from project_management.repository import summary_repo
+from project_management.utils import models
+
+TOTALS = ("line_count", "total_quantity", "total_amperage", "total_watts")
+
+
+def create_component(client, headers, code: str, amperage: int, watts: int):
+    client.post("/component/", json={"code": code, "brand": "Test", "name": code, "amperage_rating": amperage, "voltage": 220, "watts": watts}, headers=headers)
+    return client.get("/component/", params={"code": code}, headers=headers).json()["items"][0]["id"]
+
+
+def totals(client, headers, project_id: int):
+    project = client.get(f"/project/{project_id}", headers=headers).json()
+    return tuple(project[field] for field in TOTALS)
+
+
+def test_totals_follow_every_link_change(client, login, engine):
+    headers = login()
+    breaker = create_component(client, headers, "B10", 10, 2200)
+    socket = create_component(client, headers, "S20", 20, 4400)
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+    assert totals(client, headers, project_id) == (0, 0, 0, 0)
+
+    client.patch(f"/project/{project_id}/add-component", json={"code": "B10", "quantity": 3}, headers=headers)
+    assert totals(client, headers, project_id) == (1, 3, 30, 6600)
+
+    client.patch(f"/project/{project_id}/components", json=[{"id": socket, "quantity": 2}, {"code": "B10", "quantity": -1}], headers=headers)
+    assert totals(client, headers, project_id) == (2, 4, 60, 13200)
+
+    client.request("DELETE", f"/project/{project_id}/delete-component", json={"id": socket, "quantity": 2}, headers=headers)
+    assert totals(client, headers, project_id) == (1, 2, 20, 4400)
+
+    # Nova amperagem/potência do componente corrige os totais de quem o usa
+    client.patch(f"/component/{breaker}", json={"amperage_rating": 16, "voltage": 220, "watts": 3520}, headers=headers)
+    assert totals(client, headers, project_id) == (1, 2, 32, 7040)
+
+    with Session(engine) as db:
+        assert summary_repo.verify(db) == []
+
+
+def test_cli_reports_drift_and_rebuild_repairs_it(client, login, engine, capsys):
+    headers = login()
+    create_component(client, headers, "B10", 10, 2200)
+    client.post("/project/", json={"name": "panel"}, headers=headers)
+    project_id = client.get("/project/", params={"name": "panel"}, headers=headers).json()["items"][0]["id"]
+    client.patch(f"/project/{project_id}/add-component", json={"code": "B10", "quantity": 3}, headers=headers)
+
+    assert cli.main(["summaries"]) == 0
+    assert "Project summaries are consistent" in capsys.readouterr().out
+
+    with Session(engine) as db:
+        db.exec(update(models.ProjectSummary).where(models.ProjectSummary.project_id == project_id).values(total_quantity=99))
+        db.commit()
+    assert cli.main(["summaries"]) == 1
+    assert f"project {project_id}: total_quantity stored=99 expected=3" in capsys.readouterr().out
+
+    assert cli.main(["summaries", "--rebuild"]) == 0
+    output = capsys.readouterr().out
+    assert "Rebuilt 1 project summaries" in output
+    assert "Project summaries are consistent" in output
+    assert totals(client, headers, project_id) == (1, 3, 30, 6600)